@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PmAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'PM_App'
+
+    def ready(self):
+        from . import signals  # noqa: F401
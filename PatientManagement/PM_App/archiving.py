@@ -0,0 +1,135 @@
+import time
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .events import publish
+from .jobs import JobFailed, set_progress
+from .models import Complaint, PatientComplaintArchive
+from .pagination import PaginationError, parse_date_param
+from .response_cache import invalidate, patient_namespace
+
+
+ARCHIVE_BATCH_SIZE = 500
+
+ARCHIVED_PATIENT_FIELDS = (
+    "patient_id", "firstname", "middlename", "lastname", "address", "birthdate", "age",
+    "gender", "contact_number", "blood_pressure", "weight", "height", "profile_image",
+)
+ARCHIVED_COMPLAINT_FIELDS = (
+    "chief_complaint", "lab_examination", "test_result", "final_diagnosis", "treatment",
+)
+ARCHIVE_FILTERS = ("patient_id", "date_from", "date_to", "diagnosis")
+
+
+class ArchiveFilterError(ValueError):
+    pass
+
+
+def archivable_complaints(params):
+    """Complaints matching the filters that have no archive copy yet.
+
+    ``params`` is a QueryDict or dict with any of patient_id, date_from,
+    date_to (inclusive dates of the complaint) and diagnosis (a substring
+    of the final diagnosis). With none of them given, ``all`` must be set.
+    """
+    if not any(params.get(name) for name in ARCHIVE_FILTERS) and params.get("all") not in ("1", True):
+        raise ArchiveFilterError("Give at least one of patient_id, date_from, date_to or diagnosis, or all=1")
+
+    complaints = Complaint.objects.filter(archive__isnull=True)
+    try:
+        date_from = parse_date_param(params, "date_from")
+        date_to = parse_date_param(params, "date_to")
+    except PaginationError as e:
+        raise ArchiveFilterError(str(e))
+    if date_from:
+        complaints = complaints.filter(date_created__gte=date_from)
+    if date_to:
+        complaints = complaints.filter(date_created__lt=date_to + timedelta(days=1))
+
+    patient_id = (params.get("patient_id") or "").strip()
+    if patient_id:
+        complaints = complaints.filter(patient__patient_id=patient_id)
+
+    diagnosis = (params.get("diagnosis") or "").strip()
+    if diagnosis:
+        complaints = complaints.filter(final_diagnosis__icontains=diagnosis)
+    return complaints
+
+
+def archive_rows(complaints):
+    """The complaint and patient columns an archive copies, joined in one query."""
+    return complaints.values("id", *ARCHIVED_COMPLAINT_FIELDS, *(f"patient__{name}" for name in ARCHIVED_PATIENT_FIELDS))
+
+
+def archive_copy(row):
+    """Build the archive for one ``archive_rows`` row."""
+    archive = PatientComplaintArchive(
+        complaint_id=row["id"],
+        **{name: row[name] for name in ARCHIVED_COMPLAINT_FIELDS},
+        **{name: row[f"patient__{name}"] for name in ARCHIVED_PATIENT_FIELDS},
+    )
+    archive.profile_image = default_storage.url(archive.profile_image) if archive.profile_image else None
+    return archive
+
+
+def bulk_archive(complaints, batch_size=ARCHIVE_BATCH_SIZE, dry_run=False, on_batch=None):
+    """Copy every complaint in ``complaints`` into PatientComplaintArchive.
+
+    Each batch is read (complaint joined to its patient in one query) and
+    written with a single bulk_create inside one transaction. The batch's
+    complaints are locked as they are read, so a concurrent run waits for
+    this one and then finds them archived. Complaints that already have an
+    archive are skipped, so re-running the same request archives nothing
+    twice. ``archived`` counts the rows actually inserted and ``skipped``
+    the rest.
+    """
+    started = time.perf_counter()
+    report = {"matched": 0, "archived": 0, "skipped": 0, "batches": 0}
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            batch = complaints.filter(id__gt=last_id).order_by("id")
+            if not dry_run:
+                batch = batch.select_for_update(of=("self",))
+            rows = list(archive_rows(batch[:batch_size]))
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+            report["matched"] += len(rows)
+            if not dry_run:
+                ids = [row["id"] for row in rows]
+                archives = PatientComplaintArchive.objects.filter(complaint_id__in=ids)
+                already = set(archives.values_list("complaint_id", flat=True))
+                copies = [archive_copy(row) for row in rows if row["id"] not in already]
+                PatientComplaintArchive.objects.bulk_create(copies, batch_size=batch_size, ignore_conflicts=True)
+                # ignore_conflicts returns no pks. With the complaints locked,
+                # only this run can have added archives for them since ``already``.
+                archived = archives.count() - len(already)
+                report["archived"] += archived
+                report["skipped"] += len(rows) - archived
+                if archived:
+                    # bulk_create sends no post_save signals.
+                    patient_ids = sorted({copy.patient_id for copy in copies})
+                    invalidate("archives", *(patient_namespace(patient_id) for patient_id in patient_ids))
+                    publish("archive", action="created", count=archived, patient_ids=patient_ids)
+        report["batches"] += 1
+        if on_batch:
+            on_batch(report)
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def run_archive_job(job):
+    """Job handler: bulk archive with the filters saved by the endpoint."""
+    try:
+        complaints = archivable_complaints(job.payload["filters"])
+    except ArchiveFilterError as e:
+        raise JobFailed(str(e)) from e
+    return bulk_archive(
+        complaints,
+        batch_size=job.payload.get("batch_size", ARCHIVE_BATCH_SIZE),
+        dry_run=job.payload.get("dry_run", False),
+        on_batch=lambda report: set_progress(job, report["matched"]),
+    )
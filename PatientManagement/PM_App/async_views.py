@@ -0,0 +1,100 @@
+import json
+
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.decorators import login_required
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+
+from .conditional import conditional_json
+from .models import Complaint, Patient, PatientComplaintArchive
+from .pagination import PaginationError, akeyset_page
+from .projection import ProjectionError
+from .response_cache import cached_response, patient_namespace
+from .sync import current_token
+from .views import (
+    ARCHIVE_LIST_FIELDS, ARCHIVE_STREAM_CHUNK_SIZE, COMPLAINTS_AGGREGATES, PATIENT_LIST_AGGREGATES,
+    archive_list_response, archive_page_args, archive_row, complaint_detail, complaint_list_patient,
+    complaint_list_response, complaint_page_args, complaints_validators, filter_archives, filter_patients,
+    patient_detail, patient_list_response, patient_list_validators, patient_page_args, wants_sync_token,
+    wants_total,
+)
+
+
+@login_required
+@cached_response("patient_detail", lambda request, patient_id: [patient_namespace(patient_id)])
+async def verify_patient_api(request, patient_id):
+    try:
+        patient = await Patient.objects.aget(patient_id=patient_id)
+    except Patient.DoesNotExist:
+        return JsonResponse({"success": False}, status=404)
+    return JsonResponse({"success": True, "patient": patient_detail(patient)})
+
+
+async def patient_list_version(request):
+    try:
+        patients = filter_patients(Patient.objects.all(), request.GET)
+    except PaginationError:
+        return None
+    return patient_list_validators(await patients.aaggregate(**PATIENT_LIST_AGGREGATES))
+
+
+@login_required
+@conditional_json(patient_list_version)
+@cached_response("patient_list", lambda request: ["patients"])
+async def get_patients_json(request):
+    token = await sync_to_async(current_token)() if wants_sync_token(request) else None
+    try:
+        patients, page_args, projection = patient_page_args(request)
+        rows, next_cursor = await akeyset_page(**page_args)
+    except (PaginationError, ProjectionError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    total = await patients.acount() if wants_total(request) else None
+    return patient_list_response(request, rows, next_cursor, page_args["page_size"], total, projection, token)
+
+
+async def complaints_version(request, patient_id):
+    state = await Patient.objects.filter(patient_id=patient_id).aaggregate(**COMPLAINTS_AGGREGATES)
+    return complaints_validators(state)
+
+
+@login_required
+@conditional_json(complaints_version)
+@cached_response("patient_complaints", lambda request, patient_id: [patient_namespace(patient_id)])
+async def get_complaints_json(request, patient_id):
+    patient = await aget_object_or_404(complaint_list_patient(), patient_id=patient_id)
+    try:
+        page_args, projection = complaint_page_args(request, patient.pop("id"))
+        complaints_data, next_cursor = await akeyset_page(**page_args)
+    except (PaginationError, ProjectionError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return complaint_list_response(patient, complaints_data, next_cursor, projection)
+
+
+@login_required
+async def get_complaint_json(request, complaint_id):
+    complaint = await aget_object_or_404(Complaint, id=complaint_id)
+    return JsonResponse(complaint_detail(complaint))
+
+
+async def stream_ndjson(rows):
+    async for row in rows:
+        yield json.dumps(archive_row(row), cls=DjangoJSONEncoder) + "\n"
+
+
+@login_required
+@cached_response("archives", lambda request: ["archives"], skip=lambda request: request.GET.get("format") == "ndjson")
+async def get_archived_complaints(request):
+    try:
+        archives = filter_archives(PatientComplaintArchive.objects.all(), request.GET).values(*ARCHIVE_LIST_FIELDS)
+
+        if request.GET.get("format") == "ndjson":
+            rows = archives.order_by("-date_created", "-id").aiterator(chunk_size=ARCHIVE_STREAM_CHUNK_SIZE)
+            return StreamingHttpResponse(stream_ndjson(rows), content_type="application/x-ndjson")
+
+        archives_data, next_cursor = await akeyset_page(**archive_page_args(request, archives))
+    except PaginationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return archive_list_response(archives_data, next_cursor)
@@ -0,0 +1,351 @@
+import io
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import django
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .events import latest_event_id
+from .export_views import PatientFormPDFGenerator
+from .percentiles import percentile
+from .models import Complaint, CustomUser, Patient, PatientComplaintArchive
+from .response_cache import response_cache
+from .sync import current_token
+from .synthetic import seed_synthetic
+
+
+BENCHMARK_SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+BENCHMARK_ITERATIONS = 5
+PDF_TABLE_ROWS = (10, 100, 1_000, 5_000)
+BENCHMARK_USER = "benchmark"
+BASELINE_VERSION = 1
+
+# Differences smaller than these are noise, whatever the tolerance says.
+MIN_LATENCY_REGRESSION_MS = 5.0
+MIN_MEMORY_REGRESSION_KIB = 256
+
+CASES = {}
+
+
+def case(name):
+    def register(run):
+        CASES[name] = run
+        return run
+    return register
+
+
+class Fixture:
+    """The records cases read and write, picked the same way at every scale."""
+
+    def __init__(self):
+        patients = Patient.objects.order_by("id")
+        self.patient = patients[patients.count() // 2]
+        self.complaint = (
+            Complaint.objects.filter(patient=self.patient).order_by("id").first()
+            or Complaint.objects.order_by("id").first()
+        )
+        self.archive = PatientComplaintArchive.objects.order_by("id").first()
+        self.change_token = max(0, current_token() - 100)
+        self.event_id = latest_event_id()
+        self.surname = self.patient.lastname.split()[-1]
+        self.writes = 0
+
+    def next_write(self):
+        self.writes += 1
+        return self.writes
+
+
+# Every page and API a user reaches from the dashboard. Admin and operations
+# endpoints (stats, metrics, profiling), deletes and the background-job
+# kick-offs (imports, bulk archive, batch PDF export) are left out: they
+# either change the data under later cases or measure the job queue instead.
+
+@case("login_page")
+def login_page(client, fixture):
+    return client.get(reverse("login"))
+
+
+@case("dashboard")
+def dashboard(client, fixture):
+    return client.get(reverse("dashboard"))
+
+
+@case("list_patients")
+def list_patients(client, fixture):
+    return client.get(reverse("list_patients"))
+
+
+@case("patient_list")
+def patient_list(client, fixture):
+    return client.get(reverse("patients_api"), {"page_size": 50})
+
+
+@case("patient_list_filtered")
+def patient_list_filtered(client, fixture):
+    return client.get(reverse("patients_api"), {"page_size": 50, "gender": "female", "age_min": 30, "sort": "lastname"})
+
+
+@case("patient_list_summary_table")
+def patient_list_summary_table(client, fixture):
+    return client.get(reverse("patients_api"), {"page_size": 50, "projection": "summary", "shape": "table"})
+
+
+@case("patient_list_page_20")
+def patient_list_page_20(client, fixture):
+    return client.get(reverse("patients_api"), {"page_size": 50, "page": 20})
+
+
+@case("patient_detail")
+def patient_detail(client, fixture):
+    return client.get(f"/api/patients/{fixture.patient.patient_id}/")
+
+
+@case("patient_changes")
+def patient_changes(client, fixture):
+    return client.get(reverse("patient_changes"), {"since": fixture.change_token})
+
+
+@case("search_patients")
+def search_patients(client, fixture):
+    return client.get(reverse("search_records"), {"q": fixture.surname, "type": "patients"})
+
+
+@case("search_complaints")
+def search_complaints(client, fixture):
+    return client.get(reverse("search_records"), {"q": "pain", "type": "complaints"})
+
+
+@case("complaints")
+def complaints(client, fixture):
+    return client.get(reverse("get_complaints_json", args=[fixture.patient.patient_id]))
+
+
+@case("complaint_detail")
+def complaint_detail(client, fixture):
+    if fixture.complaint:
+        return client.get(reverse("get_complaint_json", args=[fixture.complaint.id]))
+
+
+@case("archives")
+def archives(client, fixture):
+    return client.get(reverse("get_archived_complaints"))
+
+
+@case("live_events")
+def live_events(client, fixture):
+    return client.get(reverse("live_events"), HTTP_LAST_EVENT_ID=str(fixture.event_id))
+
+
+@case("export_complaint_pdf")
+def export_complaint_pdf(client, fixture):
+    if fixture.complaint:
+        return client.get(reverse("export_complaint_pdf", args=[fixture.complaint.id]))
+
+
+@case("export_archived_pdf")
+def export_archived_pdf(client, fixture):
+    if fixture.archive:
+        return client.get(reverse("export_archived_pdf", args=[fixture.archive.id]))
+
+
+@case("export_patients_csv")
+def export_patients_csv(client, fixture):
+    return client.get(reverse("export_records", args=["patients"]), {"format": "csv"})
+
+
+@case("add_patient")
+def add_patient(client, fixture):
+    return client.post(
+        reverse("add_patient"),
+        {
+            "firstname": f"Bench{fixture.next_write()}", "lastname": "Santos", "address": "Manila",
+            "birthdate": "1990-01-01", "age": 36, "gender": "Female", "contact_number": "09170000000",
+        },
+        HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+    )
+
+
+@case("update_patient")
+def update_patient(client, fixture):
+    patient = fixture.patient
+    return client.post(reverse("update_patient"), {
+        "patient_id": patient.patient_id, "firstname": patient.firstname, "middlename": patient.middlename or "",
+        "lastname": patient.lastname, "contact_number": f"0917{fixture.next_write():07d}",
+        "birthdate": patient.birthdate.isoformat(), "age": patient.age, "gender": patient.gender,
+        "address": patient.address,
+    })
+
+
+@case("record_complaint")
+def record_complaint(client, fixture):
+    return client.post(reverse("record_complaint"), {
+        "patient_id": fixture.patient.patient_id, "chief_complaint": f"Follow-up {fixture.next_write()}",
+        "final_diagnosis": "Hypertension", "treatment": "Amlodipine 5mg",
+    })
+
+
+@case("update_complaint")
+def update_complaint(client, fixture):
+    if fixture.complaint:
+        return client.post(reverse("update_complaint"), {
+            "complaint_id": fixture.complaint.id, "chief_complaint": fixture.complaint.chief_complaint,
+            "final_diagnosis": fixture.complaint.final_diagnosis or "", "treatment": f"Review {fixture.next_write()}",
+        })
+
+
+def consume(response):
+    """Read the whole body, as a browser would, and return its size."""
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def measure(client, run, fixture, iterations, reset):
+    """Time ``iterations`` cold runs of one case, then count queries and peak memory on one more.
+
+    The response cache and PDF cache are emptied before every run so each
+    one does the full work. Memory is traced in a separate run because
+    tracemalloc slows everything it watches.
+    """
+    latencies = []
+    statuses = set()
+    size = 0
+    for iteration in range(iterations + 1):
+        reset()
+        started = time.perf_counter()
+        response = run(client, fixture)
+        if response is None:
+            return None
+        size = consume(response)
+        # The first run warms imports, templates and connections.
+        if iteration:
+            latencies.append(time.perf_counter() - started)
+        statuses.add(response.status_code)
+
+    reset()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            consume(run(client, fixture))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "status": sorted(statuses),
+        "median_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "min_ms": round(latencies[0] * 1000, 2),
+        "queries": len(queries),
+        "peak_kib": round(peak / 1024, 1),
+        "response_bytes": size,
+    }
+
+
+def run_scale(patients, complaints_per_patient=3, archived_fraction=0.2, iterations=BENCHMARK_ITERATIONS,
+              seed=0, cases=None, on_case=None):
+    """Grow the database to ``patients`` synthetic patients and run the cases against it.
+
+    Scales are meant to run smallest first on one database: each tops up
+    what the previous one seeded instead of starting over.
+    """
+    existing = Patient.objects.count()
+    seeded = {"seconds": 0.0}
+    if existing < patients:
+        seeded = seed_synthetic(patients - existing, complaints_per_patient, archived_fraction, seed=seed + existing)
+
+    user, _ = CustomUser.objects.get_or_create(username=BENCHMARK_USER, defaults={"is_staff": True})
+    client = Client()
+    client.force_login(user)
+    fixture = Fixture()
+
+    pdf_cache = tempfile.mkdtemp(prefix="pm-bench-pdf-")
+
+    def reset():
+        response_cache().clear()
+        shutil.rmtree(pdf_cache, ignore_errors=True)
+
+    results = {}
+    try:
+        with override_settings(PDF_CACHE_DIR=pdf_cache, PERFORMANCE_PROFILING=False):
+            for name, run in CASES.items():
+                if cases and name not in cases:
+                    continue
+                result = measure(client, run, fixture, iterations, reset)
+                if result is None:
+                    continue
+                results[name] = result
+                if on_case:
+                    on_case(name, result)
+    finally:
+        shutil.rmtree(pdf_cache, ignore_errors=True)
+
+    return {
+        "patients": Patient.objects.count(),
+        "complaints": Complaint.objects.count(),
+        "archives": PatientComplaintArchive.objects.count(),
+        "seed_seconds": seeded["seconds"],
+        "cases": results,
+    }
+
+
+def pdf_table_layout(row_counts=PDF_TABLE_ROWS):
+    """Time ``draw_info_table`` on tables of each size; per-row time should stay flat."""
+    results = {}
+    for rows in row_counts:
+        data = [["Field", "Information"]] + [
+            [f"Row {i}", "Lorem ipsum dolor sit amet " * (1 + i % 4)] for i in range(rows)
+        ]
+        pdf = PatientFormPDFGenerator(io.BytesIO())
+        started = time.perf_counter()
+        pdf.draw_info_table(data, wrap_col=1)
+        seconds = time.perf_counter() - started
+        results[str(rows)] = {"ms": round(seconds * 1000, 1), "us_per_row": round(seconds / rows * 1e6, 1)}
+    return results
+
+
+def environment():
+    return {
+        "version": BASELINE_VERSION,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "machine": platform.machine(),
+    }
+
+
+def compare(current, baseline, latency_tolerance=0.5, memory_tolerance=0.5):
+    """Regressions of ``current`` against ``baseline``, as readable lines.
+
+    Query counts do not depend on the machine, so any increase counts.
+    Latency and memory only count past their tolerance (0.5 is 50% slower
+    or bigger) and the noise floors, and are only meaningful against a
+    baseline recorded on the same kind of machine and database.
+    """
+    regressions = []
+    for scale, result in current["scales"].items():
+        old_cases = baseline.get("scales", {}).get(scale, {}).get("cases", {})
+        for name, new in result["cases"].items():
+            old = old_cases.get(name)
+            if old is None:
+                continue
+            where = f"{scale} {name}"
+            if new["status"] != old["status"]:
+                regressions.append(f"{where}: status {new['status']} (baseline {old['status']})")
+            if new["queries"] > old["queries"]:
+                regressions.append(f"{where}: {new['queries']} queries (baseline {old['queries']})")
+            slower = new["median_ms"] - old["median_ms"]
+            if slower > MIN_LATENCY_REGRESSION_MS and new["median_ms"] > old["median_ms"] * (1 + latency_tolerance):
+                regressions.append(f"{where}: median {new['median_ms']}ms (baseline {old['median_ms']}ms)")
+            bigger = new["peak_kib"] - old["peak_kib"]
+            if bigger > MIN_MEMORY_REGRESSION_KIB and new["peak_kib"] > old["peak_kib"] * (1 + memory_tolerance):
+                regressions.append(f"{where}: peak memory {new['peak_kib']}KiB (baseline {old['peak_kib']}KiB)")
+    return regressions
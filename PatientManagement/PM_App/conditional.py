@@ -0,0 +1,65 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def conditional_json(validators):
+    """Answer conditional GETs from cheap validators before the view runs.
+
+    ``validators(request, *args, **kwargs)`` returns ``(version, last_modified)``
+    (typically one aggregate query) or None to skip the check. The ETag
+    covers the version and the full request URL, so it changes with the
+    data and with the page asked for. Last-Modified only moves when rows
+    are written, so clients should prefer the ETag, which also changes on
+    deletes. Async views take async validators.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await view(request, *args, **kwargs)
+                state = await validators(request, *args, **kwargs)
+                if state is None:
+                    return await view(request, *args, **kwargs)
+                etag, timestamp = validator_headers(request, state)
+                response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+                if response is None:
+                    response = add_validators(await view(request, *args, **kwargs), etag, timestamp)
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            state = validators(request, *args, **kwargs)
+            if state is None:
+                return view(request, *args, **kwargs)
+            etag, timestamp = validator_headers(request, state)
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = add_validators(view(request, *args, **kwargs), etag, timestamp)
+            return response
+        return wrapper
+    return decorator
+
+
+def validator_headers(request, state):
+    version, last_modified = state
+    raw = repr((request.get_host(), request.get_full_path(), version))
+    etag = quote_etag(hashlib.sha256(raw.encode()).hexdigest()[:32])
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return etag, timestamp
+
+
+def add_validators(response, etag, timestamp):
+    if response.status_code == 200:
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        response["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,210 @@
+import asyncio
+import json
+from collections import deque
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .jobs import refresh_connections
+from .models import ChangeEvent
+
+
+EVENT_BATCH_SIZE = 500
+EVENT_BACKLOG_LIMIT = 1000
+STREAM_QUEUE_SIZE = 1000
+PRUNE_EVERY = 500
+RECONNECT_DELAY_MS = 3000
+# Ids are handed out before commit, so a lower id can become visible after a
+# higher one. Each poll re-reads this many ids behind the newest it has seen.
+REREAD_WINDOW = 100
+
+
+def publish(topic, **payload):
+    """Record a change event once the surrounding transaction commits."""
+    transaction.on_commit(lambda: record(topic, payload))
+
+
+def record(topic, payload):
+    event = ChangeEvent.objects.create(topic=topic, payload=payload)
+    if event.id % PRUNE_EVERY == 0:
+        prune()
+    broker.notify()
+    return event
+
+
+def prune():
+    retention = getattr(settings, "LIVE_EVENTS_RETENTION", 60 * 60)
+    ChangeEvent.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=retention)).delete()
+
+
+def latest_event_id():
+    return ChangeEvent.objects.aggregate(Max("id"))["id__max"] or 0
+
+
+def events_after(event_id, limit=EVENT_BATCH_SIZE):
+    refresh_connections()
+    return list(ChangeEvent.objects.filter(id__gt=event_id).order_by("id").values("id", "topic", "payload")[:limit])
+
+
+def format_event(event):
+    data = json.dumps(event["payload"], separators=(",", ":"))
+    return f"id: {event['id']}\nevent: {event['topic']}\ndata: {data}\n\n"
+
+
+class RecentIds:
+    """Remembers the last ``size`` ids seen; ``add`` says whether an id is new."""
+
+    def __init__(self, size=STREAM_QUEUE_SIZE):
+        self.order = deque()
+        self.ids = set()
+        self.size = size
+
+    def add(self, event_id):
+        if event_id in self.ids:
+            return False
+        self.order.append(event_id)
+        self.ids.add(event_id)
+        if len(self.order) > self.size:
+            self.ids.discard(self.order.popleft())
+        return True
+
+
+class EventBroker:
+    """Fans new ChangeEvent rows out to the live streams of this process.
+
+    One polling task serves every stream, so the database sees one indexed
+    query per interval however many terminals are connected. Writes made in
+    this process wake it at once; writes by other processes (job workers,
+    other server processes) arrive on the next poll. The task stops when
+    the last stream goes away.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.loop = None
+        self.task = None
+        self.wakeup = None
+        self.ready = None
+        self.last_id = 0
+
+    def subscribe(self):
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.loop is not loop:
+            self.loop = loop
+            self.wakeup = asyncio.Event()
+            self.ready = asyncio.Event()
+            self.subscribers = set()
+            self.task = loop.create_task(self.run())
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers and self.wakeup is not None:
+            self.wakeup.set()
+
+    def notify(self):
+        """Wake the poller; safe to call from any thread."""
+        loop = self.loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self.wakeup.set)
+        except RuntimeError:
+            pass  # the loop has closed
+
+    async def run(self):
+        interval = getattr(settings, "LIVE_EVENTS_POLL_INTERVAL", 1.0)
+        seen = RecentIds()
+        self.last_id = await sync_to_async(latest_event_id)()
+        # Events already in the re-read window predate every subscriber.
+        for event in await sync_to_async(events_after)(max(0, self.last_id - REREAD_WINDOW)):
+            seen.add(event["id"])
+            self.last_id = max(self.last_id, event["id"])
+        self.ready.set()
+        while self.subscribers:
+            self.wakeup.clear()
+            events = await sync_to_async(events_after)(max(0, self.last_id - REREAD_WINDOW))
+            for event in events:
+                self.last_id = max(self.last_id, event["id"])
+                if seen.add(event["id"]):
+                    self.deliver(event)
+            if len(events) < EVENT_BATCH_SIZE:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def deliver(self, event):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A stream this far behind is closed; the browser reconnects
+                # with Last-Event-ID and catches up from the table.
+                self.subscribers.discard(queue)
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+
+broker = EventBroker()
+
+
+def replay(last_event_id=None):
+    """The messages that open a stream, and the ids they carry.
+
+    They set the reconnect delay, then replay what was missed since
+    ``last_event_id``. More missed events than the backlog limit become one
+    ``reset`` event telling the client to reload everything; with no
+    ``last_event_id`` the client only learns where to resume from.
+    """
+    messages = [f"retry: {RECONNECT_DELAY_MS}\n\n"]
+    sent = RecentIds()
+    if last_event_id is None:
+        messages.append(f"id: {latest_event_id()}\n\n")
+        return messages, sent
+
+    backlog = events_after(last_event_id, EVENT_BACKLOG_LIMIT + 1)
+    if len(backlog) > EVENT_BACKLOG_LIMIT:
+        messages.append(f"id: {latest_event_id()}\nevent: reset\ndata: {{}}\n\n")
+        return messages, sent
+    for event in backlog:
+        sent.add(event["id"])
+        messages.append(format_event(event))
+    return messages, sent
+
+
+async def event_stream(last_event_id=None):
+    """Yield Server-Sent Events after ``last_event_id`` (or from now) as they are recorded.
+
+    The stream sends a comment every heartbeat so proxies keep it open, and
+    ends after LIVE_EVENTS_MAX_STREAM; the browser then reconnects with
+    Last-Event-ID and loses nothing.
+    """
+    heartbeat = getattr(settings, "LIVE_EVENTS_HEARTBEAT", 15)
+    max_stream = getattr(settings, "LIVE_EVENTS_MAX_STREAM", 10 * 60)
+    queue = broker.subscribe()
+    try:
+        await broker.ready.wait()
+        messages, sent = await sync_to_async(replay)(last_event_id)
+        yield "".join(messages)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_stream
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(queue.get(), min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event is None:
+                break
+            if sent.add(event["id"]):
+                yield format_event(event)
+    finally:
+        broker.unsubscribe(queue)
@@ -4,15 +4,34 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.lib import colors
-from reportlab.platypus import Table, TableStyle
-from reportlab.lib.utils import ImageReader
-from django.http import HttpResponse
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import Paragraph, Table, TableStyle
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, JsonResponse, QueryDict, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from datetime import datetime
+from django.urls import reverse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+import django
+import io
+import multiprocessing
 import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
 
 from django.conf import settings
 
+from .exporters import EXPORT_CONTENT_TYPES, EXPORT_EXTENSIONS, ExportError, export_stream, parse_since
+from .image_cache import print_images
+from .jobs import JobFailed, enqueue, output_path, set_progress
+from .metrics import pdf_pages, pdf_render_seconds
+from .pagination import PaginationError, parse_date_param
+from .pdf_cache import cached_path, cached_pdf_response, content_key, get_or_render
+
 
 class PatientFormPDFGenerator:
     PRIMARY_COLOR   = colors.HexColor("#0097A7")
@@ -33,6 +52,12 @@ class PatientFormPDFGenerator:
         self.current_y = self.height - self.top_margin
         self.page_number = 1
         self.first_page = True
+        self.started = time.perf_counter()
+
+    def save(self):
+        self.canvas.save()
+        pdf_render_seconds.observe(time.perf_counter() - self.started)
+        pdf_pages.observe(self.page_number - 1)
         
     def check_new_page(self, required_height):
         if self.current_y - required_height < self.bottom_margin:
@@ -72,20 +97,17 @@ class PatientFormPDFGenerator:
 
         logo_width = 22 * mm
         logo_height = 22 * mm
-        if hospital_logo_path and os.path.exists(hospital_logo_path):
-            try:
-                img = ImageReader(hospital_logo_path)
-                self.canvas.drawImage(
-                    img,
-                    self.margin,
-                    center_y - (logo_height / 2),
-                    width=logo_width,
-                    height=logo_height,
-                    preserveAspectRatio=True,
-                    mask='auto'
-                )
-            except:
-                pass
+        img = print_images.get(hospital_logo_path, logo_width, logo_height)
+        if img is not None:
+            self.canvas.drawImage(
+                img,
+                self.margin,
+                center_y - (logo_height / 2),
+                width=logo_width,
+                height=logo_height,
+                preserveAspectRatio=True,
+                mask='auto'
+            )
 
         text_x = self.margin + logo_width + 10 * mm
         self.canvas.setFillColor(colors.white)
@@ -117,20 +139,17 @@ class PatientFormPDFGenerator:
         self.canvas.setLineWidth(1)
         self.canvas.roundRect(photo_x, y, photo_size, photo_size, 3 * mm, fill=True, stroke=True)
 
-        if photo_path and os.path.exists(photo_path):
-            try:
-                img = ImageReader(photo_path)
-                self.canvas.drawImage(
-                    img,
-                    photo_x + 2 * mm,
-                    y + 2 * mm,
-                    width=photo_size - 4 * mm,
-                    height=photo_size - 4 * mm,
-                    preserveAspectRatio=True,
-                    mask='auto'
-                )
-            except:
-                self._draw_photo_placeholder(photo_x, y, photo_size, patient_name)
+        img = print_images.get(photo_path, photo_size - 4 * mm, photo_size - 4 * mm)
+        if img is not None:
+            self.canvas.drawImage(
+                img,
+                photo_x + 2 * mm,
+                y + 2 * mm,
+                width=photo_size - 4 * mm,
+                height=photo_size - 4 * mm,
+                preserveAspectRatio=True,
+                mask='auto'
+            )
         else:
             self._draw_photo_placeholder(photo_x, y, photo_size, patient_name)
 
@@ -182,47 +201,51 @@ class PatientFormPDFGenerator:
             col_widths = [(self.width - 2 * self.margin) / 2] * 2
         
         if wrap_col is not None:
-            from reportlab.platypus import Paragraph
-            from reportlab.lib.styles import getSampleStyleSheet
-            styles = getSampleStyleSheet()
-            style = styles['Normal']
-            style.fontSize = 9
-            style.fontName = 'Helvetica'
+            style = self._get_cell_style()
+            wrap_cols = wrap_col if isinstance(wrap_col, list) else [wrap_col]
             
-            processed_data = []
-            for i, row in enumerate(data):
+            processed_data = [list(data[0])]
+            for row in data[1:]:
                 new_row = list(row)
-                for col_idx in (wrap_col if isinstance(wrap_col, list) else [wrap_col]):
-                    if col_idx < len(new_row) and i > 0:
+                for col_idx in wrap_cols:
+                    if col_idx < len(new_row):
                         new_row[col_idx] = Paragraph(str(new_row[col_idx]), style)
                 processed_data.append(new_row)
             data = processed_data
         
-        header = data[0]
-        body_rows = data[1:]
+        # Every row is measured exactly once; chunks are then cut from the
+        # running height instead of re-wrapping a growing table per row.
+        row_heights = self._measure_rows(data, col_widths)
         
-        avg_row_height = 15 * mm 
+        header, header_height = data[0], row_heights[0]
         
         current_chunk = [header]
+        chunk_heights = [header_height]
+        chunk_height = header_height
         
-        for row in body_rows:
-            temp_table = Table(current_chunk + [row], colWidths=col_widths)
-            temp_table.setStyle(self._get_table_style(len(current_chunk)))
-            
-            table_width, table_height = temp_table.wrap(self.width - 2 * self.margin, self.height)
-            
-            if self.current_y - table_height < self.bottom_margin and len(current_chunk) > 1:
-                self._draw_table_chunk(current_chunk, col_widths)
+        for row, row_height in zip(data[1:], row_heights[1:]):
+            if self.current_y - (chunk_height + row_height) < self.bottom_margin and len(current_chunk) > 1:
+                self._draw_table_chunk(current_chunk, col_widths, chunk_heights)
                 current_chunk = [header, row]
+                chunk_heights = [header_height, row_height]
+                chunk_height = header_height + row_height
             else:
                 current_chunk.append(row)
+                chunk_heights.append(row_height)
+                chunk_height += row_height
         
         if len(current_chunk) > 1:
-            self._draw_table_chunk(current_chunk, col_widths)
+            self._draw_table_chunk(current_chunk, col_widths, chunk_heights)
     
-    def _draw_table_chunk(self, data, col_widths):
+    def _measure_rows(self, data, col_widths):
         table = Table(data, colWidths=col_widths)
         table.setStyle(self._get_table_style(len(data)))
+        table.wrap(self.width - 2 * self.margin, self.height)
+        return list(table._rowHeights)
+    
+    def _draw_table_chunk(self, data, col_widths, row_heights=None):
+        table = Table(data, colWidths=col_widths, rowHeights=row_heights)
+        table.setStyle(self._get_table_style(len(data)))
         
         table_width, table_height = table.wrap(self.width - 2 * self.margin, self.height)
         
@@ -232,22 +255,36 @@ class PatientFormPDFGenerator:
         table.drawOn(self.canvas, self.margin, self.current_y - table_height)
         self.current_y -= (table_height + 5 * mm)
     
+    _cell_style = None
+    _table_style = None
+    
+    @classmethod
+    def _get_cell_style(cls):
+        if cls._cell_style is None:
+            cls._cell_style = ParagraphStyle(
+                "InfoTableCell", parent=getSampleStyleSheet()["Normal"], fontName="Helvetica", fontSize=9
+            )
+        return cls._cell_style
+    
     def _get_table_style(self, num_rows):
-        return TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), self.PRIMARY_COLOR),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 10),
-            ('ALIGN', (0, 0), (-1, 0), 'LEFT'),
-            ('PADDING', (0, 0), (-1, 0), 8),
-            ('FONT', (0, 1), (-1, -1), 'Helvetica', 9),
-            ('TEXTCOLOR', (0, 1), (-1, -1), self.TEXT_DARK),
-            ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
-            ('PADDING', (0, 1), (-1, -1), 6),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, self.ALT_ROW_BG]),
-            ('GRID', (0, 0), (-1, -1), 0.5, self.BORDER_COLOR),
-            ('BOX', (0, 0), (-1, -1), 1, self.BORDER_COLOR),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ])
+        cls = type(self)
+        if cls._table_style is None:
+            cls._table_style = TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), self.PRIMARY_COLOR),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+                ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 10),
+                ('ALIGN', (0, 0), (-1, 0), 'LEFT'),
+                ('PADDING', (0, 0), (-1, 0), 8),
+                ('FONT', (0, 1), (-1, -1), 'Helvetica', 9),
+                ('TEXTCOLOR', (0, 1), (-1, -1), self.TEXT_DARK),
+                ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
+                ('PADDING', (0, 1), (-1, -1), 6),
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, self.ALT_ROW_BG]),
+                ('GRID', (0, 0), (-1, -1), 0.5, self.BORDER_COLOR),
+                ('BOX', (0, 0), (-1, -1), 1, self.BORDER_COLOR),
+                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ])
+        return cls._table_style
         
     def draw_text_area(self, title, content, height=30 * mm):
         title_height = 5 * mm
@@ -314,29 +351,48 @@ class PatientFormPDFGenerator:
                                    f"Generated: {timestamp}")
 
 
-def export_archived_pdf(request, archive_id):
-    archive = get_object_or_404(PatientComplaintArchive, pk=archive_id)
-    
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = f'attachment; filename="patient_archive_{archive_id}.pdf"'
-    
-    pdf = PatientFormPDFGenerator(response)
-    
-    pdf.draw_header(
-        "Crown Med Asia",
-        hospital_logo_path=r"C:\Users\buddy\OneDrive\Desktop\JAY-AR\PatientManagement\PM_App\Logo.png"
-    )
+HOSPITAL_NAME = "Crown Med Asia"
+
+
+def hospital_logo_path():
+    return str(getattr(settings, "HOSPITAL_LOGO_PATH", settings.BASE_DIR / "PM_App" / "Logo.png"))
+
+
+ARCHIVE_PDF_FIELDS = (
+    "patient_id", "firstname", "middlename", "lastname", "address", "birthdate", "age", "gender",
+    "contact_number", "blood_pressure", "weight", "height", "profile_image", "chief_complaint",
+    "lab_examination", "test_result", "final_diagnosis", "treatment", "date_created",
+)
+
+PATIENT_PDF_FIELDS = (
+    "patient_id", "firstname", "middlename", "lastname", "address", "birthdate", "age", "gender",
+    "contact_number", "blood_pressure", "weight", "height",
+)
+
+COMPLAINT_PDF_FIELDS = ("chief_complaint", "lab_examination", "test_result", "final_diagnosis", "treatment")
+
+
+def archive_photo_path(archive):
+    if archive.profile_image:
+        return os.path.join(settings.BASE_DIR, archive.profile_image.lstrip("/"))
+    return None
+
+
+def patient_photo_path(patient):
+    if patient.profile_image:
+        return patient.profile_image.path
+    return None
+
+
+def draw_archived_record(pdf, archive):
+    pdf.draw_header(HOSPITAL_NAME, hospital_logo_path=hospital_logo_path())
     
     patient_full_name = f"{archive.firstname} {archive.middlename or ''} {archive.lastname}".strip().replace('  ', ' ')
     
-    photo_path = None
-    if archive.profile_image:
-        photo_path = os.path.join(settings.BASE_DIR, archive.profile_image.lstrip("/"))
-    
     pdf.draw_patient_info_header(
         patient_name=patient_full_name,
         patient_id=str(archive.patient_id),
-        photo_path=photo_path
+        photo_path=archive_photo_path(archive)
     )
     
     pdf.draw_section_header("Personal Information")
@@ -369,37 +425,17 @@ def export_archived_pdf(request, archive_id):
         ['Treatment', archive.treatment or 'N/A'],
     ]
     pdf.draw_info_table(complaint_data, wrap_col=1)
-    
-    pdf.finish_page()
-    pdf.canvas.save()
-    
-    return response
 
 
-def export_complaint_pdf(request, complaint_id):
-    complaint = get_object_or_404(Complaint, pk=complaint_id)
-    patient = complaint.patient
-    
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = f'attachment; filename="patient_complaint_{complaint_id}.pdf"'
-    
-    pdf = PatientFormPDFGenerator(response)
-    
-    pdf.draw_header(
-        "Crown Med Asia",
-        hospital_logo_path=r"C:\Users\buddy\OneDrive\Desktop\JAY-AR\PatientManagement\PM_App\Logo.png"
-    )
+def draw_complaint_record(pdf, complaint, patient):
+    pdf.draw_header(HOSPITAL_NAME, hospital_logo_path=hospital_logo_path())
     
     patient_full_name = f"{patient.firstname} {patient.middlename or ''} {patient.lastname}".strip().replace('  ', ' ')
     
-    photo_path = None
-    if patient.profile_image:
-        photo_path = patient.profile_image.path
-    
     pdf.draw_patient_info_header(
         patient_name=patient_full_name,
         patient_id=str(patient.patient_id),
-        photo_path=photo_path
+        photo_path=patient_photo_path(patient)
     )
     
     pdf.draw_section_header("Personal Information")
@@ -432,8 +468,391 @@ def export_complaint_pdf(request, complaint_id):
         ['Treatment', complaint.treatment or 'N/A'],
     ]
     pdf.draw_info_table(complaint_data, wrap_col=1)
-    
+
+
+def render_archived_pdf(archive, output):
+    pdf = PatientFormPDFGenerator(output)
+    draw_archived_record(pdf, archive)
     pdf.finish_page()
-    pdf.canvas.save()
-    
-    return response
\ No newline at end of file
+    pdf.save()
+
+
+def render_complaint_pdf(complaint, patient, output):
+    pdf = PatientFormPDFGenerator(output)
+    draw_complaint_record(pdf, complaint, patient)
+    pdf.finish_page()
+    pdf.save()
+
+
+def archive_pdf_key(archive):
+    return content_key(
+        "archive",
+        {field: getattr(archive, field) for field in ARCHIVE_PDF_FIELDS},
+        files=[archive_photo_path(archive), hospital_logo_path()],
+    )
+
+
+def complaint_pdf_key(complaint, patient):
+    return content_key(
+        "complaint",
+        {
+            "patient": {field: getattr(patient, field) for field in PATIENT_PDF_FIELDS},
+            "complaint": {field: getattr(complaint, field) for field in COMPLAINT_PDF_FIELDS},
+        },
+        files=[patient_photo_path(patient), hospital_logo_path()],
+    )
+
+
+def export_archived_pdf(request, archive_id):
+    archive = get_object_or_404(PatientComplaintArchive, pk=archive_id)
+    return cached_pdf_response(
+        request, archive_pdf_key(archive), f"patient_archive_{archive_id}.pdf",
+        lambda output: render_archived_pdf(archive, output),
+    )
+
+
+def export_complaint_pdf(request, complaint_id):
+    complaint = get_object_or_404(Complaint.objects.select_related("patient"), pk=complaint_id)
+    patient = complaint.patient
+    return cached_pdf_response(
+        request, complaint_pdf_key(complaint, patient), f"patient_complaint_{complaint_id}.pdf",
+        lambda output: render_complaint_pdf(complaint, patient, output),
+    )
+
+
+BATCH_MAX_RECORDS = 1000
+BATCH_POOL_MIN_RECORDS = 4
+
+
+class BatchExportError(ValueError):
+    pass
+
+
+def _id_list(params, name):
+    ids = []
+    for raw in params.getlist(name):
+        for part in raw.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if not part.isdigit():
+                raise BatchExportError(f"{name} must be a comma-separated list of ids")
+            ids.append(int(part))
+    return ids
+
+
+def collect_batch_records(params):
+    """Resolve the request parameters to an ordered list of ``(kind, record)`` pairs."""
+    records = []
+
+    complaint_ids = _id_list(params, "complaint_ids")
+    if complaint_ids:
+        found = Complaint.objects.select_related("patient").in_bulk(complaint_ids)
+        records += [("complaint", found[pk]) for pk in complaint_ids if pk in found]
+
+    patient_id = (params.get("patient_id") or "").strip()
+    if patient_id:
+        history = Complaint.objects.select_related("patient").filter(
+            patient__patient_id=patient_id
+        ).order_by("date_created", "id")
+        records += [("complaint", c) for c in history[:BATCH_MAX_RECORDS + 1]]
+
+    archive_ids = _id_list(params, "archive_ids")
+    if archive_ids:
+        found = PatientComplaintArchive.objects.in_bulk(archive_ids)
+        records += [("archive", found[pk]) for pk in archive_ids if pk in found]
+
+    if params.get("date_from") or params.get("date_to"):
+        try:
+            date_from = parse_date_param(params, "date_from")
+            date_to = parse_date_param(params, "date_to")
+        except PaginationError as e:
+            raise BatchExportError(str(e))
+        archives = PatientComplaintArchive.objects.all()
+        if date_from:
+            archives = archives.filter(date_created__gte=date_from)
+        if date_to:
+            archives = archives.filter(date_created__lt=date_to + timedelta(days=1))
+        archives = archives.order_by("date_created", "id")
+        records += [("archive", a) for a in archives[:BATCH_MAX_RECORDS + 1]]
+
+    if not records:
+        raise BatchExportError("No records matched the request")
+    if len(records) > BATCH_MAX_RECORDS:
+        raise BatchExportError(f"A batch is limited to {BATCH_MAX_RECORDS} records")
+    return records
+
+
+def record_pdf_key(kind, record):
+    if kind == "archive":
+        return archive_pdf_key(record)
+    return complaint_pdf_key(record, record.patient)
+
+
+def record_filename(kind, record):
+    if kind == "archive":
+        return f"{record.patient_id}/patient_archive_{record.pk}.pdf"
+    return f"{record.patient.patient_id}/patient_complaint_{record.pk}.pdf"
+
+
+def record_title(kind, record):
+    if kind == "archive":
+        return f"{record.patient_id} - archived complaint #{record.pk}"
+    return f"{record.patient.patient_id} - complaint #{record.pk}"
+
+
+def render_record_pdf(kind, record):
+    output = io.BytesIO()
+    if kind == "archive":
+        render_archived_pdf(record, output)
+    else:
+        render_complaint_pdf(record, record.patient, output)
+    return output.getvalue()
+
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def pdf_worker_pool(replace=None):
+    """The process pool every batch export shares, started on first use.
+
+    Pass the pool back as ``replace`` after it broke (a worker died) to get
+    a fresh one.
+    """
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None and _pdf_pool is replace:
+            _pdf_pool.shutdown(wait=False, cancel_futures=True)
+            _pdf_pool = None
+        if _pdf_pool is None:
+            # forkserver/spawn children start without the parent's open database
+            # connections; workers only receive already-loaded model instances.
+            # django.setup must run before this module (and the models) is unpickled.
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            workers = getattr(settings, "PDF_EXPORT_WORKERS", None) or os.cpu_count()
+            _pdf_pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup)
+        return _pdf_pool
+
+
+def submit_renders(records, indices):
+    pool = pdf_worker_pool()
+    try:
+        return {i: pool.submit(render_record_pdf, *records[i]) for i in indices}
+    except BrokenProcessPool:
+        pool = pdf_worker_pool(replace=pool)
+        return {i: pool.submit(render_record_pdf, *records[i]) for i in indices}
+
+
+class BatchProgress:
+    """Where a batch render reports how far it got; direct downloads report nowhere."""
+
+    def __init__(self, total):
+        self.total = total
+        self.update(0)
+
+    def update(self, done, status="running"):
+        pass
+
+    def finish(self):
+        self.update(self.total, "done")
+
+    def fail(self, done):
+        self.update(done, "failed")
+
+
+class JobProgress(BatchProgress):
+    """BatchProgress that reports into the background Job row, where its owner can poll it."""
+
+    def __init__(self, job, total):
+        self.job = job
+        super().__init__(total)
+
+    def update(self, done, status="running"):
+        set_progress(self.job, done, self.total)
+
+
+def rendered_record_paths(records, progress):
+    """Yield ``(kind, record, cached_pdf_path)`` in order.
+
+    Records already in the PDF cache are read straight from disk; the rest
+    are rendered in the shared process pool when there are enough of them
+    to be worth shipping to other processes.
+    """
+    keys = [record_pdf_key(kind, record) for kind, record in records]
+    missing = [i for i, key in enumerate(keys) if cached_path(key) is None]
+
+    futures = {}
+    if len(missing) >= BATCH_POOL_MIN_RECORDS:
+        futures = submit_renders(records, missing)
+
+    done = 0
+    try:
+        for i, ((kind, record), key) in enumerate(zip(records, keys)):
+            if i in futures:
+                data = futures.pop(i).result()
+                render = lambda output, data=data: output.write(data)
+            else:
+                render = lambda output, kind=kind, record=record: output.write(render_record_pdf(kind, record))
+            yield kind, record, get_or_render(key, render)
+            done = i + 1
+            progress.update(done)
+        progress.finish()
+    except BaseException:
+        progress.fail(done)
+        raise
+    finally:
+        # A download cut short leaves the pool free for the next one.
+        for future in futures.values():
+            future.cancel()
+
+
+class _ZipStream:
+    """Write-only, unseekable sink so ZipFile emits data descriptors we can stream."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip(records, progress):
+    sink = _ZipStream()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for kind, record, path in rendered_record_paths(records, progress):
+            with archive.open(record_filename(kind, record), mode="w") as entry, open(path, "rb") as pdf_file:
+                shutil.copyfileobj(pdf_file, entry)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def render_merged_pdf(records, output, progress):
+    pdf = PatientFormPDFGenerator(output)
+    done = 0
+    try:
+        for kind, record in records:
+            if done:
+                pdf.finish_page()
+            bookmark = f"record-{done}"
+            pdf.canvas.bookmarkPage(bookmark)
+            pdf.canvas.addOutlineEntry(record_title(kind, record), bookmark, level=0)
+            if kind == "archive":
+                draw_archived_record(pdf, record)
+            else:
+                draw_complaint_record(pdf, record, record.patient)
+            done += 1
+            progress.update(done)
+        pdf.finish_page()
+        pdf.save()
+    except BaseException:
+        progress.fail(done)
+        raise
+    progress.finish()
+
+
+@login_required
+def export_batch_pdf(request):
+    params = request.POST if request.method == "POST" else request.GET
+    output_format = params.get("format") or "pdf"
+    if output_format not in ("pdf", "zip"):
+        return JsonResponse({"error": "format must be 'pdf' or 'zip'"}, status=400)
+
+    try:
+        records = collect_batch_records(params)
+    except BatchExportError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    if params.get("async") == "1":
+        query = params.copy()
+        for name in ("async", "csrfmiddlewaretoken"):
+            query.pop(name, None)
+        job = enqueue("pdf.batch", {"query": query.urlencode(), "format": output_format}, user=request.user)
+        return JsonResponse({
+            "job": job.pk, "total": len(records), "status_url": reverse("job_status", args=[job.pk]),
+            "progress_url": reverse("export_batch_progress", args=[job.pk]),
+        }, status=202)
+
+    # Progress is only tracked for background exports (async=1), on the
+    # job row its owner polls; a direct download has nobody to report to.
+    progress = BatchProgress(len(records))
+
+    if output_format == "zip":
+        response = StreamingHttpResponse(stream_zip(records, progress), content_type="application/zip")
+        response["Content-Disposition"] = 'attachment; filename="patient_records.zip"'
+        return response
+
+    output = tempfile.TemporaryFile()
+    render_merged_pdf(records, output, progress)
+    output.seek(0)
+    return FileResponse(output, as_attachment=True, filename="patient_records.pdf", content_type="application/pdf")
+
+
+def run_batch_export_job(job):
+    """Job handler: write a batch export to the job output directory."""
+    output_format = job.payload.get("format", "pdf")
+    try:
+        records = collect_batch_records(QueryDict(job.payload.get("query", "")))
+    except BatchExportError as e:
+        raise JobFailed(str(e)) from e
+
+    progress = JobProgress(job, len(records))
+    path = output_path(job, output_format)
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        with open(tmp_path, "wb") as output:
+            if output_format == "zip":
+                for chunk in stream_zip(records, progress):
+                    output.write(chunk)
+            else:
+                render_merged_pdf(records, output, progress)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    return {
+        "file": path.name,
+        "filename": f"patient_records.{output_format}",
+        "content_type": "application/zip" if output_format == "zip" else "application/pdf",
+        "records": len(records),
+    }
+
+
+@login_required
+def export_batch_progress(request, job):
+    jobs = Job.objects.filter(pk=job, kind="pdf.batch", created_by=request.user)
+    state = jobs.values("status", "done", "total").first()
+    if state is None:
+        return JsonResponse({"error": "Unknown job"}, status=404)
+    return JsonResponse(state)
+
+
+@login_required
+def export_records(request, dataset):
+    output_format = request.GET.get("format") or "csv"
+    since_id = request.GET.get("since_id")
+    try:
+        if since_id not in (None, "") and not since_id.isdigit():
+            raise ExportError("since_id must be an integer")
+        chunks = export_stream(
+            dataset, output_format,
+            since=parse_since(request.GET.get("since")),
+            since_id=int(since_id) if since_id else None,
+        )
+    except ExportError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    response = StreamingHttpResponse(chunks, content_type=EXPORT_CONTENT_TYPES[output_format])
+    response["Content-Disposition"] = f'attachment; filename="{dataset}.{EXPORT_EXTENSIONS[output_format]}"'
+    return response
@@ -0,0 +1,175 @@
+import csv
+import io
+import json
+from datetime import datetime, time
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Complaint, Patient, PatientComplaintArchive
+
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ("csv", "ndjson", "columnar")
+EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "columnar": "application/x-ndjson",
+}
+EXPORT_EXTENSIONS = {"csv": "csv", "ndjson": "ndjson", "columnar": "columns.jsonl"}
+
+PATIENT_EXPORT_FIELDS = (
+    "id", "patient_id", "firstname", "middlename", "lastname", "address", "birthdate", "age",
+    "gender", "contact_number", "blood_pressure", "weight", "height",
+)
+COMPLAINT_EXPORT_FIELDS = (
+    "id", "patient_code", "chief_complaint", "lab_examination", "test_result",
+    "final_diagnosis", "treatment", "date_created",
+)
+ARCHIVE_EXPORT_FIELDS = (
+    "id", "complaint_id", "patient_id", "firstname", "middlename", "lastname", "address", "birthdate",
+    "age", "gender", "contact_number", "blood_pressure", "weight", "height", "chief_complaint",
+    "lab_examination", "test_result", "final_diagnosis", "treatment", "date_created",
+)
+
+# dataset -> (model, exported columns, columns that read from another lookup)
+EXPORT_DATASETS = {
+    "patients": (Patient, PATIENT_EXPORT_FIELDS, {}),
+    "complaints": (Complaint, COMPLAINT_EXPORT_FIELDS, {"patient_code": F("patient__patient_id")}),
+    "archives": (PatientComplaintArchive, ARCHIVE_EXPORT_FIELDS, {}),
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def parse_since(value):
+    """Parse an ISO date or datetime; a bare date means from the start of that day."""
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            parsed = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ExportError("since must be an ISO date or datetime")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def export_rows(dataset, since=None, since_id=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Return ``(columns, rows)`` for a dataset, streamed in id order through a server-side cursor.
+
+    ``since`` keeps rows created after that moment and ``since_id`` rows
+    with a larger id, so a nightly extract can resume from the previous
+    run's last id.
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise ExportError(f"dataset must be one of {', '.join(EXPORT_DATASETS)}")
+    model, columns, lookups = EXPORT_DATASETS[dataset]
+
+    queryset = model.objects.all()
+    if since is not None:
+        if "date_created" not in columns:
+            raise ExportError(f"{dataset} have no date_created; use since_id")
+        queryset = queryset.filter(date_created__gt=since)
+    if since_id is not None:
+        queryset = queryset.filter(id__gt=since_id)
+
+    plain = [name for name in columns if name not in lookups]
+    rows = queryset.order_by("id").values(*plain, **lookups).iterator(chunk_size=chunk_size)
+    return columns, rows
+
+
+def _chunks(rows, size):
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def stream_csv(columns, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in _chunks(rows, chunk_size):
+        writer.writerows([[_csv_value(row[name]) for name in columns] for row in chunk])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def stream_ndjson(columns, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    for chunk in _chunks(rows, chunk_size):
+        yield "".join(encoder.encode({name: row[name] for name in columns}) + "\n" for row in chunk).encode()
+
+
+def stream_columnar(columns, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Column-oriented JSON lines: a schema line, then one line per row group.
+
+    Each row group holds one array per column, so repeated keys are written
+    once per group instead of once per row and each column compresses well.
+    """
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    yield (encoder.encode({"format": "columnar", "version": 1, "columns": list(columns)}) + "\n").encode()
+    for chunk in _chunks(rows, chunk_size):
+        group = {"rows": len(chunk), "columns": {name: [row[name] for row in chunk] for name in columns}}
+        yield (encoder.encode(group) + "\n").encode()
+
+
+EXPORT_WRITERS = {"csv": stream_csv, "ndjson": stream_ndjson, "columnar": stream_columnar}
+
+
+def export_stream(dataset, fmt, since=None, since_id=None, chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    """Return a generator of encoded byte chunks.
+
+    ``progress``, if given, is an ExportProgress that counts the rows and
+    remembers the last id written.
+    """
+    if fmt not in EXPORT_WRITERS:
+        raise ExportError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    columns, rows = export_rows(dataset, since=since, since_id=since_id, chunk_size=chunk_size)
+    if progress is not None:
+        rows = progress.track(rows)
+    return EXPORT_WRITERS[fmt](columns, rows, chunk_size)
+
+
+class ExportProgress:
+    def __init__(self):
+        self.rows = 0
+        self.last_id = None
+
+    def track(self, rows):
+        for row in rows:
+            self.rows += 1
+            self.last_id = row["id"]
+            yield row
+
+
+def read_columnar(lines):
+    """Turn a columnar export back into row dicts (for consumers and tests)."""
+    lines = iter(lines)
+    columns = json.loads(next(lines))["columns"]
+    for line in lines:
+        group = json.loads(line)["columns"]
+        for values in zip(*(group[name] for name in columns)):
+            yield dict(zip(columns, values))
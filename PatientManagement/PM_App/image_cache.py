@@ -0,0 +1,96 @@
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from PIL import Image, ImageOps
+from reportlab.lib.utils import ImageReader
+
+
+DEFAULT_PDF_IMAGE_DPI = 150
+DEFAULT_PDF_IMAGE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+
+class PrintImageCache:
+    """Process-wide LRU of decoded images, pre-scaled to the size they are printed at.
+
+    Entries are keyed on ``(path, mtime, target pixel size)`` so an edited file
+    is decoded again, and the cache is bounded by the decoded pixel bytes.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def max_bytes(self):
+        return getattr(settings, "PDF_IMAGE_CACHE_MAX_BYTES", DEFAULT_PDF_IMAGE_CACHE_MAX_BYTES)
+
+    def target_pixels(self, width, height):
+        dpi = getattr(settings, "PDF_IMAGE_DPI", DEFAULT_PDF_IMAGE_DPI)
+        return max(1, round(width / 72 * dpi)), max(1, round(height / 72 * dpi))
+
+    def get(self, path, width, height):
+        """Return an ImageReader for ``path`` scaled to fit ``width`` x ``height`` points, or None."""
+        if not path:
+            return None
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+        size = self.target_pixels(width, height)
+        key = (os.path.abspath(path), mtime, size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        try:
+            image = self._load(path, size)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            return None
+
+        nbytes = image.width * image.height * len(image.getbands())
+        reader = ImageReader(image)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (reader, nbytes)
+                self._bytes += nbytes
+                self._evict()
+        return reader
+
+    def _load(self, path, size):
+        with Image.open(path) as source:
+            # JPEG can decode straight at a reduced scale, skipping most of the
+            # work for multi-megapixel phone photos.
+            source.draft("RGB", size)
+            image = ImageOps.exif_transpose(source)
+            image.thumbnail(size, Image.LANCZOS)
+            has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+            return image.convert("RGBA" if has_alpha else "RGB")
+
+    def _evict(self):
+        limit = self.max_bytes()
+        while self._bytes > limit and len(self._entries) > 1:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self._bytes -= nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+
+print_images = PrintImageCache()
@@ -0,0 +1,117 @@
+import hashlib
+import io
+
+from django.apps import apps
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from .jobs import JobFailed, enqueue, stage_upload
+
+
+ORIGINAL_MAX_SIZE = (2048, 2048)
+RENDITION_SIZES = {
+    "medium": (480, 480),
+    "thumb": (128, 128),
+}
+RENDITION_FORMAT, RENDITION_EXT = ("WEBP", "webp") if features.check("webp") else ("JPEG", "jpg")
+ORIGINAL_SUFFIX = "-original.jpg"
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def _flatten(image):
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image.convert("RGBA"), mask=image.convert("RGBA").getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def ingest_image(upload, folder):
+    """Store an uploaded photo as an EXIF-free JPEG plus medium and thumbnail renditions.
+
+    Files land at ``<folder>/<content hash>-{original.jpg,medium.*,thumb.*}``,
+    so the same picture always maps to the same names and a new picture gets
+    new, cache-safe URLs. Returns the storage name of the original.
+    """
+    try:
+        with Image.open(upload) as source:
+            source.draft("RGB", ORIGINAL_MAX_SIZE)
+            image = _flatten(source)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise InvalidImage("Uploaded file is not a supported image") from e
+
+    image.thumbnail(ORIGINAL_MAX_SIZE, Image.LANCZOS)
+    original = _encode(image, "JPEG", quality=85, optimize=True, progressive=True)
+
+    stem = f"{folder.rstrip('/')}/{hashlib.sha256(original).hexdigest()[:20]}"
+    original_name = stem + ORIGINAL_SUFFIX
+    if default_storage.exists(original_name):
+        return original_name
+
+    for rendition, size in RENDITION_SIZES.items():
+        copy = image.copy()
+        copy.thumbnail(size, Image.LANCZOS)
+        data = _encode(copy, RENDITION_FORMAT, quality=80)
+        name = rendition_name(original_name, rendition)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        default_storage.save(name, ContentFile(data))
+
+    # The original is written last: its presence marks the set as complete.
+    default_storage.save(original_name, ContentFile(original))
+    return original_name
+
+
+def rendition_name(name, rendition):
+    """Storage name of ``rendition`` for an ingested original, or None for legacy uploads."""
+    if not name or not str(name).endswith(ORIGINAL_SUFFIX):
+        return None
+    return f"{str(name)[:-len(ORIGINAL_SUFFIX)]}-{rendition}.{RENDITION_EXT}"
+
+
+def rendition_url(name, rendition):
+    """URL of the rendition, falling back to the stored file itself for legacy uploads."""
+    if not name:
+        return None
+    return default_storage.url(rendition_name(name, rendition) or str(name))
+
+
+def queue_ingest(instance, field, upload, folder, user=None):
+    """Stage ``upload`` as-is and leave the re-encoding to a background worker.
+
+    The worker sets ``instance.<field>`` to the ingested original once done.
+    """
+    staged = stage_upload(upload)
+    payload = {"model": instance._meta.label, "pk": instance.pk, "field": field, "upload": staged, "folder": folder}
+    return enqueue("image.ingest", payload, user=user)
+
+
+def run_ingest_job(job):
+    payload = job.payload
+    try:
+        with default_storage.open(payload["upload"]) as upload:
+            name = ingest_image(upload, payload["folder"])
+    except FileNotFoundError as e:
+        raise JobFailed("Staged upload is missing") from e
+    except InvalidImage as e:
+        default_storage.delete(payload["upload"])
+        raise JobFailed(str(e)) from e
+
+    instance = apps.get_model(payload["model"]).objects.filter(pk=payload["pk"]).first()
+    if instance is not None:
+        setattr(instance, payload["field"], name)
+        instance.save(update_fields=[payload["field"]])
+    default_storage.delete(payload["upload"])
+    return {"name": name}
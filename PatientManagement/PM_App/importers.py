@@ -0,0 +1,285 @@
+import csv
+import io
+import json
+import time
+from datetime import date
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+
+from .events import publish
+from .jobs import JobFailed, save_checkpoint, set_progress
+from .metrics import patients_created
+from .models import IdSequence, Patient
+from .response_cache import invalidate
+
+
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 200
+
+IMPORT_FIELDS = (
+    "patient_id", "firstname", "middlename", "lastname", "address", "birthdate", "age",
+    "gender", "contact_number", "blood_pressure", "weight", "height",
+)
+IMPORT_FORMATS = ("csv", "jsonl")
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def detect_format(filename, default="csv"):
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    if name.endswith(".csv"):
+        return "csv"
+    return default
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row_dict)`` from a binary CSV or JSON-lines stream."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        if not reader.fieldnames:
+            return
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == "jsonl":
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_number, None
+                continue
+            yield line_number, row if isinstance(row, dict) else None
+    else:
+        raise ImportFormatError(f"format must be one of {', '.join(IMPORT_FORMATS)}")
+
+
+def age_on(birthdate, today=None):
+    today = today or date.today()
+    return today.year - birthdate.year - ((today.month, today.day) < (birthdate.month, birthdate.day))
+
+
+def clean_row(row):
+    """Validate one row against the Patient field definitions without touching the database."""
+    if row is None:
+        raise ValidationError("Row is not a JSON object")
+
+    cleaned = {}
+    errors = {}
+    for name in IMPORT_FIELDS:
+        field = Patient._meta.get_field(name)
+        value = row.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in ("", None):
+            if name == "patient_id" or (name == "age" and row.get("birthdate")):
+                continue
+            value = None if field.null else ""
+        try:
+            cleaned[name] = field.clean(value, None)
+        except ValidationError as e:
+            errors[name] = e.messages
+
+    if errors:
+        raise ValidationError(errors)
+    if cleaned.get("age") is None:
+        cleaned["age"] = age_on(cleaned["birthdate"])
+    return cleaned
+
+
+def format_errors(error):
+    if hasattr(error, "message_dict"):
+        return "; ".join(f"{field}: {' '.join(messages)}" for field, messages in error.message_dict.items())
+    return " ".join(error.messages)
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.error_count = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def restore(self, state):
+        """Carry on from the counts of an interrupted run, as saved by ``as_dict``."""
+        self.rows = state["rows"]
+        self.imported = state["imported"]
+        self.error_count = state["failed"]
+        self.errors = list(state["errors"])
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "failed": self.error_count,
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+class PatientImporter:
+    """Validate rows and insert them with bulk_create, one transaction per batch.
+
+    Rows without a ``patient_id`` get one from a single block allocation per
+    batch; supplied ids are kept, and the patient id sequence is moved past
+    any that use the generated format so later allocations do not collide.
+
+    ``checkpoint(report)`` runs inside each batch's transaction, so a record
+    of how far the import got commits together with the batch itself.
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, dry_run=False, on_batch=None, checkpoint=None):
+        self.batch_size = max(1, batch_size)
+        self.dry_run = dry_run
+        self.on_batch = on_batch
+        self.checkpoint = checkpoint
+        self.report = ImportReport()
+        self.seen_ids = set()
+
+    def run(self, rows):
+        batch = []
+        for line, row in rows:
+            self.report.rows += 1
+            try:
+                batch.append((line, clean_row(row)))
+            except ValidationError as e:
+                self.report.add_error(line, format_errors(e))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+        self.report.finish()
+        return self.report
+
+    def flush(self, batch):
+        batch = self.drop_duplicate_ids(batch)
+        try:
+            with transaction.atomic():
+                if batch and not self.dry_run:
+                    self.insert(batch)
+                self.report.imported += len(batch)
+                if self.checkpoint:
+                    self.checkpoint(self.report)
+        except IntegrityError:
+            self.seen_ids.difference_update(row["patient_id"] for _, row in batch if row.get("patient_id"))
+            self.insert_row_by_row(batch)
+        if self.on_batch:
+            self.on_batch(self.report)
+
+    def insert_row_by_row(self, batch):
+        """Retry a batch the database rejected, one savepoint per row, so only the offending rows are reported."""
+        with transaction.atomic():
+            inserted = []
+            for line, row in batch:
+                try:
+                    with transaction.atomic():
+                        inserted += self.insert([(line, row)], announce=False)
+                except IntegrityError as e:
+                    self.report.add_error(line, f"Rejected by the database: {e}")
+                    continue
+                self.report.imported += 1
+                if row.get("patient_id"):
+                    self.seen_ids.add(row["patient_id"])
+            if inserted:
+                self.announce(inserted)
+            if self.checkpoint:
+                self.checkpoint(self.report)
+
+    def drop_duplicate_ids(self, batch):
+        supplied = {row["patient_id"] for _, row in batch if row.get("patient_id")}
+        existing = set(Patient.objects.filter(patient_id__in=supplied).values_list("patient_id", flat=True))
+        kept = []
+        for line, row in batch:
+            patient_id = row.get("patient_id")
+            if patient_id and (patient_id in existing or patient_id in self.seen_ids):
+                self.report.add_error(line, f"patient_id: {patient_id} already exists")
+                continue
+            if patient_id:
+                self.seen_ids.add(patient_id)
+            kept.append((line, row))
+        return kept
+
+    def insert(self, batch, announce=True):
+        # Copies: a rejected batch is retried from the rows as they were read.
+        rows = [dict(row) for _, row in batch]
+        missing = [row for row in rows if not row.get("patient_id")]
+        if missing:
+            for row, patient_id in zip(missing, Patient.allocate_patient_ids(len(missing))):
+                row["patient_id"] = patient_id
+
+        highest = max(
+            (number for number in map(Patient.patient_number, (row["patient_id"] for row in rows)) if number),
+            default=0,
+        )
+        if highest:
+            IdSequence.raise_to(Patient.PATIENT_ID_SEQUENCE, highest, seed=Patient.highest_patient_number)
+
+        change_seqs = Patient.allocate_change_seqs(len(rows))
+        for row, change_seq in zip(rows, change_seqs):
+            row["change_seq"] = change_seq
+
+        Patient.objects.bulk_create([Patient(**row) for row in rows], batch_size=self.batch_size)
+        if announce:
+            self.announce(rows)
+        return rows
+
+    def announce(self, rows):
+        # bulk_create sends no post_save, so retire cached patient listings
+        # and tell live dashboards here.
+        invalidate("patients")
+        publish("patient", action="imported", count=len(rows), change_seq=max(row["change_seq"] for row in rows))
+        transaction.on_commit(lambda: patients_created.inc(len(rows)))
+
+
+def import_patients(stream, fmt, **options):
+    return PatientImporter(**options).run(read_rows(stream, fmt))
+
+
+def run_import_job(job):
+    """Job handler: import a file staged by the upload endpoint.
+
+    Each committed batch saves a checkpoint on the job, so a retry skips the
+    rows already imported instead of inserting them again under new ids.
+    """
+    payload = job.payload
+    importer = PatientImporter(
+        batch_size=payload.get("batch_size", IMPORT_BATCH_SIZE),
+        dry_run=payload.get("dry_run", False),
+        on_batch=lambda report: set_progress(job, report.rows),
+        checkpoint=lambda report: save_checkpoint(job, checkpoint=report.as_dict()),
+    )
+    if payload.get("checkpoint"):
+        importer.report.restore(payload["checkpoint"])
+    try:
+        with default_storage.open(payload["upload"]) as upload:
+            rows = islice(read_rows(upload.file, payload["format"]), importer.report.rows, None)
+            report = importer.run(rows)
+    except FileNotFoundError as e:
+        raise JobFailed("Staged import file is missing") from e
+    default_storage.delete(payload["upload"])
+    return report.as_dict()
@@ -0,0 +1,231 @@
+import logging
+import os
+import secrets
+import socket
+import time
+import traceback
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# Job kinds and the dotted path of the function that runs them. Handlers take
+# the claimed Job and return a JSON-serialisable result. settings.JOB_HANDLERS
+# can add kinds or override these.
+JOB_HANDLERS = {
+    "pdf.batch": "PM_App.export_views.run_batch_export_job",
+    "image.ingest": "PM_App.image_pipeline.run_ingest_job",
+    "patients.import": "PM_App.importers.run_import_job",
+    "complaints.archive": "PM_App.archiving.run_archive_job",
+}
+
+DEFAULT_JOB_LOCK_TIMEOUT = 15 * 60
+DEFAULT_JOB_RETRY_DELAY = 30
+CLAIM_CANDIDATES = 10
+INCOMING_FOLDER = "incoming"
+
+
+class JobFailed(Exception):
+    """Raised by a handler for errors that retrying cannot fix."""
+
+
+def handler_path(kind):
+    handlers = {**JOB_HANDLERS, **getattr(settings, "JOB_HANDLERS", {})}
+    return handlers.get(kind)
+
+
+def enqueue(kind, payload=None, user=None, max_attempts=None, delay=None):
+    if handler_path(kind) is None:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = Job(kind=kind, payload=payload or {}, created_by=user)
+    if max_attempts is not None:
+        job.max_attempts = max_attempts
+    if delay:
+        job.run_after = timezone.now() + delay
+    job.save()
+    return job
+
+
+def stage_upload(upload):
+    """Save an upload as-is so a worker can pick it up; returns the storage name."""
+    return default_storage.save(f"{INCOMING_FOLDER}/{uuid.uuid4().hex}", upload)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim(worker):
+    """Lock the next runnable job for ``worker`` and return it, or None.
+
+    The claim is a conditional UPDATE on the queued status: when two workers
+    pick the same candidate only one UPDATE matches a row, and the loser moves
+    on to the next candidate. This works on SQLite as well as PostgreSQL.
+    """
+    now = timezone.now()
+    candidates = (
+        Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+        .order_by("run_after", "id")
+        .values_list("id", flat=True)[:CLAIM_CANDIDATES]
+    )
+    for job_id in candidates:
+        claimed = Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            locked_by=worker,
+            locked_at=now,
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def retry_delay(attempts):
+    base = getattr(settings, "JOB_RETRY_DELAY", DEFAULT_JOB_RETRY_DELAY)
+    return timedelta(seconds=base * 2 ** max(attempts - 1, 0))
+
+
+def execute(job):
+    """Run a claimed job and record the outcome.
+
+    Failures are retried with exponential backoff until ``max_attempts`` is
+    reached; a handler raising JobFailed fails the job straight away.
+    """
+    mine = Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by)
+    try:
+        path = handler_path(job.kind)
+        if path is None:
+            raise JobFailed(f"No handler for job kind {job.kind!r}")
+        result = import_string(path)(job)
+    except Exception as e:
+        error = traceback.format_exc()
+        logger.warning("Job %s (%s) attempt %s failed: %s", job.pk, job.kind, job.attempts, e)
+        if isinstance(e, JobFailed) or job.attempts >= job.max_attempts:
+            mine.update(status=Job.FAILED, error=error, locked_by=None, locked_at=None, finished_at=timezone.now())
+        else:
+            mine.update(
+                status=Job.QUEUED,
+                error=error,
+                locked_by=None,
+                locked_at=None,
+                run_after=timezone.now() + retry_delay(job.attempts),
+            )
+        return False
+
+    mine.update(
+        status=Job.SUCCEEDED,
+        result=result,
+        error="",
+        locked_by=None,
+        locked_at=None,
+        finished_at=timezone.now(),
+    )
+    return True
+
+
+def requeue_stale():
+    """Put back jobs whose worker died mid-run, failing those out of attempts."""
+    timeout = getattr(settings, "JOB_LOCK_TIMEOUT", DEFAULT_JOB_LOCK_TIMEOUT)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=timezone.now() - timedelta(seconds=timeout))
+    stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.FAILED, error="Worker stopped responding", locked_by=None, locked_at=None, finished_at=timezone.now()
+    )
+    return stale.update(status=Job.QUEUED, locked_by=None, locked_at=None)
+
+
+def claimed(job):
+    """The job's row, as long as the claim ``job`` was loaded under still holds it."""
+    return Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by, attempts=job.attempts)
+
+
+def save_checkpoint(job, **state):
+    """Store resume state in the job's payload for the next attempt.
+
+    Call it inside the transaction that did the work it describes, so both
+    commit or neither does. A worker that has lost its claim gets JobFailed,
+    which rolls that work back instead of racing the job's new owner.
+    """
+    payload = {**job.payload, **state}
+    if not claimed(job).update(payload=payload):
+        raise JobFailed("Job was requeued while running")
+    job.payload = payload
+
+
+def set_progress(job, done, total=None):
+    """Record progress; it doubles as the worker's heartbeat, so a job that
+    keeps reporting is never taken for abandoned by ``requeue_stale``.
+
+    Only the claim that is running the job can report: once a job has been
+    requeued, progress from the worker that lost it is ignored.
+    """
+    job.done = done
+    fields = {"done": done, "locked_at": timezone.now()}
+    if total is not None:
+        job.total = fields["total"] = total
+    claimed(job).update(**fields)
+
+
+def refresh_connections():
+    # Long-running workers drop broken or expired connections between jobs,
+    # like Django does between requests. Connections inside a caller's
+    # transaction are left alone.
+    for conn in connections.all(initialized_only=True):
+        if not conn.in_atomic_block:
+            conn.close_if_unusable_or_obsolete()
+
+
+def work(worker=None, poll_interval=1.0, once=False, should_stop=lambda: False):
+    """Claim and run jobs until ``should_stop()``; with ``once``, until the queue is empty."""
+    worker = worker or worker_name()
+    processed = 0
+    while not should_stop():
+        refresh_connections()
+        requeue_stale()
+        job = claim(worker)
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+        execute(job)
+        processed += 1
+    refresh_connections()
+    return processed
+
+
+def output_dir():
+    return Path(getattr(settings, "JOB_OUTPUT_DIR", Path(settings.BASE_DIR) / "job_output"))
+
+
+def output_path(job, ext):
+    directory = output_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    # Unguessable names: files are only read through the owner-checked job_download
+    return directory / f"job-{secrets.token_urlsafe(16)}.{ext}"
+
+
+def job_state(job):
+    return {
+        "id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "done": job.done,
+        "total": job.total,
+        "result": job.result,
+        "error": job.error.strip().splitlines()[-1] if job.error.strip() else None,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
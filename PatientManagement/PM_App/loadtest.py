@@ -0,0 +1,215 @@
+import asyncio
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from .percentiles import percentile
+
+
+class HttpError(Exception):
+    pass
+
+
+class HttpClient:
+    """A small keep-alive HTTP/1.1 client on asyncio streams, one connection per client.
+
+    It keeps the session and CSRF cookies like a browser tab would, which is
+    all a terminal session needs; it is not a general purpose client.
+    """
+
+    def __init__(self, base_url, timeout=30.0):
+        parts = urlsplit(base_url)
+        if parts.scheme != "http":
+            raise ValueError("Only http:// servers can be load tested")
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.cookies = {}
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+            self.reader = self.writer = None
+
+    async def request(self, method, path, params=None, body=b"", headers=None):
+        """Send one request and return ``(status, headers, body)``; reconnects once if the server hung up."""
+        for attempt in (1, 2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout
+                )
+            try:
+                return await asyncio.wait_for(self._exchange(method, path, params, body, headers), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                if attempt == 2:
+                    raise
+            except asyncio.TimeoutError:
+                # A half-read response leaves the connection unusable.
+                await self.close()
+                raise
+
+    async def get(self, path, params=None, headers=None):
+        return await self.request("GET", path, params, headers=headers)
+
+    async def post_form(self, path, fields, headers=None):
+        body = urlencode(fields).encode()
+        headers = {"Content-Type": "application/x-www-form-urlencoded", **(headers or {})}
+        return await self.request("POST", path, body=body, headers=self.csrf_headers(headers))
+
+    def csrf_headers(self, headers):
+        token = self.cookies.get("csrftoken")
+        return {**headers, "X-CSRFToken": token} if token else headers
+
+    async def login(self, username, password, path="/"):
+        await self.get(path)  # sets the csrftoken cookie
+        status, headers, _ = await self.post_form(path, {
+            "username": username, "password": password, "csrfmiddlewaretoken": self.cookies.get("csrftoken", ""),
+        })
+        if status != 302 or "sessionid" not in self.cookies:
+            raise HttpError(f"Login as {username} failed ({status})")
+
+    async def _exchange(self, method, path, params, body, headers):
+        target = self.prefix + path + (f"?{urlencode(params, doseq=True)}" if params else "")
+        lines = [
+            f"{method} {target} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Connection: keep-alive",
+            f"Content-Length: {len(body)}",
+        ]
+        if self.cookies:
+            lines.append("Cookie: " + "; ".join(f"{name}={value}" for name, value in self.cookies.items()))
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Server closed the connection")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = (await self.reader.readline()).decode("latin-1").rstrip("\r\n")
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            name, value = name.strip().lower(), value.strip()
+            if name == "set-cookie":
+                for morsel in SimpleCookie(value).values():
+                    self.cookies[morsel.key] = morsel.value
+            response_headers[name] = value
+
+        if method == "HEAD" or status in (204, 304):
+            content = b""
+        elif response_headers.get("transfer-encoding", "").lower() == "chunked":
+            content = await self._read_chunked()
+        elif "content-length" in response_headers:
+            content = await self.reader.readexactly(int(response_headers["content-length"]))
+        else:
+            content = await self.reader.read()
+            await self.close()
+        if response_headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, response_headers, content
+
+    async def _read_chunked(self):
+        parts = []
+        while True:
+            size = int((await self.reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await self.reader.readline()
+                return b"".join(parts)
+            parts.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+
+
+class LoadReport:
+    """Latencies and outcomes per step name, plus totals over the whole run."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def add(self, name, seconds, error=None):
+        self.latencies[name].append(seconds)
+        if error:
+            self.errors[name][error] += 1
+
+    def fail(self, name, error):
+        """Count an error found after a request was already recorded, e.g. a wrong response body."""
+        self.errors[name][error] += 1
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+
+    def summary(self, name=None):
+        names = [name] if name else list(self.latencies)
+        latencies = sorted(value for n in names for value in self.latencies[n])
+        errors = sum(count for n in names for count in self.errors[n].values())
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "error_rate": round(errors / len(latencies), 4) if latencies else 0.0,
+            "requests_per_second": round(len(latencies) / self.seconds, 1) if self.seconds else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+            "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        }
+
+    def as_dict(self):
+        return {
+            "seconds": round(self.seconds, 2),
+            "total": self.summary(),
+            "steps": {
+                name: {**self.summary(name), "error_kinds": dict(self.errors[name])} for name in self.latencies
+            },
+        }
+
+
+async def timed(report, name, call, expect=(200,)):
+    """Run one request coroutine and record its latency and outcome under ``name``."""
+    started = time.perf_counter()
+    error = None
+    result = None
+    try:
+        result = await call
+        if result[0] not in expect:
+            error = f"HTTP {result[0]}"
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, HttpError, ValueError) as e:
+        error = type(e).__name__
+    report.add(name, time.perf_counter() - started, error)
+    return result if error is None else None
+
+
+async def run_load(base_url, session, concurrency, duration, setup=None):
+    """Run ``concurrency`` clients, each repeating ``session(client, report)`` until ``duration`` is up.
+
+    ``setup(client)`` runs once per client before the clock starts (e.g. to
+    log in). Returns the LoadReport.
+    """
+    clients = [HttpClient(base_url) for _ in range(concurrency)]
+    try:
+        if setup:
+            await asyncio.gather(*(setup(client) for client in clients))
+        report = LoadReport()
+        deadline = time.perf_counter() + duration
+
+        async def terminal(client):
+            while time.perf_counter() < deadline:
+                await session(client, report)
+
+        await asyncio.gather(*(terminal(client) for client in clients))
+        report.finish()
+    finally:
+        await asyncio.gather(*(client.close() for client in clients))
+    return report
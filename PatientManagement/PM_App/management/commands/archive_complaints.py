@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from PM_App.archiving import ARCHIVE_BATCH_SIZE, ArchiveFilterError, archivable_complaints, bulk_archive
+
+
+class Command(BaseCommand):
+    help = "Archive every complaint matching the filters that is not archived yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--patient-id", help="Only this patient's complaints.")
+        parser.add_argument("--date-from", help="Complaints recorded on or after this date (YYYY-MM-DD).")
+        parser.add_argument("--date-to", help="Complaints recorded on or before this date (YYYY-MM-DD).")
+        parser.add_argument("--diagnosis", help="Final diagnosis contains this text.")
+        parser.add_argument("--all", action="store_true", help="Archive every complaint (needed without filters).")
+        parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="Complaints per transaction.")
+        parser.add_argument("--dry-run", action="store_true", help="Count matching complaints without archiving.")
+
+    def handle(self, *args, **options):
+        try:
+            complaints = archivable_complaints(options)
+        except ArchiveFilterError as e:
+            raise CommandError(str(e))
+
+        def on_batch(report):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  batch {report['batches']}: {report['matched']} matched")
+
+        report = bulk_archive(
+            complaints, batch_size=max(1, options["batch_size"]), dry_run=options["dry_run"], on_batch=on_batch
+        )
+        if options["dry_run"]:
+            self.stdout.write(f"{report['matched']} complaint(s) would be archived.")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Archived {report['archived']} complaint(s) in {report['batches']} batch(es), {report['seconds']:.2f}s"
+                f" ({report['skipped']} already archived)."
+            ))
@@ -0,0 +1,115 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from PM_App.benchmarks import (
+    BENCHMARK_ITERATIONS, BENCHMARK_SCALES, CASES, PDF_TABLE_ROWS, compare, environment, pdf_table_layout, run_scale,
+)
+
+
+def parse_scales(value):
+    scales = {}
+    for label in value.split(","):
+        label = label.strip()
+        if label in BENCHMARK_SCALES:
+            scales[label] = BENCHMARK_SCALES[label]
+        elif label.isdigit() and int(label) > 0:
+            scales[label] = int(label)
+        else:
+            raise CommandError(f"Unknown scale {label!r}; use {', '.join(BENCHMARK_SCALES)} or a patient count")
+    return dict(sorted(scales.items(), key=lambda item: item[1]))
+
+
+def parse_row_counts(value):
+    try:
+        counts = [int(count) for count in value.split(",") if count.strip()]
+    except ValueError:
+        counts = [0]
+    if any(count < 1 for count in counts):
+        raise CommandError("--pdf-table-rows takes positive row counts, e.g. 10,100,1000,5000")
+    return counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database with synthetic data at each scale and time every dashboard page and API "
+        "through the test client: latency, query count and peak memory per endpoint. --output writes the results "
+        "as a JSON baseline; --baseline compares against one and fails on regressions, for CI."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scales", default="1k,10k,100k", help="Comma separated: 1k, 10k, 100k or patient counts.")
+        parser.add_argument("--complaints-per-patient", type=int, default=3)
+        parser.add_argument("--archived-fraction", type=float, default=0.2)
+        parser.add_argument("--iterations", type=int, default=BENCHMARK_ITERATIONS, help="Timed runs per endpoint.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--case", action="append", choices=sorted(CASES), help="Only run these cases.")
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument("--baseline", help="Compare against this JSON file and fail on regressions.")
+        parser.add_argument("--latency-tolerance", type=float, default=0.5, help="Allowed median slowdown (0.5 = 50%%).")
+        parser.add_argument("--memory-tolerance", type=float, default=0.5, help="Allowed peak memory growth.")
+        parser.add_argument(
+            "--pdf-table-rows", default=",".join(map(str, PDF_TABLE_ROWS)),
+            help="Also time PDF table layout at these row counts; empty to skip.",
+        )
+        parser.add_argument("--keepdb", action="store_true", help="Keep the benchmark database to reuse its data.")
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1")
+        scales = parse_scales(options["scales"])
+        row_counts = parse_row_counts(options["pdf_table_rows"])
+        baseline = None
+        if options["baseline"]:
+            try:
+                with open(options["baseline"]) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {e}")
+
+        results = {"environment": environment(), "scales": {}}
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=options["keepdb"]
+        )
+        try:
+            for label, patients in scales.items():
+                self.stdout.write(f"{label}: seeding and running against {patients} patients")
+                results["scales"][label] = run_scale(
+                    patients, options["complaints_per_patient"], options["archived_fraction"],
+                    iterations=options["iterations"], seed=options["seed"], cases=options["case"],
+                    on_case=self.report_case,
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        if row_counts:
+            results["pdf_table_layout"] = pdf_table_layout(row_counts)
+            self.stdout.write("PDF table layout")
+            for rows, timing in results["pdf_table_layout"].items():
+                self.stdout.write(f"  {rows:>6} rows {timing['ms']:>9.1f}ms {timing['us_per_row']:>7.1f}us/row")
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+                f.write("\n")
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if baseline is not None:
+            if baseline.get("environment", {}).get("database") != results["environment"]["database"]:
+                self.stderr.write("Baseline was recorded on a different database; latencies will not compare.")
+            regressions = compare(results, baseline, options["latency_tolerance"], options["memory_tolerance"])
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions against {options['baseline']}")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
+
+    def report_case(self, name, result):
+        self.stdout.write(
+            f"  {name:<24} {result['median_ms']:>9.1f}ms median {result['p95_ms']:>9.1f}ms p95 "
+            f"{result['queries']:>4} queries {result['peak_kib']:>9.0f}KiB peak  {result['status']}"
+        )
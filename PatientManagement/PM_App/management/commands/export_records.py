@@ -0,0 +1,44 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from PM_App.exporters import (
+    EXPORT_CHUNK_SIZE, EXPORT_DATASETS, EXPORT_FORMATS, ExportError, ExportProgress, export_stream, parse_since,
+)
+
+
+class Command(BaseCommand):
+    help = "Stream patients, complaints or archives to CSV, NDJSON or a columnar JSON-lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=list(EXPORT_DATASETS))
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument("--output", "-o", default="-", help="Output file; '-' writes to standard output.")
+        parser.add_argument("--since", help="Only rows created after this ISO date/datetime.")
+        parser.add_argument("--since-id", type=int, help="Only rows with a larger id (resume an incremental export).")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="Rows fetched per cursor round-trip.")
+
+    def handle(self, *args, **options):
+        progress = ExportProgress()
+        started = time.perf_counter()
+        try:
+            chunks = export_stream(
+                options["dataset"], options["format"],
+                since=parse_since(options["since"]), since_id=options["since_id"],
+                chunk_size=max(1, options["chunk_size"]), progress=progress,
+            )
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        output = sys.stdout.buffer if options["output"] == "-" else open(options["output"], "wb")
+        with output:
+            for chunk in chunks:
+                output.write(chunk)
+
+        seconds = time.perf_counter() - started
+        self.stderr.write(
+            f"Exported {progress.rows} {options['dataset']} in {seconds:.2f}s; "
+            f"last id {progress.last_id if progress.last_id is not None else '-'} "
+            f"(pass --since-id to continue from here)"
+        )
@@ -0,0 +1,43 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from PM_App.importers import IMPORT_BATCH_SIZE, IMPORT_FORMATS, detect_format, import_patients
+
+
+class Command(BaseCommand):
+    help = "Import patients from a CSV or JSON-lines file using batched inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import; '-' reads standard input.")
+        parser.add_argument("--format", choices=IMPORT_FORMATS, help="Defaults to the file extension, else csv.")
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="Rows per INSERT transaction.")
+        parser.add_argument("--dry-run", action="store_true", help="Validate every row without inserting.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or detect_format(path)
+
+        def on_batch(report):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  {report.rows} rows read, {report.imported} imported")
+
+        try:
+            stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+        with stream:
+            report = import_patients(
+                stream, fmt, batch_size=options["batch_size"], dry_run=options["dry_run"], on_batch=on_batch
+            )
+
+        for error in report.errors:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        if report.error_count > len(report.errors):
+            self.stderr.write(f"... and {report.error_count - len(report.errors)} more errors")
+
+        verb = "Validated" if options["dry_run"] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {report.imported} of {report.rows} rows ({report.error_count} failed) "
+            f"in {report.seconds:.2f}s, {report.rows_per_second:.0f} rows/sec"
+        ))
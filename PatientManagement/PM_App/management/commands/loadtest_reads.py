@@ -0,0 +1,123 @@
+import asyncio
+import json
+import random
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from PM_App.loadtest import HttpClient, HttpError, run_load, timed
+
+
+READ_STEPS = ("patient_list", "patient_detail", "complaints", "complaint_detail", "archives")
+
+
+async def discover(base_url, username, password, sample):
+    """Log in once and collect patient codes and complaint ids to read during the run."""
+    client = HttpClient(base_url)
+    try:
+        await client.login(username, password)
+        status, _, body = await client.get("/patients/api/", {"page_size": sample})
+        if status != 200:
+            raise HttpError(f"Patient list returned {status}")
+        patient_ids = [row["patient_id"] for row in json.loads(body)["patients"]]
+        complaint_ids = []
+        for patient_id in patient_ids[:20]:
+            status, _, body = await client.get(f"/patients/{patient_id}/complaints/")
+            if status == 200:
+                complaint_ids += [row["id"] for row in json.loads(body)["complaints"]]
+    finally:
+        await client.close()
+    if not patient_ids:
+        raise HttpError("No patients to read; seed some data first")
+    return patient_ids, complaint_ids
+
+
+def read_session(patient_ids, complaint_ids, bust_cache):
+    """One terminal's request mix: every read endpoint, picked at random each time."""
+    async def session(client, report):
+        params = {"_": uuid.uuid4().hex} if bust_cache else {}
+        step = random.choice(READ_STEPS if complaint_ids else [s for s in READ_STEPS if s != "complaint_detail"])
+        patient_id = random.choice(patient_ids)
+        if step == "patient_list":
+            call = client.get("/patients/api/", {"page": random.randint(1, 5), "page_size": 50, **params})
+        elif step == "patient_detail":
+            call = client.get(f"/api/patients/{patient_id}/", params)
+        elif step == "complaints":
+            call = client.get(f"/patients/{patient_id}/complaints/", params)
+        elif step == "complaint_detail":
+            call = client.get(f"/complaints/{random.choice(complaint_ids)}/json/", params)
+        else:
+            call = client.get("/archived/", params)
+        await timed(report, step, call)
+    return session
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the read-only JSON endpoints of a running server with concurrent keep-alive clients and report "
+        "requests/sec and latency percentiles. To compare the sync and async views at equal worker counts, start "
+        "the same ASGI server twice, e.g. `PM_READ_VIEWS=sync uvicorn PatientManagement.asgi:application "
+        "--workers 4 --port 8001` and `uvicorn PatientManagement.asgi:application --workers 4 --port 8002`, then "
+        "run this with --url http://127.0.0.1:8001 --url http://127.0.0.1:8002."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", action="append", required=True, help="Server base URL; repeat to compare servers.")
+        parser.add_argument("--username", required=True)
+        parser.add_argument("--password", required=True)
+        parser.add_argument("--concurrency", type=int, default=20, help="Simultaneous clients (default 20).")
+        parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run against each server.")
+        parser.add_argument("--sample", type=int, default=200, help="Patients to pick reads from.")
+        parser.add_argument(
+            "--bust-cache", action="store_true",
+            help="Add a unique parameter to every request so the response cache never answers.",
+        )
+        parser.add_argument("--json", dest="json_output", help="Also write the full reports to this JSON file.")
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["duration"] <= 0:
+            raise CommandError("--concurrency and --duration must be positive")
+
+        reports = {}
+        for url in options["url"]:
+            try:
+                reports[url] = asyncio.run(self.run_against(url, options))
+            except (OSError, HttpError, ValueError) as e:
+                raise CommandError(f"{url}: {e}")
+            self.print_report(url, reports[url])
+
+        if len(reports) > 1:
+            self.print_comparison(reports)
+        if options["json_output"]:
+            with open(options["json_output"], "w") as output:
+                json.dump({url: report.as_dict() for url, report in reports.items()}, output, indent=2)
+
+    async def run_against(self, url, options):
+        patient_ids, complaint_ids = await discover(url, options["username"], options["password"], options["sample"])
+        return await run_load(
+            url,
+            read_session(patient_ids, complaint_ids, options["bust_cache"]),
+            options["concurrency"],
+            options["duration"],
+            setup=lambda client: client.login(options["username"], options["password"]),
+        )
+
+    def print_report(self, url, report):
+        self.stdout.write(f"\n{url}  ({report.seconds:.1f}s)")
+        self.stdout.write(f"  {'step':<18}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for name in [*sorted(report.latencies), None]:
+            row = report.summary(name)
+            self.stdout.write(
+                f"  {name or 'total':<18}{row['requests']:>10}{row['errors']:>8}{row['requests_per_second']:>9}"
+                f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}"
+            )
+
+    def print_comparison(self, reports):
+        (base_url, base), *others = reports.items()
+        base_total = base.summary()
+        self.stdout.write(f"\nCompared with {base_url}:")
+        for url, report in others:
+            total = report.summary()
+            rps = total["requests_per_second"] / base_total["requests_per_second"] if base_total["requests_per_second"] else 0
+            p99 = total["p99_ms"] / base_total["p99_ms"] if base_total["p99_ms"] else 0
+            self.stdout.write(f"  {url}: {rps:.2f}x requests/sec, {p99:.2f}x p99 latency")
@@ -0,0 +1,232 @@
+import asyncio
+import itertools
+import json
+import random
+import re
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from PM_App.importers import age_on
+from PM_App.loadtest import HttpError, run_load, timed
+from PM_App.synthetic import COMPLAINTS, synthetic_patient
+
+
+TERMINAL_STEPS = (
+    "login_page", "login", "dashboard", "add_patient", "record_complaint", "get_complaints_json",
+    "export_complaint_pdf", "logout",
+)
+LOGIN_RETRY_DELAY = 1.0
+DEBUG_PAGE_TITLE = re.compile(rb"<title>\s*(\w+)\s+at ")
+
+
+def parse_levels(value):
+    try:
+        levels = [int(level) for level in value.split(",")]
+    except ValueError:
+        levels = []
+    if not levels or min(levels) < 1:
+        raise CommandError("--concurrency takes positive terminal counts, e.g. 10 or 10,20,40")
+    return levels
+
+
+def server_exception(body):
+    """The exception named by a DEBUG error page, or "" when the server does not say."""
+    match = DEBUG_PAGE_TITLE.search(body[:2000])
+    return match.group(1).decode() if match else ""
+
+
+class TerminalSession:
+    """A front-desk terminal: log in, open the dashboard, then see patients one visit at a time.
+
+    A visit registers a new patient, records their complaints, reopens the
+    complaint list and prints the form of the last complaint. After
+    ``visits_per_login`` visits the terminal logs out and the next visit
+    starts with a fresh login, as at a change of shift.
+
+    Every registration is checked against the others from all terminals:
+    a patient code handed out twice, or a registration that came back as
+    somebody else's record, counts as a ``patient_id collision`` error.
+    """
+
+    def __init__(self, username, password, visits_per_login=10, complaints_per_visit=1, think_time=0.0, seed=None):
+        self.username = username
+        self.password = password
+        self.visits_per_login = max(1, visits_per_login)
+        self.complaints_per_visit = max(1, complaints_per_visit)
+        self.think_time = think_time
+        self.rng = random.Random(seed)
+        self.today = date.today()
+        self.sequence = itertools.count(1)
+        self.visits = {}
+        self.registered = {}
+
+    async def __call__(self, client, report):
+        visits = self.visits.get(client)
+        if visits is None or visits >= self.visits_per_login:
+            if visits is not None:
+                await timed(report, "logout", client.get("/logout/"), expect=(302,))
+                client.cookies.clear()
+            if not await self.login(client, report):
+                await asyncio.sleep(LOGIN_RETRY_DELAY)
+                return
+            self.visits[client] = 0
+        self.visits[client] += 1
+        await self.visit(client, report)
+
+    async def pause(self):
+        if self.think_time > 0:
+            await asyncio.sleep(self.think_time * self.rng.uniform(0.5, 1.5))
+
+    async def login(self, client, report):
+        self.visits.pop(client, None)
+        if await timed(report, "login_page", client.get("/")) is None:
+            return False
+        await self.pause()
+        fields = {
+            "username": self.username, "password": self.password,
+            "csrfmiddlewaretoken": client.cookies.get("csrftoken", ""),
+        }
+        if await timed(report, "login", client.post_form("/", fields), expect=(302,)) is None:
+            return False
+        if "sessionid" not in client.cookies:
+            report.fail("login", "rejected credentials")
+            return False
+        return await timed(report, "dashboard", client.get("/dashboard/")) is not None
+
+    async def visit(self, client, report):
+        await self.pause()
+        fields = synthetic_patient(self.rng, self.today)
+        # A name no other visit uses, to tell an overwritten record from a new one.
+        fields["firstname"] = f"Load{next(self.sequence)}"
+        fields["age"] = age_on(date.fromisoformat(fields["birthdate"]), self.today)
+        fields["patient_id"] = ""
+        result = await timed(
+            report, "add_patient", client.post_form("/patients/add/", fields, {"X-Requested-With": "XMLHttpRequest"}),
+            expect=(200, 500),
+        )
+        patient_id = result and self.check_registration(report, result, fields["firstname"])
+        if not patient_id:
+            return
+
+        complaint_id = None
+        for _ in range(self.complaints_per_visit):
+            await self.pause()
+            chief_complaint, diagnosis, treatment = self.rng.choice(COMPLAINTS)
+            result = await timed(report, "record_complaint", client.post_form("/complaints/add/", {
+                "patient_id": patient_id, "chief_complaint": chief_complaint,
+                "final_diagnosis": diagnosis, "treatment": treatment,
+            }))
+            if result is None:
+                return
+            complaint_id = json.loads(result[2])["complaint_id"]
+
+        await self.pause()
+        result = await timed(report, "get_complaints_json", client.get(f"/patients/{patient_id}/complaints/"))
+        if result is not None and len(json.loads(result[2])["complaints"]) != self.complaints_per_visit:
+            report.fail("get_complaints_json", "complaints missing")
+
+        await self.pause()
+        await timed(report, "export_complaint_pdf", client.get(f"/complaints/{complaint_id}/export/pdf/"))
+
+    def check_registration(self, report, result, firstname):
+        """The new patient's code, or None after counting why the registration failed."""
+        status, _, body = result
+        if status == 500:
+            exception = server_exception(body)
+            report.fail("add_patient", "patient_id collision" if exception == "IntegrityError" else f"HTTP 500 {exception}".strip())
+            return None
+        try:
+            data = json.loads(body)
+        except ValueError:
+            report.fail("add_patient", "invalid JSON")
+            return None
+        if not data.get("success"):
+            report.fail("add_patient", "not saved")
+            return None
+        patient = data["patient"]
+        if patient["patient_id"] in self.registered or patient["firstname"] != firstname:
+            report.fail("add_patient", "patient_id collision")
+            return None
+        self.registered[patient["patient_id"]] = firstname
+        return patient["patient_id"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate front-desk terminals against a running server: each logs in, opens the dashboard, registers "
+        "patients, records complaints, reloads complaint lists and prints PDFs. Reports throughput, error rates "
+        "(patient_id collisions included) and latency percentiles per step. Give several --concurrency levels, "
+        "e.g. 10,20,40,80, to find where throughput stops growing. It writes real records: point it at a "
+        "staging database (see seed_synthetic), not production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", required=True, help="Server base URL, e.g. http://127.0.0.1:8000")
+        parser.add_argument("--username", required=True)
+        parser.add_argument("--password", required=True)
+        parser.add_argument("--concurrency", default="10", help="Terminals; a comma separated list runs each level.")
+        parser.add_argument("--duration", type=float, default=30.0, help="Seconds per level.")
+        parser.add_argument("--visits-per-login", type=int, default=10, help="Patients seen between logins.")
+        parser.add_argument("--complaints-per-visit", type=int, default=1)
+        parser.add_argument("--think-time", type=float, default=0.0, help="Mean seconds a clerk pauses between steps.")
+        parser.add_argument("--seed", type=int, help="Random seed for the generated patients.")
+        parser.add_argument("--json", dest="json_output", help="Also write the full reports to this JSON file.")
+
+    def handle(self, *args, **options):
+        levels = parse_levels(options["concurrency"])
+        if options["duration"] <= 0:
+            raise CommandError("--duration must be positive")
+
+        results = {}
+        for terminals in levels:
+            session = TerminalSession(
+                options["username"], options["password"], options["visits_per_login"],
+                options["complaints_per_visit"], options["think_time"], options["seed"],
+            )
+            try:
+                report = asyncio.run(run_load(options["url"], session, terminals, options["duration"]))
+            except (OSError, HttpError, ValueError) as e:
+                raise CommandError(f"{options['url']}: {e}")
+            results[terminals] = (report, len(session.registered))
+            self.print_report(terminals, report, len(session.registered))
+
+        if len(levels) > 1:
+            self.print_levels(results)
+        if options["json_output"]:
+            with open(options["json_output"], "w") as output:
+                json.dump({
+                    str(terminals): {**report.as_dict(), "patients_registered": registered}
+                    for terminals, (report, registered) in results.items()
+                }, output, indent=2)
+
+    def print_report(self, terminals, report, registered):
+        per_second = registered / report.seconds if report.seconds else 0.0
+        self.stdout.write(
+            f"\n{terminals} terminals  ({report.seconds:.1f}s, {registered} patients registered, {per_second:.1f}/s)"
+        )
+        self.stdout.write(f"  {'step':<22}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        steps = [name for name in TERMINAL_STEPS if name in report.latencies]
+        for name in [*steps, None]:
+            row = report.summary(name)
+            self.stdout.write(
+                f"  {name or 'total':<22}{row['requests']:>10}{row['errors']:>8}{row['requests_per_second']:>9}"
+                f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}"
+            )
+        for name in steps:
+            for error, count in sorted(report.errors[name].items()):
+                self.stdout.write(self.style.WARNING(f"  {name}: {count} x {error}"))
+
+    def print_levels(self, results):
+        self.stdout.write(f"\n  {'terminals':>10}{'req/s':>9}{'patients/s':>12}{'error rate':>12}{'p95 ms':>9}")
+        best = None
+        for terminals, (report, registered) in results.items():
+            total = report.summary()
+            per_second = registered / report.seconds if report.seconds else 0.0
+            self.stdout.write(
+                f"  {terminals:>10}{total['requests_per_second']:>9}{per_second:>12.1f}"
+                f"{total['error_rate']:>12.2%}{total['p95_ms']:>9}"
+            )
+            if best is None or total["requests_per_second"] > best[1]:
+                best = (terminals, total["requests_per_second"])
+        self.stdout.write(f"Throughput peaked at {best[0]} terminals ({best[1]} req/s).")
@@ -0,0 +1,77 @@
+import multiprocessing
+import signal
+import threading
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def worker_main(poll_interval):
+    # Spawned children start from a fresh interpreter, so Django (and the
+    # models) can only be imported once setup has run.
+    django.setup()
+    from PM_App.jobs import work
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stopping.set())
+    signal.signal(signal.SIGINT, lambda *args: stopping.set())
+    work(poll_interval=poll_interval, should_stop=stopping.is_set)
+
+
+class Command(BaseCommand):
+    help = "Run background job workers (PDF batch exports, photo processing, bulk operations)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=None,
+            help="Number of worker processes (default: settings.JOB_WORKERS).",
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=None,
+            help="Seconds an idle worker waits before polling the queue again.",
+        )
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Run queued jobs in this process until the queue is empty, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        from PM_App.jobs import work
+
+        poll_interval = options["poll_interval"] or getattr(settings, "JOB_POLL_INTERVAL", 1.0)
+        if options["once"]:
+            processed = work(once=True)
+            self.stdout.write(f"Processed {processed} job(s).")
+            return
+
+        workers = options["workers"] or getattr(settings, "JOB_WORKERS", 1)
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        connections.close_all()
+
+        stopping = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stopping.set())
+        signal.signal(signal.SIGINT, lambda *args: stopping.set())
+
+        def start():
+            process = context.Process(target=worker_main, args=(poll_interval,))
+            process.start()
+            return process
+
+        processes = [start() for _ in range(workers)]
+        self.stdout.write(f"Started {workers} worker(s); Ctrl+C to stop.")
+        while not stopping.wait(poll_interval):
+            for i, process in enumerate(processes):
+                if not process.is_alive():
+                    self.stderr.write(f"Worker {process.pid} exited with {process.exitcode}; restarting.")
+                    processes[i] = start()
+
+        # Workers finish the job they are running before exiting.
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+        self.stdout.write("Workers stopped.")
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from PM_App.importers import IMPORT_BATCH_SIZE
+from PM_App.synthetic import seed_synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Add generated patients, complaints and archived complaints for benchmarking and load testing. "
+        "The same --seed always generates the same records."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--patients", type=int, required=True, help="Patients to add.")
+        parser.add_argument("--complaints-per-patient", type=int, default=3, help="Complaints per patient (default 3).")
+        parser.add_argument(
+            "--archived-fraction", type=float, default=0.2,
+            help="Share of the new complaints to archive, 0 to 1 (default 0.2).",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed (default 0).")
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="Rows per INSERT transaction.")
+
+    def handle(self, *args, **options):
+        def on_batch(report):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  {report['complaints']} complaints, {report['archived']} archived")
+
+        try:
+            report = seed_synthetic(
+                options["patients"], options["complaints_per_patient"], options["archived_fraction"],
+                seed=options["seed"], batch_size=options["batch_size"], on_batch=on_batch,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Added {report['patients']} patients, {report['complaints']} complaints and "
+            f"{report['archived']} archives in {report['seconds']:.2f}s"
+        ))
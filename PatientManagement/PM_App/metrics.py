@@ -0,0 +1,238 @@
+import bisect
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .profiling import end_profile, record_open_connections, record_queries, start_profile
+from .response_cache import stats as cache_stats
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+RENDER_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 500)
+PAGE_BUCKETS = (1, 2, 3, 5, 10, 25, 50, 100, 250, 500, 1000)
+BYTE_BUCKETS = tuple(2 ** power for power in range(10, 26, 2))  # 1 KiB to 32 MiB
+
+registry = []
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for value in values
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """One metric family in the process-wide ``registry``; values are kept per label set."""
+
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self.values = {}
+        registry.append(self)
+
+    def key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {', '.join(self.labels) or '(none)'}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def reset(self):
+        with self._lock:
+            self.values = {}
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += self.samples()
+        return lines
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self.values.items())
+        return [f"{self.name}{format_labels(self.labels, key)} {format_value(value)}" for key, value in values]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self.values.get(self.key(labels), 0)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self.values.get(key)
+            if counts is None:
+                # One count per bucket plus +Inf, then the sum of observations.
+                counts = self.values[key] = [0] * (len(self.buckets) + 1) + [0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def count(self, **labels):
+        with self._lock:
+            counts = self.values.get(self.key(labels))
+            return sum(counts[:-1]) if counts else 0
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, list(counts)) for key, counts in self.values.items())
+        lines = []
+        bucket_labels = self.labels + ("le",)
+        for key, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(bucket_labels, key + (format_value(bound),))} {cumulative}")
+            labels = format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class CollectedCounter(Metric):
+    """A counter whose values are read from elsewhere when metrics are scraped."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels, collect):
+        super().__init__(name, documentation, labels)
+        self.collect = collect
+
+    def samples(self):
+        return [
+            f"{self.name}{format_labels(self.labels, key)} {format_value(value)}"
+            for key, value in sorted(self.collect().items())
+        ]
+
+
+def cache_requests():
+    endpoints = cache_stats.snapshot()["endpoints"]
+    values = {}
+    for endpoint, counts in endpoints.items():
+        values[(endpoint, "hit")] = counts["hits"]
+        values[(endpoint, "miss")] = counts["misses"]
+    return values
+
+
+def cache_invalidations():
+    return {(namespace,): count for namespace, count in cache_stats.snapshot()["invalidations"].items()}
+
+
+http_requests = Counter(
+    "pm_http_requests_total", "HTTP responses by URL name, method and status code.", ["view", "method", "status"]
+)
+http_latency = Histogram(
+    "pm_http_request_duration_seconds", "Time to produce a response (up to the first byte when streaming).", ["view"]
+)
+db_queries = Histogram(
+    "pm_db_queries_per_request", "Database queries run while handling one request.", ["view"], QUERY_BUCKETS
+)
+pdf_render_seconds = Histogram(
+    "pm_pdf_render_seconds", "Time to draw and save one PatientFormPDFGenerator document.", buckets=RENDER_BUCKETS
+)
+pdf_pages = Histogram("pm_pdf_pages", "Pages in each rendered PDF document.", buckets=PAGE_BUCKETS)
+upload_bytes = Histogram("pm_upload_bytes", "Size of uploaded files.", ["view", "field"], BYTE_BUCKETS)
+login_attempts = Counter("pm_login_attempts_total", "Login attempts by outcome.", ["outcome"])
+patients_created = Counter("pm_patients_created_total", "Patients registered.")
+CollectedCounter(
+    "pm_response_cache_requests_total", "JSON API response cache lookups.", ["endpoint", "result"], cache_requests
+)
+CollectedCounter(
+    "pm_response_cache_invalidations_total", "Response cache namespace invalidations.", ["namespace"],
+    cache_invalidations,
+)
+
+
+def exposition():
+    """All metrics in the Prometheus text format."""
+    lines = []
+    for metric in registry:
+        lines += metric.expose()
+    return "\n".join(lines) + "\n"
+
+
+def record_uploads(request, view):
+    for field, files in request.FILES.lists():
+        for upload in files:
+            upload_bytes.observe(upload.size, view=view, field=field)
+
+
+class MetricsMiddleware:
+    """Count responses, and time them and their database queries, per URL name.
+
+    Metrics live in this process only: with several server processes each
+    one is scraped on its own, and work done in job workers or the PDF
+    process pool is not counted here. Disabled with METRICS_ENABLED = False.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        record_queries()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        record_open_connections()
+        profile, token = start_profile(detailed=False)
+        try:
+            response = self.get_response(request)
+        finally:
+            end_profile(token)
+        self.observe(request, response, profile)
+        return response
+
+    async def __acall__(self, request):
+        profile, token = start_profile(detailed=False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_profile(token)
+        self.observe(request, response, profile)
+        return response
+
+    def observe(self, request, response, profile):
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name if match else None) or "unresolved"
+        http_requests.inc(view=view, method=request.method, status=response.status_code)
+        http_latency.observe(time.perf_counter() - profile.started, view=view)
+        db_queries.observe(profile.queries, view=view)
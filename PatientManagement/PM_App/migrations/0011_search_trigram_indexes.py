@@ -0,0 +1,45 @@
+from django.db import migrations
+
+
+# Trigram GIN indexes on UPPER(col::text), the expression Django emits for
+# ``__icontains`` on PostgreSQL, so the search endpoint's substring matches
+# are index scans. Other backends (SQLite in tests) skip this migration.
+SEARCH_INDEXES = [
+    ("pm_patient_firstname_trgm", "PM_App_patient", "firstname"),
+    ("pm_patient_middlename_trgm", "PM_App_patient", "middlename"),
+    ("pm_patient_lastname_trgm", "PM_App_patient", "lastname"),
+    ("pm_patient_patient_id_trgm", "PM_App_patient", "patient_id"),
+    ("pm_patient_contact_trgm", "PM_App_patient", "contact_number"),
+    ("pm_patient_address_trgm", "PM_App_patient", "address"),
+    ("pm_complaint_chief_trgm", "PM_App_complaint", "chief_complaint"),
+    ("pm_complaint_diagnosis_trgm", "PM_App_complaint", "final_diagnosis"),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in SEARCH_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON "{table}" '
+            f'USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, table, column in SEARCH_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PM_App', '0010_alter_patientcomplaintarchive_complaint'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
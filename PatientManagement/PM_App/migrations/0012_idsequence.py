@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:36
+
+from django.db import migrations, models
+
+
+def seed_patient_id_sequence(apps, schema_editor):
+    Patient = apps.get_model('PM_App', 'Patient')
+    IdSequence = apps.get_model('PM_App', 'IdSequence')
+
+    prefix = "PT-2026"
+    highest = Patient.objects.aggregate(models.Max('id'))['id__max'] or 0
+    for patient_id in Patient.objects.filter(patient_id__startswith=prefix).values_list('patient_id', flat=True):
+        suffix = patient_id[len(prefix):]
+        if suffix.isdigit():
+            highest = max(highest, int(suffix))
+
+    IdSequence.objects.update_or_create(name='patient_id', defaults={'last_value': highest})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PM_App', '0011_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_patient_id_sequence, migrations.RunPython.noop),
+    ]
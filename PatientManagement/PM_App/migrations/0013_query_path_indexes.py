@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:39
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PM_App', '0012_idsequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['patient', 'date_created', 'id'], name='pm_complaint_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['lastname', 'id'], name='pm_patient_lastname_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['firstname', 'id'], name='pm_patient_firstname_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['age', 'id'], name='pm_patient_age_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['birthdate', 'id'], name='pm_patient_birthdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(django.db.models.functions.text.Upper('gender'), models.F('id'), name='pm_patient_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientcomplaintarchive',
+            index=models.Index(fields=['date_created', 'id'], name='pm_archive_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientcomplaintarchive',
+            index=models.Index(fields=['patient_id', 'date_created', 'id'], name='pm_archive_patient_date_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:04
+
+from django.db import migrations, models
+
+
+def backfill_complaints(apps, schema_editor):
+    # Existing complaints were last written when they were created, as far as we know.
+    Complaint = apps.get_model("PM_App", "Complaint")
+    Complaint.objects.update(updated_at=models.F("date_created"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PM_App', '0014_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['updated_at', 'id'], name='pm_patient_updated_idx'),
+        ),
+        migrations.RunPython(backfill_complaints, migrations.RunPython.noop),
+    ]
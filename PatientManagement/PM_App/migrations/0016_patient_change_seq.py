@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:09
+
+from django.db import migrations, models
+
+
+def backfill_change_seq(apps, schema_editor):
+    # Any order works for existing rows; the sequence is seeded from the
+    # highest change_seq the first time it is used.
+    Patient = apps.get_model("PM_App", "Patient")
+    Patient.objects.update(change_seq=models.F("id"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PM_App', '0015_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('patient_id', models.CharField(max_length=20)),
+                ('change_seq', models.BigIntegerField(unique=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['change_seq'], name='pm_patient_change_idx'),
+        ),
+        migrations.RunPython(backfill_change_seq, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+# On PostgreSQL Patient.change_seq is drawn from a database sequence, seeded
+# past every number handed out so far. Other backends (SQLite in tests) keep
+# the IdSequence counter row and skip this migration.
+def create_change_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE SEQUENCE IF NOT EXISTS pm_patient_change_seq")
+    schema_editor.execute(
+        "SELECT setval('pm_patient_change_seq', GREATEST("
+        '(SELECT COALESCE(MAX(change_seq), 0) FROM "PM_App_patient"), '
+        '(SELECT COALESCE(MAX(change_seq), 0) FROM "PM_App_patienttombstone"), '
+        """(SELECT COALESCE(MAX(last_value), 0) FROM "PM_App_idsequence" WHERE name = 'patient_change')"""
+        ") + 1, false)"
+    )
+
+
+def drop_change_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # Hand the counter row back the numbers the sequence gave out.
+    schema_editor.execute(
+        'UPDATE "PM_App_idsequence" SET last_value = GREATEST(last_value, '
+        "(SELECT CASE WHEN is_called THEN last_value ELSE last_value - 1 END FROM pm_patient_change_seq)) "
+        "WHERE name = 'patient_change'"
+    )
+    schema_editor.execute("DROP SEQUENCE IF EXISTS pm_patient_change_seq")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PM_App', '0017_changeevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_change_sequence, drop_change_sequence),
+    ]
@@ -1,9 +1,12 @@
-from django.db import models
+import time
+
+from django.db import IntegrityError, OperationalError, models, transaction
 
 # Create your models here.
 
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
 
 class CustomUser(AbstractUser):
     fullname = models.CharField(max_length=255, null=True, blank=True, default="No name provided")
@@ -17,6 +20,75 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return self.username
 
+SQLITE_LOCK_RETRIES = 6
+
+
+def atomic_with_retry(run):
+    """Run ``run()`` in a transaction, retrying while another SQLite writer holds the database.
+
+    SQLite answers "database is locked" at once, busy timeout or not, when a
+    transaction that has already read wants to write. Only an outermost
+    transaction can start over, so calls nested in another one are not retried.
+    """
+    for attempt in range(SQLITE_LOCK_RETRIES + 1):
+        try:
+            with transaction.atomic():
+                return run()
+        except OperationalError as e:
+            connection = transaction.get_connection()
+            if (
+                connection.vendor != "sqlite" or connection.in_atomic_block
+                or "locked" not in str(e) or attempt == SQLITE_LOCK_RETRIES
+            ):
+                raise
+            time.sleep(0.01 * 2 ** attempt)
+
+
+class IdSequence(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    last_value = models.BigIntegerField(default=0)
+
+    @classmethod
+    def advance(cls, name, count=1, seed=None):
+        if count < 1:
+            raise ValueError("count must be positive")
+        # The UPDATE takes the row (or, on SQLite, database) write lock before
+        # anything is read, so concurrent callers serialize on it and each one
+        # gets a distinct, contiguous block ending at the returned value.
+        def run():
+            if not cls.objects.filter(name=name).update(last_value=models.F("last_value") + count):
+                cls._create(name, seed)
+                cls.objects.filter(name=name).update(last_value=models.F("last_value") + count)
+            return cls.objects.values_list("last_value", flat=True).get(name=name)
+        return atomic_with_retry(run)
+
+    @classmethod
+    def raise_to(cls, name, value, seed=None):
+        """Make sure the next value handed out is above ``value``."""
+        with transaction.atomic():
+            if not cls.objects.filter(name=name).exists():
+                cls._create(name, seed)
+            cls.objects.filter(name=name, last_value__lt=value).update(last_value=value)
+
+    @classmethod
+    def current(cls, name, seed=None):
+        value = cls.objects.filter(name=name).values_list("last_value", flat=True).first()
+        if value is None:
+            return seed() if seed else 0
+        return value
+
+    @classmethod
+    def _create(cls, name, seed):
+        try:
+            with transaction.atomic():
+                cls.objects.create(name=name, last_value=seed() if seed else 0)
+        except IntegrityError:
+            pass
+
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"
+
+
 class Patient(models.Model):
     patient_id = models.CharField(max_length=20, unique=True, editable=False)
     firstname = models.CharField(max_length=100)
@@ -32,17 +104,122 @@ class Patient(models.Model):
     height = models.FloatField(null=True, blank=True)
     
     profile_image = models.ImageField(blank=True, null=True, upload_to='patient_profiles/', default='static/img/default.png')
+    updated_at = models.DateTimeField(auto_now=True)
+    change_seq = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["lastname", "id"], name="pm_patient_lastname_idx"),
+            models.Index(fields=["firstname", "id"], name="pm_patient_firstname_idx"),
+            models.Index(fields=["age", "id"], name="pm_patient_age_idx"),
+            models.Index(fields=["birthdate", "id"], name="pm_patient_birthdate_idx"),
+            models.Index(Upper("gender"), "id", name="pm_patient_gender_idx"),
+            models.Index(fields=["updated_at", "id"], name="pm_patient_updated_idx"),
+            models.Index(fields=["change_seq"], name="pm_patient_change_idx"),
+        ]
+
+    PATIENT_ID_PREFIX = "PT-2026"
+    PATIENT_ID_SEQUENCE = "patient_id"
+    CHANGE_SEQUENCE = "patient_change"
+    # On PostgreSQL change_seq comes from this database sequence (migration
+    # 0018) rather than the IdSequence row, so patient writes do not queue
+    # behind one row lock. Writers hold CHANGE_LOCK_KEY shared until they
+    # commit; current_change_seq takes it exclusively to wait them out.
+    CHANGE_SEQUENCE_NAME = "pm_patient_change_seq"
+    CHANGE_LOCK_KEY = 0x504D5F4348414E47
 
     def save(self, *args, **kwargs):
-        if not self.patient_id:
-            last_patient = Patient.objects.order_by('-id').first()
-            next_number = (last_patient.id + 1) if last_patient else 1
-            self.patient_id = f"PT-2026{str(next_number).zfill(4)}"
-        super().save(*args, **kwargs)
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "change_seq", "updated_at"}
+        assign_id = not self.patient_id
+
+        def run():
+            if assign_id:
+                self.patient_id = Patient.allocate_patient_ids()[0]
+            self.change_seq = Patient.allocate_change_seqs()[0]
+            super(Patient, self).save(*args, **kwargs)
+        atomic_with_retry(run)
+
+    @classmethod
+    def allocate_change_seqs(cls, count=1):
+        """``count`` new change numbers, ascending. Call inside the transaction that writes them.
+
+        Either way a sync client that has seen token N never misses a change
+        numbered below N: on SQLite the IdSequence row stays locked until the
+        transaction commits, on PostgreSQL current_change_seq waits for it.
+        """
+        connection = transaction.get_connection()
+        if connection.vendor != "postgresql":
+            last = IdSequence.advance(cls.CHANGE_SEQUENCE, count, seed=cls.highest_change_seq)
+            return list(range(last - count + 1, last + 1))
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock_shared(%s)", [cls.CHANGE_LOCK_KEY])
+            cursor.execute("SELECT nextval(%s) FROM generate_series(1, %s)", [cls.CHANGE_SEQUENCE_NAME, count])
+            return sorted(value for value, in cursor.fetchall())
+
+    @classmethod
+    def current_change_seq(cls):
+        """The highest change number whose write, and every one below it, has committed or rolled back."""
+        connection = transaction.get_connection()
+        if connection.vendor != "postgresql":
+            return IdSequence.current(cls.CHANGE_SEQUENCE, seed=cls.highest_change_seq)
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Granted once the writers holding numbers have finished; writers
+            # arriving meanwhile wait only for this short transaction.
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [cls.CHANGE_LOCK_KEY])
+            cursor.execute(f'SELECT last_value, is_called FROM "{cls.CHANGE_SEQUENCE_NAME}"')
+            last_value, is_called = cursor.fetchone()
+        return last_value if is_called else last_value - 1
+
+    @classmethod
+    def highest_change_seq(cls):
+        return max(
+            cls.objects.aggregate(models.Max("change_seq"))["change_seq__max"] or 0,
+            PatientTombstone.objects.aggregate(models.Max("change_seq"))["change_seq__max"] or 0,
+        )
+
+    @classmethod
+    def format_patient_id(cls, number):
+        return f"{cls.PATIENT_ID_PREFIX}{str(number).zfill(4)}"
+
+    @classmethod
+    def allocate_patient_ids(cls, count=1):
+        last = IdSequence.advance(cls.PATIENT_ID_SEQUENCE, count, seed=cls.highest_patient_number)
+        return [cls.format_patient_id(n) for n in range(last - count + 1, last + 1)]
+
+    @classmethod
+    def peek_next_patient_id(cls):
+        current = IdSequence.current(cls.PATIENT_ID_SEQUENCE, seed=cls.highest_patient_number)
+        return cls.format_patient_id(current + 1)
+
+    @classmethod
+    def patient_number(cls, patient_id):
+        """The sequence number in a generated patient_id, or None for other formats."""
+        prefix = cls.PATIENT_ID_PREFIX
+        suffix = patient_id[len(prefix):] if patient_id.startswith(prefix) else ""
+        return int(suffix) if suffix.isdigit() else None
+
+    @classmethod
+    def highest_patient_number(cls):
+        highest = cls.objects.aggregate(models.Max("id"))["id__max"] or 0
+        prefix = cls.PATIENT_ID_PREFIX
+        for patient_id in cls.objects.filter(patient_id__startswith=prefix).values_list("patient_id", flat=True):
+            highest = max(highest, cls.patient_number(patient_id) or 0)
+        return highest
 
     def __str__(self):
         return f"{self.firstname} {self.lastname} ({self.patient_id})"
 
+class PatientTombstone(models.Model):
+    """Records a deleted patient so delta sync clients can drop it."""
+
+    patient_id = models.CharField(max_length=20)
+    change_seq = models.BigIntegerField(unique=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Deleted: {self.patient_id} (#{self.change_seq})"
+
 class Complaint(models.Model):
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name="complaints")
     chief_complaint = models.TextField()
@@ -51,6 +228,12 @@ class Complaint(models.Model):
     final_diagnosis = models.TextField(null=True, blank=True) 
     treatment = models.TextField(null=True, blank=True) 
     date_created = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["patient", "date_created", "id"], name="pm_complaint_patient_date_idx"),
+        ]
 
     def __str__(self):
         return f"Complaint for {self.patient.patient_id} - {self.chief_complaint}"
@@ -80,5 +263,61 @@ class PatientComplaintArchive(models.Model):
 
     date_created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["date_created", "id"], name="pm_archive_date_idx"),
+            models.Index(fields=["patient_id", "date_created", "id"], name="pm_archive_patient_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"Archive: {self.patient_id} - {self.chief_complaint}"
+
+class Job(models.Model):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, null=True, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    done = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    created_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name="jobs")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after", "id"], name="pm_job_queue_idx"),
+        ]
+
+    @property
+    def is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+
+    def __str__(self):
+        return f"Job {self.pk}: {self.kind} ({self.status})"
+
+class ChangeEvent(models.Model):
+    """A create/update/delete notice for live dashboards, kept for a short while."""
+
+    topic = models.CharField(max_length=20)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
     def __str__(self):
-        return f"Archive: {self.patient_id} - {self.chief_complaint}"
\ No newline at end of file
+        return f"Event {self.pk}: {self.topic}"
@@ -0,0 +1,131 @@
+import base64
+import json
+from datetime import datetime, time
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE, name="page_size"):
+    if value in (None, ""):
+        return default
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise PaginationError(f"{name} must be an integer")
+    if size < 1:
+        raise PaginationError(f"{name} must be positive")
+    return min(size, maximum)
+
+
+def parse_date_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise PaginationError(f"{name} must be a date (YYYY-MM-DD)")
+    return timezone.make_aware(datetime.combine(parsed, time.min))
+
+
+def parse_page(value):
+    if value in (None, ""):
+        return 1
+    try:
+        page = int(value)
+    except (TypeError, ValueError):
+        raise PaginationError("page must be an integer")
+    if page < 1:
+        raise PaginationError("page must be positive")
+    return page
+
+
+def parse_sort(value, allowed, default):
+    value = value or default
+    field = value.lstrip("-")
+    if field not in allowed:
+        raise PaginationError(f"sort must be one of: {', '.join(sorted(allowed))}")
+    return field, value.startswith("-")
+
+
+def encode_cursor(sort, values):
+    payload = json.dumps({"s": sort, "v": values}, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["v"]
+    except (ValueError, KeyError, TypeError):
+        raise PaginationError("Invalid cursor")
+    if payload.get("s") != sort or not isinstance(values, list):
+        raise PaginationError("Cursor does not match the requested sort")
+    return values
+
+
+def keyset_filter(fields, values, descending=False):
+    """Rows strictly after ``values`` in ``(fields...)`` order, all ascending or all descending."""
+    lookup = "lt" if descending else "gt"
+    condition = Q()
+    for i, field in enumerate(fields):
+        step = Q(**{f"{field}__{lookup}": values[i]})
+        for prev_field, prev_value in zip(fields[:i], values[:i]):
+            step &= Q(**{prev_field: prev_value})
+        condition |= step
+    return condition
+
+
+def keyset_page(queryset, fields, page_size, cursor=None, sort_name=None, descending=False, page=None):
+    """Slice ``queryset`` (of dicts from ``.values()``) into one page.
+
+    ``fields`` is the full ordering key and must end with a unique column so the
+    cursor is stable.  With a cursor the page is a pure index seek; ``page`` is an
+    offset fallback for jumping straight to page N.  Returns ``(rows, next_cursor)``.
+    """
+    sort_name = sort_name or fields[0]
+    rows = list(keyset_slice(queryset, fields, page_size, cursor, sort_name, descending, page))
+    return finish_page(rows, fields, page_size, sort_name)
+
+
+async def akeyset_page(queryset, fields, page_size, cursor=None, sort_name=None, descending=False, page=None):
+    """``keyset_page`` for async views."""
+    sort_name = sort_name or fields[0]
+    rows = [row async for row in keyset_slice(queryset, fields, page_size, cursor, sort_name, descending, page)]
+    return finish_page(rows, fields, page_size, sort_name)
+
+
+def keyset_slice(queryset, fields, page_size, cursor, sort_name, descending, page):
+    """The unevaluated queryset for one page plus one row to tell whether more follow."""
+    prefix = "-" if descending else ""
+    queryset = queryset.order_by(*(prefix + f for f in fields))
+
+    if cursor:
+        values = decode_cursor(cursor, sort_name)
+        if len(values) != len(fields):
+            raise PaginationError("Invalid cursor")
+        return queryset.filter(keyset_filter(fields, values, descending))[:page_size + 1]
+    offset = ((page or 1) - 1) * page_size
+    return queryset[offset:offset + page_size + 1]
+
+
+def finish_page(rows, fields, page_size, sort_name):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_name, [last[f] for f in fields])
+    return rows, next_cursor
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+# Bump when the PDF layout changes so previously cached renders are not served.
+PDF_LAYOUT_VERSION = 1
+
+DEFAULT_PDF_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+
+def cache_dir():
+    return Path(getattr(settings, "PDF_CACHE_DIR", Path(settings.MEDIA_ROOT) / "pdf_cache"))
+
+
+def max_cache_bytes():
+    return getattr(settings, "PDF_CACHE_MAX_BYTES", DEFAULT_PDF_CACHE_MAX_BYTES)
+
+
+def file_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns if path else None
+    except OSError:
+        return None
+
+
+def content_key(kind, fields, files=()):
+    """Hash of everything that ends up in the rendered document.
+
+    ``files`` are image paths drawn into the PDF; their mtimes are part of the
+    key so replacing a photo produces a new render.
+    """
+    payload = {
+        "kind": kind,
+        "layout": PDF_LAYOUT_VERSION,
+        "fields": fields,
+        "files": [(str(path), file_mtime(path)) for path in files],
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _touch(path):
+    # atime records recency for LRU eviction; mtime stays the render time and
+    # backs Last-Modified.
+    stat = path.stat()
+    os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+    return stat
+
+
+def cached_path(key):
+    path = cache_dir() / f"{key}.pdf"
+    try:
+        _touch(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def get_or_render(key, render):
+    """Return the cached PDF path for ``key``, calling ``render(fileobj)`` on a miss."""
+    path = cached_path(key)
+    if path is not None:
+        return path
+
+    directory = cache_dir()
+    path = directory / f"{key}.pdf"
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            render(tmp)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    evict(keep=path)
+    return path
+
+
+def evict(keep=None):
+    limit = max_cache_bytes()
+    entries = []
+    total = 0
+    for entry in os.scandir(cache_dir()):
+        if not entry.name.endswith(".pdf"):
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_atime_ns, stat.st_size, entry.path))
+        total += stat.st_size
+
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        if keep is not None and os.path.samefile(path, keep):
+            continue
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def cached_pdf_response(request, key, filename, render):
+    """Serve a PDF keyed on ``key``: 304 if the client has it, else the cached or fresh file."""
+    etag = quote_etag(key)
+    path = cache_dir() / f"{key}.pdf"
+    last_modified = int(path.stat().st_mtime) if path.exists() else None
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    path = get_or_render(key, render)
+    response = FileResponse(open(path, "rb"), as_attachment=True, filename=filename, content_type="application/pdf")
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(path.stat().st_mtime)
+    response["Cache-Control"] = "private, no-cache"
+    return response
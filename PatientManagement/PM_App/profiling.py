@@ -0,0 +1,247 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .percentiles import percentile
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILING_SAMPLES = 1000
+# A statement run this many times in one request, with different
+# parameters, is reported as a likely N+1 query.
+REPEATED_QUERY_THRESHOLD = 5
+LOGGED_SQL_LENGTH = 200
+
+current_profile = ContextVar("current_profile", default=None)
+
+
+class RequestProfile:
+    """What one request spent on the database and on JSON encoding.
+
+    Only ``detailed`` profiles remember statements, for duplicate detection;
+    otherwise recording a query is just a count and a sum.
+    """
+
+    def __init__(self, detailed=True):
+        self.started = time.perf_counter()
+        self.detailed = detailed
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.statements = Counter()
+        self.executions = Counter()
+
+    def add_query(self, sql, params, seconds):
+        self.queries += 1
+        self.sql_seconds += seconds
+        if not self.detailed:
+            return
+        self.statements[sql] += 1
+        try:
+            self.executions[(sql, repr(params))] += 1
+        except Exception:
+            pass
+
+    @property
+    def duplicates(self):
+        """Queries that repeated an earlier one exactly (same SQL and parameters)."""
+        return sum(count - 1 for count in self.executions.values() if count > 1)
+
+    def repeated_statements(self):
+        return [
+            {"sql": sql[:LOGGED_SQL_LENGTH], "count": count}
+            for sql, count in self.statements.most_common()
+            if count >= REPEATED_QUERY_THRESHOLD
+        ]
+
+
+def record_query(execute, sql, params, many, context):
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, params, time.perf_counter() - started)
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def record_queries():
+    """Record queries on connections opened from now on, and on this thread's open ones."""
+    connection_created.connect(install_query_recorder)
+    record_open_connections()
+
+
+def record_open_connections():
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
+
+
+def start_profile(detailed=True):
+    """The profile of the current request, creating it if no middleware has yet.
+
+    Returns ``(profile, token)``; pass the token to ``current_profile.reset``
+    once the request is done. It is None when an outer middleware owns the
+    profile.
+    """
+    profile = current_profile.get()
+    if profile is not None:
+        profile.detailed = profile.detailed or detailed
+        return profile, None
+    profile = RequestProfile(detailed)
+    return profile, current_profile.set(profile)
+
+
+def end_profile(token):
+    if token is not None:
+        current_profile.reset(token)
+
+
+def record_serialization():
+    """Time JSON encoding through DjangoJSONEncoder, the encoder JsonResponse uses by default."""
+    if getattr(DjangoJSONEncoder.encode, "records_profile", False):
+        return
+    encode = DjangoJSONEncoder.encode
+
+    def timed_encode(self, o):
+        profile = current_profile.get()
+        if profile is None:
+            return encode(self, o)
+        started = time.perf_counter()
+        try:
+            return encode(self, o)
+        finally:
+            profile.serialize_seconds += time.perf_counter() - started
+
+    timed_encode.records_profile = True
+    DjangoJSONEncoder.encode = timed_encode
+
+
+class ProfileStats:
+    """Recent request profiles per URL name, kept per process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.samples = defaultdict(lambda: deque(maxlen=getattr(settings, "PROFILING_SAMPLES", DEFAULT_PROFILING_SAMPLES)))
+            self.requests = Counter()
+
+    def add(self, name, report):
+        with self._lock:
+            self.requests[name] += 1
+            self.samples[name].append(report)
+
+    def snapshot(self):
+        with self._lock:
+            samples = {name: list(reports) for name, reports in self.samples.items()}
+            requests = dict(self.requests)
+        endpoints = {}
+        for name, reports in samples.items():
+            def column(key):
+                return sorted(report[key] for report in reports if report[key] is not None)
+            total, queries, sql = column("total_ms"), column("queries"), column("sql_ms")
+            sizes = column("response_bytes")
+            endpoints[name] = {
+                "requests": requests[name],
+                "samples": len(reports),
+                "total_ms": {"p50": percentile(total, 0.5), "p95": percentile(total, 0.95), "p99": percentile(total, 0.99)},
+                "sql_ms": {"p50": percentile(sql, 0.5), "p95": percentile(sql, 0.95)},
+                "queries": {"p50": percentile(queries, 0.5), "p95": percentile(queries, 0.95), "max": queries[-1] if queries else 0},
+                "serialize_ms_p95": percentile(column("serialize_ms"), 0.95),
+                "response_bytes_p50": percentile(sizes, 0.5),
+                "with_duplicates": sum(1 for report in reports if report["duplicates"]),
+            }
+        return dict(sorted(endpoints.items(), key=lambda item: -item[1]["total_ms"]["p95"]))
+
+
+stats = ProfileStats()
+
+
+class ProfilingMiddleware:
+    """Measure what each request costs: queries, SQL time, duplicate queries,
+    JSON encoding time and response size.
+
+    Each response gets a Server-Timing header, each request a JSON log line
+    on the PM_App.profiling logger, and per URL name percentiles collect in
+    ``stats`` (see the staff-only /profiling/ endpoint). Enabled with
+    PERFORMANCE_PROFILING. Streaming responses are timed up to the first
+    byte and their size is not known.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PERFORMANCE_PROFILING", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        record_queries()
+        record_serialization()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        record_open_connections()
+        profile, token = start_profile()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_profile(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        profile, token = start_profile()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_profile(token)
+        return self.finish(request, response, profile)
+
+    def finish(self, request, response, profile):
+        total = time.perf_counter() - profile.started
+        match = getattr(request, "resolver_match", None)
+        name = (match.view_name if match else None) or "unresolved"
+        report = {
+            "method": request.method,
+            "path": request.path,
+            "url_name": name,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 2),
+            "queries": profile.queries,
+            "sql_ms": round(profile.sql_seconds * 1000, 2),
+            "duplicates": profile.duplicates,
+            "serialize_ms": round(profile.serialize_seconds * 1000, 2),
+            "response_bytes": None if response.streaming else len(response.content),
+        }
+        stats.add(name, report)
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={report["sql_ms"]};desc="{profile.queries} queries, {profile.duplicates} duplicate"',
+            f"serialize;dur={report['serialize_ms']}",
+            f"total;dur={report['total_ms']}",
+        ])
+        repeated = profile.repeated_statements()
+        logger.info(json.dumps({**report, "repeated": repeated} if repeated else report, separators=(",", ":")))
+        return response
@@ -0,0 +1,57 @@
+RESPONSE_SHAPES = ("objects", "table")
+
+
+class ProjectionError(ValueError):
+    pass
+
+
+class Projection:
+    """The columns one list request asked for, and the shape to send them in.
+
+    Rows go out as one object per row, or with ``shape=table`` as arrays
+    under a single ``columns`` list of names.
+    """
+
+    def __init__(self, columns, shape="objects"):
+        self.columns = list(columns)
+        self.shape = shape
+
+    @property
+    def table(self):
+        return self.shape == "table"
+
+    def query_columns(self, *required):
+        """The selected columns plus ``required`` ones the view needs itself (e.g. keyset keys)."""
+        return list(dict.fromkeys([*self.columns, *required]))
+
+    def render(self, rows):
+        if self.table:
+            return [[row[name] for name in self.columns] for row in rows]
+        return [{name: row[name] for name in self.columns} for row in rows]
+
+
+def parse_projection(params, projections, default="detail"):
+    """Read ``fields``, ``projection`` and ``shape`` from query parameters.
+
+    ``projections`` maps names such as summary and detail to column tuples;
+    the ``detail`` one lists every column a client may ask for. ``fields``
+    (comma separated, in the order given) and ``projection`` are exclusive.
+    """
+    shape = params.get("shape") or "objects"
+    if shape not in RESPONSE_SHAPES:
+        raise ProjectionError(f"shape must be one of {', '.join(RESPONSE_SHAPES)}")
+
+    fields = [name.strip() for name in (params.get("fields") or "").split(",") if name.strip()]
+    if not fields:
+        name = params.get("projection") or default
+        if name not in projections:
+            raise ProjectionError(f"projection must be one of {', '.join(projections)}")
+        return Projection(projections[name], shape)
+
+    if params.get("projection"):
+        raise ProjectionError("Give fields or projection, not both")
+    allowed = projections["detail"]
+    for name in fields:
+        if name not in allowed:
+            raise ProjectionError(f"Unknown field {name!r}; fields are {', '.join(allowed)}")
+    return Projection(dict.fromkeys(fields), shape)
@@ -0,0 +1,168 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+
+
+DEFAULT_RESPONSE_CACHE_TIMEOUT = 300
+
+
+def response_cache():
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+class CacheStats:
+    """Per-process hit/miss/invalidation counters, keyed by endpoint or namespace."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = defaultdict(int)
+            self.misses = defaultdict(int)
+            self.invalidations = defaultdict(int)
+
+    def count(self, counter, name):
+        with self._lock:
+            counter[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = sorted(set(self.hits) | set(self.misses))
+            return {
+                "endpoints": {
+                    name: {"hits": self.hits[name], "misses": self.misses[name]} for name in endpoints
+                },
+                "invalidations": dict(self.invalidations),
+            }
+
+
+stats = CacheStats()
+
+
+def _generation_key(namespace):
+    return f"resp-gen:{namespace}"
+
+
+def generations(namespaces):
+    """Current generation of each namespace.
+
+    A missing generation (never set, or evicted) starts from the clock rather
+    than zero so it can never match a generation that older entries were
+    stored under.
+    """
+    cache = response_cache()
+    keys = [_generation_key(ns) for ns in namespaces]
+    found = cache.get_many(keys)
+    result = []
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+        result.append(found[key])
+    return result
+
+
+def invalidate(*namespaces):
+    """Retire every cached response that depends on any of ``namespaces``.
+
+    Generations are bumped straight away and again once the surrounding
+    transaction commits: a reader that re-cached the old rows in between
+    would otherwise keep serving them.
+    """
+    namespaces = set(namespaces)
+    _bump(namespaces)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(namespaces))
+    for namespace in namespaces:
+        stats.count(stats.invalidations, namespace.split(":", 1)[0])
+
+
+def _bump(namespaces):
+    cache = response_cache()
+    for namespace in namespaces:
+        key = _generation_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def patient_namespace(patient_id):
+    """Namespace for everything about one patient (detail and complaints), by patient code."""
+    return f"patient:{patient_id}"
+
+
+def response_key(endpoint, request, namespaces):
+    params = sorted((name, tuple(values)) for name, values in request.GET.lists())
+    raw = repr((request.get_host(), request.path, params, generations(namespaces)))
+    return f"resp:{endpoint}:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+
+def cached_response(endpoint, namespaces, skip=None):
+    """Cache successful GET responses of a view until one of its namespaces is invalidated.
+
+    ``namespaces(request, **kwargs)`` lists what the response depends on;
+    ``skip(request)`` can bypass the cache (e.g. for streaming formats).
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method != "GET" or (skip and skip(request)):
+                    return await view(request, *args, **kwargs)
+
+                cache = response_cache()
+                key = await sync_to_async(response_key)(endpoint, request, namespaces(request, *args, **kwargs))
+                entry = await cache.aget(key)
+                if entry is not None:
+                    return cached_hit(endpoint, entry)
+
+                stats.count(stats.misses, endpoint)
+                response = await view(request, *args, **kwargs)
+                if cacheable(response):
+                    await cache.aset(key, (response.content, response["Content-Type"]), cache_timeout())
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != "GET" or (skip and skip(request)):
+                return view(request, *args, **kwargs)
+
+            cache = response_cache()
+            key = response_key(endpoint, request, namespaces(request, *args, **kwargs))
+            entry = cache.get(key)
+            if entry is not None:
+                return cached_hit(endpoint, entry)
+
+            stats.count(stats.misses, endpoint)
+            response = view(request, *args, **kwargs)
+            if cacheable(response):
+                cache.set(key, (response.content, response["Content-Type"]), cache_timeout())
+            return response
+        return wrapper
+    return decorator
+
+
+def cached_hit(endpoint, entry):
+    stats.count(stats.hits, endpoint)
+    content, content_type = entry
+    return HttpResponse(content, content_type=content_type)
+
+
+def cacheable(response):
+    return response.status_code == 200 and not response.streaming
+
+
+def cache_timeout():
+    return getattr(settings, "RESPONSE_CACHE_TIMEOUT", DEFAULT_RESPONSE_CACHE_TIMEOUT)
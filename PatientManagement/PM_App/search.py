@@ -0,0 +1,83 @@
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Coalesce, Concat, Greatest
+
+from .models import *
+
+
+PATIENT_SEARCH_FIELDS = ("firstname", "middlename", "lastname", "patient_id", "contact_number", "address")
+COMPLAINT_SEARCH_FIELDS = ("chief_complaint", "final_diagnosis")
+
+# Every ``field__icontains`` above compiles to ``UPPER(field::text) LIKE UPPER(...)``
+# on PostgreSQL, which is exactly the expression the trigram indexes in
+# migration 0011 are built on.
+
+
+def _terms(query):
+    return [term for term in query.split() if term]
+
+
+def _match_all_terms(queryset, terms, fields):
+    for term in terms:
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f"{field}__icontains": term})
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def match_patients(queryset, query):
+    """Patients in ``queryset`` matching every term of ``query`` in any searchable field, unranked."""
+    return _match_all_terms(queryset, _terms(query), PATIENT_SEARCH_FIELDS)
+
+
+def search_patients(query):
+    terms = _terms(query)
+    patients = _match_all_terms(Patient.objects.all(), terms, PATIENT_SEARCH_FIELDS)
+
+    if connection.vendor == "postgresql":
+        full_name = Concat(
+            "firstname", Value(" "), Coalesce("middlename", Value("")), Value(" "), "lastname"
+        )
+        rank = Greatest(
+            TrigramSimilarity(full_name, query),
+            TrigramSimilarity("patient_id", query),
+            TrigramSimilarity("contact_number", query),
+            TrigramSimilarity("address", query) * Value(0.5),
+        )
+    else:
+        rank = Case(
+            When(patient_id__iexact=query, then=Value(1.0)),
+            When(patient_id__istartswith=query, then=Value(0.9)),
+            When(Q(firstname__iexact=query) | Q(lastname__iexact=query), then=Value(0.8)),
+            When(Q(firstname__istartswith=query) | Q(lastname__istartswith=query), then=Value(0.6)),
+            When(contact_number__startswith=query, then=Value(0.5)),
+            default=Value(0.3),
+        )
+
+    return patients.annotate(rank=Coalesce(rank, Value(0.0), output_field=FloatField()))
+
+
+def search_complaints(query):
+    terms = _terms(query)
+    complaints = _match_all_terms(Complaint.objects.all(), terms, COMPLAINT_SEARCH_FIELDS)
+
+    if connection.vendor == "postgresql":
+        rank = Greatest(
+            TrigramSimilarity("chief_complaint", query),
+            TrigramSimilarity(Coalesce("final_diagnosis", Value("")), query),
+        )
+    else:
+        rank = Case(
+            When(Q(final_diagnosis__iexact=query) | Q(chief_complaint__iexact=query), then=Value(1.0)),
+            When(final_diagnosis__icontains=query, then=Value(0.6)),
+            default=Value(0.3),
+        )
+
+    return complaints.annotate(
+        rank=Coalesce(rank, Value(0.0), output_field=FloatField()),
+        patient_code=F("patient__patient_id"),
+        patient_firstname=F("patient__firstname"),
+        patient_lastname=F("patient__lastname"),
+    )
@@ -0,0 +1,77 @@
+from django.contrib.auth.signals import user_logged_in, user_login_failed
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .events import publish
+from .metrics import login_attempts, patients_created
+from .models import Complaint, Patient, PatientComplaintArchive, PatientTombstone
+from .response_cache import invalidate, patient_namespace
+
+
+def change_action(kwargs):
+    if kwargs.get("signal") is post_delete:
+        return "deleted"
+    return "created" if kwargs.get("created") else "updated"
+
+
+@receiver(post_save, sender=Patient)
+def patient_saved(sender, instance, **kwargs):
+    invalidate("patients", patient_namespace(instance.patient_id))
+    publish("patient", action=change_action(kwargs), patient_id=instance.patient_id, change_seq=instance.change_seq)
+    if kwargs.get("created"):
+        transaction.on_commit(patients_created.inc)
+
+
+def deleted_with_patient(kwargs):
+    """Whether this delete is part of a patient's cascade, which patient_deleted covers once."""
+    origin = kwargs.get("origin")
+    return isinstance(origin, Patient) or getattr(origin, "model", None) is Patient
+
+
+@receiver(post_delete, sender=Patient)
+def patient_deleted(sender, instance, **kwargs):
+    # The cascade took the patient's complaints along and unlinked their
+    # archive copies; one bump here stands in for a signal per complaint.
+    invalidate("patients", patient_namespace(instance.patient_id), "archives")
+    change_seq = Patient.allocate_change_seqs()[0]
+    PatientTombstone.objects.create(patient_id=instance.patient_id, change_seq=change_seq)
+    publish("patient", action="deleted", patient_id=instance.patient_id, change_seq=change_seq)
+
+
+@receiver([post_save, post_delete], sender=Complaint)
+def complaint_changed(sender, instance, **kwargs):
+    if deleted_with_patient(kwargs):
+        return
+    if Complaint.patient.is_cached(instance):
+        patient_id = instance.patient.patient_id
+    else:
+        patient_id = Patient.objects.filter(pk=instance.patient_id).values_list("patient_id", flat=True).first()
+    namespaces = []
+    if patient_id:
+        namespaces.append(patient_namespace(patient_id))
+    if kwargs.get("signal") is post_delete:
+        # Deleting a complaint unlinks its archive copy.
+        namespaces.append("archives")
+    invalidate(*namespaces)
+    publish("complaint", action=change_action(kwargs), complaint_id=instance.id, patient_id=patient_id)
+
+
+@receiver([post_save, post_delete], sender=PatientComplaintArchive)
+def archive_changed(sender, instance, **kwargs):
+    # Complaint listings show whether each complaint is archived.
+    invalidate("archives", patient_namespace(instance.patient_id))
+    publish(
+        "archive", action=change_action(kwargs), archive_id=instance.id,
+        complaint_id=instance.complaint_id, patient_ids=[instance.patient_id],
+    )
+
+
+@receiver(user_logged_in)
+def login_succeeded(sender, **kwargs):
+    login_attempts.inc(outcome="success")
+
+
+@receiver(user_login_failed)
+def login_failed(sender, **kwargs):
+    login_attempts.inc(outcome="failure")
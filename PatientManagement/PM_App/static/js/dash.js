@@ -46,11 +46,7 @@ function deletePatient(patientId) {
     .then(data => {
         if (data.status === "success") {
             showNotification(data.message, "success");
-
-            const row = document.querySelector(`tr[data-patient-id="${patientId}"]`);
-            if (row) {
-                row.remove();
-            }
+            loadPatientTable(currentPage);
         } else {
             showNotification(data.message || "Failed to delete patient", "error");
         }
@@ -64,66 +60,199 @@ function deletePatient(patientId) {
     });
 }
 
-function loadPatientTable() {
-    fetch('/patients/api/')
-        .then(res => res.json())
-        .then(data => {
-            const tbody = document.querySelector('#patientTable tbody');
-            tbody.innerHTML = '';
-
-            data.patients.forEach(p => {
-                const tr = document.createElement('tr');
-
-                tr.dataset.patientId = p.patient_id;
-                tr.dataset.firstname = p.firstname;
-                tr.dataset.middlename = p.middlename || '';
-                tr.dataset.lastname = p.lastname;
-                tr.dataset.birthdate = p.birthdate;
-                tr.dataset.age = p.age;
-                tr.dataset.gender = p.gender;
-                tr.dataset.address = p.address;
-                tr.dataset.contactNumber = p.contact_number;
-                tr.dataset.bloodPressure = p.blood_pressure;
-                tr.dataset.weight = p.weight;
-                tr.dataset.height = p.height;
-                tr.dataset.profile = p.profile_image;
-
-                tr.innerHTML = `
-                    <td>${p.patient_id}</td>
-                    <td>${p.contact_number}</td>
-                    <td>${p.firstname} ${p.middlename || ''} ${p.lastname}</td>
-                    <td>${p.birthdate}</td>
-                    <td>${p.age}</td>
-                    <td>${p.gender}</td>
-                    <td>${p.address}</td>
-                    <td>${p.blood_pressure}</td>
-                    <td>${p.weight}</td>
-                    <td>${p.height}</td>
-                    <td class="action-buttons">
-                        <button onclick="openComplaintsModal('${p.patient_id}')" class="btn-action btn-info">📄 Complaints</button>
-                        <button onclick="update_this_Patient('${p.patient_id}')" class="btn-action btn-edit">✏️ Update</button>
-                        <button onclick="deletePatient('${ p.patient_id }')" class="btn-action btn-delete">🗑️ Delete</button>
-                    </td>
-                `;
+// Live updates from /events/: changes made at other terminals or by
+// background jobs refresh only the views they touch.
+let openComplaintsPatientId = null;
+let liveRefreshTimer = null;
+const liveRefresh = new Set();
 
-                tbody.appendChild(tr);
-            });
+function connectLiveEvents() {
+    if (!window.EventSource) return;
+
+    const source = new EventSource('/events/');
+    source.addEventListener('patient', event => {
+        const data = JSON.parse(event.data);
+        if (patientSyncToken === null || data.change_seq > patientSyncToken) {
+            scheduleLiveRefresh('patients');
+        }
+    });
+    source.addEventListener('complaint', event => {
+        const data = JSON.parse(event.data);
+        if (data.patient_id === openComplaintsPatientId) {
+            scheduleLiveRefresh('complaints');
+        }
+    });
+    source.addEventListener('archive', event => {
+        const data = JSON.parse(event.data);
+        scheduleLiveRefresh('archives');
+        if ((data.patient_ids || []).includes(openComplaintsPatientId)) {
+            scheduleLiveRefresh('complaints');
+        }
+    });
+    source.addEventListener('reset', () => {
+        ['patients', 'complaints', 'archives'].forEach(scheduleLiveRefresh);
+    });
+}
+
+function scheduleLiveRefresh(what) {
+    // Bursts (imports, bulk archiving) collapse into one refresh.
+    liveRefresh.add(what);
+    clearTimeout(liveRefreshTimer);
+    liveRefreshTimer = setTimeout(applyLiveRefresh, 300);
+}
+
+function applyLiveRefresh() {
+    const pending = new Set(liveRefresh);
+    liveRefresh.clear();
+
+    if (pending.has('patients') && document.getElementById('patientTable')) {
+        syncVisiblePatients();
+    }
+    if (pending.has('complaints') && openComplaintsPatientId) {
+        showComplaints(openComplaintsPatientId);
+    }
+    const archivedView = document.getElementById('archived-view');
+    if (pending.has('archives') && archivedView && archivedView.classList.contains('active')) {
+        showArchived();
+    }
+}
 
-            filteredData = Array.from(tbody.querySelectorAll('tr'));
-            currentPage = 0;
-            updatePagination();
-            displayTablePage();
+// The visible page keyed by patient_id, and the /patients/changes/ token it
+// is current to. Live patient events pull the delta since that token and
+// patch these rows in place; the page is only fetched again when the delta
+// may change which patients belong on it.
+const PATIENT_DELTA_LIMIT = 200;
+let visiblePatients = new Map();
+let patientSyncToken = null;
+let patientPageVersion = 0;
+let patientSync = Promise.resolve();
+
+function loadPatientTable(page = 0) {
+    // One page at a time from the server; pages already visited are
+    // reached again by their keyset cursor.
+    return fetch(`/patients/api/?${patientListQuery(page)}`)
+        .then(res => {
+            if (!res.ok) {
+                throw new Error(`Server error: ${res.status}`);
+            }
+            return res.json();
         })
+        .then(data => renderPatientTable(page, data))
         .catch(err => console.error('Failed to load patients:', err));
 }
 
+function syncVisiblePatients() {
+    // Syncs run one after another so each starts from the previous token.
+    patientSync = patientSync
+        .then(applyPatientChanges)
+        .catch(err => console.error('Failed to sync patients:', err));
+    return patientSync;
+}
+
+async function applyPatientChanges() {
+    if (patientSyncToken === null) {
+        return loadPatientTable(currentPage);
+    }
+    const pageVersion = patientPageVersion;
+    const res = await fetch(`/patients/changes/?since=${patientSyncToken}&limit=${PATIENT_DELTA_LIMIT}`);
+    if (!res.ok) {
+        throw new Error(`Server error: ${res.status}`);
+    }
+    const data = await res.json();
+    if (pageVersion !== patientPageVersion) {
+        // A page load finished meanwhile and is at least as new as this delta.
+        return;
+    }
+
+    // An expired token, or a burst (an import) bigger than one delta page.
+    if (data.reset || data.has_more) {
+        return loadPatientTable(currentPage);
+    }
+
+    // Patients are listed in id order, so new ones only land on the last
+    // page; with a search, any edit can move a patient in or out of it.
+    const lastPage = !pageCursors[currentPage + 1];
+    const searching = currentSearchTerm() !== '';
+    const reload = data.deleted.some(patientId => visiblePatients.has(patientId))
+        || data.upserts.some(p => !visiblePatients.has(p.patient_id) && lastPage)
+        || (searching && data.upserts.length > 0);
+    if (reload) {
+        return loadPatientTable(currentPage);
+    }
+
+    data.upserts.forEach(p => {
+        if (visiblePatients.has(p.patient_id)) {
+            visiblePatients.set(p.patient_id, p);
+        }
+    });
+    patientSyncToken = data.token;
+    renderPatientRows();
+}
+
+function renderPatientTable(page, data) {
+    visiblePatients = new Map(data.patients.map(p => [p.patient_id, p]));
+    patientSyncToken = data.sync_token;
+    patientPageVersion += 1;
+    renderPatientRows();
+
+    currentPage = page;
+    totalEntries = data.total;
+    pageCursors[page + 1] = data.next_cursor;
+    updatePagination();
+    updatePaginationInfo();
+}
+
+function renderPatientRows() {
+    const tbody = document.querySelector('#patientTable tbody');
+    if (!tbody) return;
+    tbody.innerHTML = '';
+
+    visiblePatients.forEach(p => {
+        const tr = document.createElement('tr');
+
+        tr.dataset.patientId = p.patient_id;
+        tr.dataset.firstname = p.firstname;
+        tr.dataset.middlename = p.middlename || '';
+        tr.dataset.lastname = p.lastname;
+        tr.dataset.birthdate = p.birthdate;
+        tr.dataset.age = p.age;
+        tr.dataset.gender = p.gender;
+        tr.dataset.address = p.address;
+        tr.dataset.contactNumber = p.contact_number;
+        tr.dataset.bloodPressure = p.blood_pressure;
+        tr.dataset.weight = p.weight;
+        tr.dataset.height = p.height;
+        tr.dataset.profile = p.profile_image;
+
+        tr.innerHTML = `
+            <td>${p.patient_id}</td>
+            <td>${p.contact_number}</td>
+            <td>${p.firstname} ${p.middlename || ''} ${p.lastname}</td>
+            <td>${p.birthdate}</td>
+            <td>${p.age}</td>
+            <td>${p.gender}</td>
+            <td>${p.address}</td>
+            <td>${p.blood_pressure}</td>
+            <td>${p.weight}</td>
+            <td>${p.height}</td>
+            <td class="action-buttons">
+                <button onclick="openComplaintsModal('${p.patient_id}')" class="btn-action btn-info">📄 Complaints</button>
+                <button onclick="update_this_Patient('${p.patient_id}')" class="btn-action btn-edit">✏️ Update</button>
+                <button onclick="deletePatient('${ p.patient_id }')" class="btn-action btn-delete">🗑️ Delete</button>
+            </td>
+        `;
+
+        tbody.appendChild(tr);
+    });
+}
+
 function update_this_Patient(patientId) {
     showLoading();
-    fetch(`/patients/api/`)
+    fetch(`/api/patients/${encodeURIComponent(patientId)}/`)
     .then(res => res.json())
     .then(data => {
-        const patient = data.patients.find(p => p.patient_id === patientId);
-        if (!patient) {
+        const patient = data.patient;
+        if (!data.success || !patient) {
             showNotification("Patient not found", "error");
             return;
         }
@@ -176,6 +305,7 @@ function submitPatientUpdate() {
         if (data.status === "success") {
             showNotification("Patient updated successfully!", "success");
             closePatientModal();
+            loadPatientTable(currentPage);
         } else {
             showNotification(data.message || "Update failed", "error");
         }
@@ -193,7 +323,6 @@ function closePatientModal() {
     document.getElementById("patientModal").style.display = "none";
 }
 
-document.addEventListener('DOMContentLoaded', loadPatientTable);
 
 function getCSRFToken() {
     return document.querySelector('[name=csrfmiddlewaretoken]').value;
@@ -201,7 +330,9 @@ function getCSRFToken() {
 
 let currentPage = 0;
 let entriesPerPage = 10;
-let filteredData = [];
+let totalEntries = 0;
+let pageCursors = [null];
+let searchTimer = null;
 
 function toggleSidebar() {
     const sidebar = document.getElementById('sidebar');
@@ -254,25 +385,31 @@ function showView(viewName) {
     }
 }
 
-function showArchived() {
+function showArchived(cursor = null) {
     showLoading();
 
-    fetch(`/archived/`, {
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+
+    fetch(`/archived/${query}`, {
         method: "GET",
         headers: { "X-Requested-With": "XMLHttpRequest" }
     })
     .then(res => res.json())
     .then(data => {
         const archivedDiv = document.getElementById("archivedContent");
-        archivedDiv.innerHTML = "";
+        if (!cursor) archivedDiv.innerHTML = "";
 
-        console.log("Archives array:", data.archives);
+        const loadMoreBtn = document.getElementById("archivedLoadMore");
+        if (loadMoreBtn) loadMoreBtn.remove();
 
-        if (!data.archives || data.archives.length === 0) {
+        if (!cursor && (!data.archives || data.archives.length === 0)) {
             archivedDiv.innerHTML = "<p>No archived complaints available.</p>";
         } else {
-            const list = document.createElement("ul");
-            list.classList.add("archived-list");
+            let list = archivedDiv.querySelector("ul.archived-list");
+            if (!list) {
+                list = document.createElement("ul");
+                list.classList.add("archived-list");
+            }
 
             data.archives.forEach(a => {
                 const item = document.createElement("li");
@@ -308,6 +445,15 @@ function showArchived() {
             });
 
             archivedDiv.appendChild(list);
+
+            if (data.has_more) {
+                const moreBtn = document.createElement("button");
+                moreBtn.id = "archivedLoadMore";
+                moreBtn.className = "btn-action btn-info";
+                moreBtn.textContent = "Load more";
+                moreBtn.addEventListener("click", () => showArchived(data.next_cursor));
+                archivedDiv.appendChild(moreBtn);
+            }
         }
     })
     .catch(err => {
@@ -532,7 +678,7 @@ document.getElementById('complaintForm').addEventListener('submit', function(e)
                 previewImg.src = '/static/images/default-avatar.png';
             }
             
-            loadPatientTable();
+            initializeTable();
         } else {
             showNotification(data.error || 'Failed to save complaint', 'error');
         }
@@ -585,66 +731,55 @@ function showNotification(message, type = 'info') {
     }, 3000);
 }
 
+function currentSearchTerm() {
+    const searchInput = document.getElementById('searchInput');
+    return searchInput ? searchInput.value.trim() : '';
+}
+
+function patientListQuery(page) {
+    const params = new URLSearchParams({ page_size: entriesPerPage, with_total: 1, with_token: 1 });
+
+    // The server matches every term against names, patient ID, contact
+    // number and address.
+    const searchTerm = currentSearchTerm();
+    if (searchTerm) {
+        params.set('q', searchTerm);
+    }
+
+    if (pageCursors[page]) {
+        params.set('cursor', pageCursors[page]);
+    } else {
+        params.set('page', page + 1);
+    }
+    return params;
+}
+
 function initializeTable() {
     const table = document.getElementById('patientTable');
     if (!table) return;
-    
-    const tbody = table.querySelector('tbody');
-    const rows = Array.from(tbody.querySelectorAll('tr'));
-    
-    filteredData = rows;
-    
-    updatePagination();
-    displayTablePage();
+
+    pageCursors = [null];
+    loadPatientTable(0);
 }
 
 function searchTable() {
-    const searchInput = document.getElementById('searchInput');
-    const searchTerm = searchInput.value.toLowerCase();
-    const table = document.getElementById('patientTable');
-    const tbody = table.querySelector('tbody');
-    const rows = Array.from(tbody.querySelectorAll('tr'));
-    
-    filteredData = rows.filter(row => {
-        const text = row.textContent.toLowerCase();
-        return text.includes(searchTerm);
-    });
-    
-    currentPage = 0;
-    
-    updatePagination();
-    displayTablePage();
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(initializeTable, 250);
 }
 
 function changeEntries() {
     const select = document.getElementById('entriesSelect');
     entriesPerPage = parseInt(select.value);
-    currentPage = 0;
-    
-    updatePagination();
-    displayTablePage();
-}
 
-function displayTablePage() {
-    const table = document.getElementById('patientTable');
-    if (!table) return;
-    
-    const tbody = table.querySelector('tbody');
-    
-    const allRows = Array.from(tbody.querySelectorAll('tr'));
-    allRows.forEach(row => row.style.display = 'none');
-    
-    const start = currentPage * entriesPerPage;
-    const end = start + entriesPerPage;
-    const pageRows = filteredData.slice(start, end);
-    
-    pageRows.forEach(row => row.style.display = '');
+    initializeTable();
+}
 
-    updatePaginationInfo();
+function goToPage(page) {
+    loadPatientTable(page);
 }
 
 function updatePagination() {
-    const totalPages = Math.ceil(filteredData.length / entriesPerPage);
+    const totalPages = Math.ceil(totalEntries / entriesPerPage);
     const pageNumbers = document.getElementById('pageNumbers');
     
     if (!pageNumbers) return;
@@ -660,11 +795,7 @@ function updatePagination() {
             pageBtn.classList.add('active');
         }
         
-        pageBtn.addEventListener('click', () => {
-            currentPage = i;
-            displayTablePage();
-            updatePaginationButtons();
-        });
+        pageBtn.addEventListener('click', () => goToPage(i));
         
         pageNumbers.appendChild(pageBtn);
     }
@@ -673,7 +804,6 @@ function updatePagination() {
 }
 
 function updatePaginationButtons() {
-    const totalPages = Math.ceil(filteredData.length / entriesPerPage);
     const prevBtn = document.getElementById('prevBtn');
     const nextBtn = document.getElementById('nextBtn');
     
@@ -682,7 +812,7 @@ function updatePaginationButtons() {
     }
     
     if (nextBtn) {
-        nextBtn.disabled = currentPage >= totalPages - 1;
+        nextBtn.disabled = !pageCursors[currentPage + 1];
     }
     
     document.querySelectorAll('.page-number').forEach((btn, index) => {
@@ -692,71 +822,75 @@ function updatePaginationButtons() {
 
 function updatePaginationInfo() {
     const start = currentPage * entriesPerPage + 1;
-    const end = Math.min((currentPage + 1) * entriesPerPage, filteredData.length);
-    const total = filteredData.length;
+    const end = Math.min((currentPage + 1) * entriesPerPage, totalEntries);
     
     const startSpan = document.getElementById('showingStart');
     const endSpan = document.getElementById('showingEnd');
     const totalSpan = document.getElementById('totalEntries');
     
-    if (startSpan) startSpan.textContent = filteredData.length > 0 ? start : 0;
+    if (startSpan) startSpan.textContent = totalEntries > 0 ? start : 0;
     if (endSpan) endSpan.textContent = end;
-    if (totalSpan) totalSpan.textContent = total;
+    if (totalSpan) totalSpan.textContent = totalEntries;
 }
 
 function prevPage() {
     if (currentPage > 0) {
-        currentPage--;
-        displayTablePage();
-        updatePaginationButtons();
+        goToPage(currentPage - 1);
     }
 }
 
 function nextPage() {
-    const totalPages = Math.ceil(filteredData.length / entriesPerPage);
-    if (currentPage < totalPages - 1) {
-        currentPage++;
-        displayTablePage();
-        updatePaginationButtons();
+    if (pageCursors[currentPage + 1]) {
+        goToPage(currentPage + 1);
     }
 }
 
 function openComplaintsModal(patientId) {
     const modal = document.getElementById("complaintsModal");
     modal.style.display = "flex";
+    openComplaintsPatientId = patientId;
     showComplaints(patientId); 
 }
 
 function closeComplaintsModal() {
     const modal = document.getElementById("complaintsModal");
     modal.style.display = "none";
+    openComplaintsPatientId = null;
 }
 
-function showComplaints(patientId) {
+function showComplaints(patientId, cursor = null) {
     showLoading();
 
-    fetch(`/patients/${patientId}/complaints/`, {
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+
+    fetch(`/patients/${patientId}/complaints/${query}`, {
         method: "GET",
         headers: { "X-Requested-With": "XMLHttpRequest" }
     })
     .then(res => res.json())
     .then(data => {
         const complaintsDiv = document.getElementById("complaintsContent");
-        complaintsDiv.innerHTML = "";
-    
-        const patientInfo = `
-            <h4>Patient: ${data.patient.firstname} ${data.patient.lastname} (${data.patient.patient_id})</h4>
-            <p><em>Gender:</em> ${data.patient.gender}, <em>Age:</em> ${data.patient.age}</p>
-            <p><em>Address:</em> ${data.patient.address}</p>
-            <hr>
-        `;
-        complaintsDiv.innerHTML = patientInfo;
+
+        const loadMoreBtn = document.getElementById("complaintsLoadMore");
+        if (loadMoreBtn) loadMoreBtn.remove();
+
+        if (!cursor) {
+            complaintsDiv.innerHTML = `
+                <h4>Patient: ${data.patient.firstname} ${data.patient.lastname} (${data.patient.patient_id})</h4>
+                <p><em>Gender:</em> ${data.patient.gender}, <em>Age:</em> ${data.patient.age}</p>
+                <p><em>Address:</em> ${data.patient.address}</p>
+                <hr>
+            `;
+        }
     
-        if (data.complaints.length === 0) {
+        if (!cursor && data.complaints.length === 0) {
             complaintsDiv.innerHTML += "<p>No complaints recorded for this patient.</p>";
         } else {
-            const list = document.createElement("ul");
-            list.classList.add("complaints-list");
+            let list = complaintsDiv.querySelector("ul.complaints-list");
+            if (!list) {
+                list = document.createElement("ul");
+                list.classList.add("complaints-list");
+            }
     
             data.complaints.forEach(c => {
                 const item = document.createElement("li");
@@ -804,6 +938,15 @@ function showComplaints(patientId) {
             });
             
             complaintsDiv.appendChild(list);
+
+            if (data.has_more) {
+                const moreBtn = document.createElement("button");
+                moreBtn.id = "complaintsLoadMore";
+                moreBtn.className = "btn-action btn-info";
+                moreBtn.textContent = "Load more";
+                moreBtn.addEventListener("click", () => showComplaints(patientId, data.next_cursor));
+                complaintsDiv.appendChild(moreBtn);
+            }
         }
     })    
     .catch(err => {
@@ -1180,7 +1323,7 @@ document.getElementById('addPatientForm').addEventListener('submit', function(e)
             form.reset();
             document.getElementById('patientPreview').src = '/static/img/default.png';
             hideLoading();
-            loadPatientTable();
+            initializeTable();
         }
     })
     .catch(err => {
@@ -1204,6 +1347,7 @@ window.addEventListener('resize', handleResize);
 
 document.addEventListener('DOMContentLoaded', function() {
     initializeTable();
+    connectLiveEvents();
     
     handleResize();
     
@@ -0,0 +1,71 @@
+from .models import Patient, PatientTombstone
+
+
+SYNC_PAGE_SIZE = 500
+MAX_SYNC_PAGE_SIZE = 5000
+
+
+class SyncTokenError(ValueError):
+    pass
+
+
+def parse_token(value):
+    """A change token is the change_seq of the last change the client applied; empty means 0."""
+    if value in (None, ""):
+        return 0
+    try:
+        token = int(value)
+    except (TypeError, ValueError):
+        raise SyncTokenError("since must be a token returned by a previous sync")
+    if token < 0:
+        raise SyncTokenError("since must be a token returned by a previous sync")
+    return token
+
+
+def current_token():
+    return Patient.current_change_seq()
+
+
+def patient_changes(since, fields, limit=SYNC_PAGE_SIZE, until=None):
+    """Patients written and deleted after change ``since``, oldest change first.
+
+    Returns ``(upserts, deleted, token, has_more)``. ``upserts`` are rows of
+    ``fields`` for patients whose latest write is after ``since`` and
+    ``deleted`` the patient codes removed since then; ``token`` is the last
+    change included, to pass as ``since`` next time. A patient deleted and
+    re-created under the same code shows up in both, so clients drop the
+    deletions before applying the upserts. Starting from 0 there is nothing
+    to delete, so tombstones are not read at all. Changes after ``until``
+    (by default ``current_token()``) are left for the next call.
+    """
+    # Numbers above current_token() can be committed while a lower one is
+    # still in flight; handing them out would skip that one for good.
+    if until is None:
+        until = current_token()
+    upserts = list(
+        Patient.objects.filter(change_seq__gt=since, change_seq__lte=until)
+        .order_by("change_seq")
+        .values("change_seq", *fields)[:limit + 1]
+    )
+    tombstones = []
+    if since:
+        tombstones = list(
+            PatientTombstone.objects.filter(change_seq__gt=since, change_seq__lte=until)
+            .order_by("change_seq")
+            .values("change_seq", "patient_id")[:limit + 1]
+        )
+
+    changes = sorted(
+        [(row["change_seq"], row, False) for row in upserts]
+        + [(row["change_seq"], row, True) for row in tombstones],
+        key=lambda change: change[0],
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    token = changes[-1][0] if changes else since
+    deleted = [row["patient_id"] for _, row, is_tombstone in changes if is_tombstone]
+    upserts = [row for _, row, is_tombstone in changes if not is_tombstone]
+    for row in upserts:
+        del row["change_seq"]
+    return upserts, deleted, token, has_more
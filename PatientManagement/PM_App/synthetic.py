@@ -0,0 +1,113 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Max
+
+from .archiving import ARCHIVE_BATCH_SIZE, bulk_archive
+from .events import publish
+from .importers import IMPORT_BATCH_SIZE, PatientImporter
+from .models import Complaint, Patient
+from .response_cache import invalidate, patient_namespace
+
+
+FIRSTNAMES = (
+    "Juan", "Maria", "Jose", "Ana", "Pedro", "Rosa", "Miguel", "Carmen", "Antonio", "Luz",
+    "Ramon", "Elena", "Carlos", "Teresa", "Andres", "Gloria", "Manuel", "Josefina", "Ricardo", "Lourdes",
+)
+LASTNAMES = (
+    "Dela Cruz", "Santos", "Reyes", "Garcia", "Mendoza", "Bautista", "Villanueva", "Ramos", "Castillo", "Aquino",
+    "Fernandez", "Gonzales", "Torres", "Flores", "Rivera", "Lopez", "Navarro", "Domingo", "Salazar", "Pascual",
+)
+CITIES = ("Manila", "Quezon City", "Cebu", "Davao", "Makati", "Pasig", "Taguig", "Iloilo", "Baguio", "Bacolod")
+COMPLAINTS = (
+    ("Cough", "Acute bronchitis", "Rest and fluids"),
+    ("Fever", "Viral infection", "Paracetamol 500mg"),
+    ("Headache", "Tension headache", "Ibuprofen 400mg"),
+    ("Chest pain", "Costochondritis", "NSAIDs and follow-up"),
+    ("Abdominal pain", "Gastritis", "Omeprazole 20mg"),
+    ("Shortness of breath", "Asthma exacerbation", "Salbutamol nebulization"),
+    ("Back pain", "Lumbar strain", "Physical therapy"),
+    ("Dizziness", "Hypertension", "Amlodipine 5mg"),
+    ("Rash", "Contact dermatitis", "Hydrocortisone cream"),
+    ("Sore throat", "Pharyngitis", "Amoxicillin 500mg"),
+)
+LAB_RESULTS = (("CBC", "Normal"), ("Chest X-ray", "Clear lung fields"), ("Urinalysis", "Unremarkable"), (None, None))
+
+
+def synthetic_patient(rng, today):
+    birthdate = today - timedelta(days=rng.randint(365, 90 * 365))
+    return {
+        "firstname": rng.choice(FIRSTNAMES),
+        "middlename": rng.choice(LASTNAMES) if rng.random() < 0.7 else "",
+        "lastname": rng.choice(LASTNAMES),
+        "address": f"{rng.randint(1, 999)} Rizal St., {rng.choice(CITIES)}",
+        "birthdate": birthdate.isoformat(),
+        "gender": rng.choice(("Male", "Female")),
+        "contact_number": f"09{rng.randint(100000000, 999999999)}",
+        "blood_pressure": f"{rng.randint(100, 160)}/{rng.randint(60, 100)}",
+        "weight": round(rng.uniform(40, 110), 1),
+        "height": round(rng.uniform(145, 190), 1),
+    }
+
+
+def synthetic_complaint(rng, patient_pk):
+    chief_complaint, diagnosis, treatment = rng.choice(COMPLAINTS)
+    lab, result = rng.choice(LAB_RESULTS)
+    return Complaint(
+        patient_id=patient_pk,
+        chief_complaint=chief_complaint,
+        lab_examination=lab,
+        test_result=result,
+        final_diagnosis=diagnosis,
+        treatment=treatment,
+    )
+
+
+def seed_synthetic(patients, complaints_per_patient=0, archived_fraction=0.0, seed=0,
+                   batch_size=IMPORT_BATCH_SIZE, on_batch=None):
+    """Add ``patients`` generated patients, their complaints and archive copies.
+
+    The same ``seed`` always produces the same records, so benchmark runs on
+    different machines or commits measure the same data. Patients go through
+    PatientImporter and archives through bulk_archive, like real imports and
+    archiving; complaints are bulk inserted per batch of patients. Returns a
+    report of what was added.
+    """
+    if patients < 0 or complaints_per_patient < 0 or not 0 <= archived_fraction <= 1:
+        raise ValueError("patients and complaints per patient must be >= 0 and the archived fraction in [0, 1]")
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    today = date.today()
+    report = {"patients": 0, "complaints": 0, "archived": 0}
+
+    first_pk = (Patient.objects.aggregate(Max("id"))["id__max"] or 0) + 1
+    rows = ((number, synthetic_patient(rng, today)) for number in range(1, patients + 1))
+    imported = PatientImporter(batch_size=batch_size).run(rows)
+    report["patients"] = imported.imported
+
+    new_patients = Patient.objects.filter(id__gte=first_pk).order_by("id").values_list("id", "patient_id")
+    last_pk = first_pk - 1
+    while complaints_per_patient:
+        batch = list(new_patients.filter(id__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        complaints = [synthetic_complaint(rng, pk) for pk, _ in batch for _ in range(complaints_per_patient)]
+        with transaction.atomic():
+            created = Complaint.objects.bulk_create(complaints, batch_size=batch_size)
+            # bulk_create sends no post_save signals.
+            invalidate(*(patient_namespace(patient_id) for _, patient_id in batch))
+            publish("complaint", action="imported", count=len(created))
+        report["complaints"] += len(created)
+
+        archived_ids = [complaint.id for complaint in created if rng.random() < archived_fraction]
+        for start in range(0, len(archived_ids), ARCHIVE_BATCH_SIZE):
+            chunk = archived_ids[start:start + ARCHIVE_BATCH_SIZE]
+            report["archived"] += bulk_archive(Complaint.objects.filter(id__in=chunk))["archived"]
+        if on_batch:
+            on_batch(report)
+
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
@@ -1,3 +1,1751 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.http import Http404, JsonResponse
+from django.test import (
+    AsyncRequestFactory, LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from reportlab.platypus import Paragraph
+
+from . import async_views, export_views, views
+from .archiving import archive_copy, bulk_archive
+from .benchmarks import CASES, compare, run_scale
+from .events import broker, record
+from .export_views import PatientFormPDFGenerator, render_record_pdf
+from .exporters import read_columnar
+from .image_cache import PrintImageCache
+from .image_pipeline import RENDITION_SIZES, rendition_name
+from .importers import PatientImporter, age_on, read_rows
+from .loadtest import HttpClient, HttpError, LoadReport, run_load
+from .management.commands.loadtest_reads import discover, read_session
+from .management.commands.loadtest_terminals import TerminalSession, server_exception
+from .metrics import Histogram, http_requests, login_attempts, pdf_pages, registry, upload_bytes
+from .percentiles import percentile
+from .profiling import RequestProfile, end_profile, record_serialization, start_profile, stats as profile_stats
+from .response_cache import response_cache, stats as cache_stats
+from .sync import current_token
+from .synthetic import seed_synthetic
+from .jobs import JobFailed, claim, enqueue, requeue_stale, set_progress, work
+from .models import *
+
+
+def make_patient(**overrides):
+    fields = {
+        "firstname": "Juan",
+        "lastname": "Dela Cruz",
+        "address": "Manila",
+        "birthdate": date(1990, 1, 1),
+        "age": 36,
+        "gender": "Male",
+        "contact_number": "09171234567",
+    }
+    fields.update(overrides)
+    return Patient.objects.create(**fields)
+
+
+class LoggedInTestCase(TestCase):
+    def setUp(self):
+        response_cache().clear()
+        cache_stats.reset()
+        self.user = CustomUser.objects.create_user(username="staff", password="pass12345")
+        self.client.force_login(self.user)
+
+
+class PatientListApiTests(LoggedInTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(12):
+            make_patient(
+                firstname=f"Name{i:02d}",
+                lastname="Santos" if i % 2 else "Reyes",
+                gender="Female" if i % 3 == 0 else "Male",
+                age=20 + i,
+            )
+
+    def test_pages_with_keyset_cursor(self):
+        url = reverse("patients_api")
+        first = self.client.get(url, {"page_size": 5}).json()
+        self.assertEqual(len(first["patients"]), 5)
+        self.assertTrue(first["has_more"])
+
+        seen = [p["patient_id"] for p in first["patients"]]
+        cursor = first["next_cursor"]
+        while cursor:
+            data = self.client.get(url, {"page_size": 5, "cursor": cursor}).json()
+            seen += [p["patient_id"] for p in data["patients"]]
+            cursor = data["next_cursor"]
+
+        self.assertEqual(seen, list(Patient.objects.order_by("id").values_list("patient_id", flat=True)))
+
+    def test_descending_sort_cursor_matches_offset_pages(self):
+        url = reverse("patients_api")
+        first = self.client.get(url, {"page_size": 4, "sort": "-lastname"}).json()
+        by_cursor = self.client.get(url, {"page_size": 4, "sort": "-lastname", "cursor": first["next_cursor"]}).json()
+        by_page = self.client.get(url, {"page_size": 4, "sort": "-lastname", "page": 2}).json()
+        self.assertEqual(by_cursor["patients"], by_page["patients"])
+        self.assertEqual(first["patients"][0]["lastname"], "Santos")
+
+    def test_filters(self):
+        url = reverse("patients_api")
+        data = self.client.get(url, {"gender": "female", "age_min": 23, "with_total": 1}).json()
+        self.assertEqual(data["total"], 3)
+        self.assertTrue(all(p["gender"] == "Female" and p["age"] >= 23 for p in data["patients"]))
+
+        data = self.client.get(url, {"name": "name05 santos"}).json()
+        self.assertEqual([p["firstname"] for p in data["patients"]], ["Name05"])
+
+        make_patient(firstname="Elena", address="12 Rizal Ave, Quezon City", contact_number="09998887777")
+        data = self.client.get(url, {"q": "quezon 0999", "with_total": 1}).json()
+        self.assertEqual(([p["firstname"] for p in data["patients"]], data["total"]), (["Elena"], 1))
+        self.assertEqual(self.client.get(url, {"q": "name07", "with_total": 1}).json()["total"], 1)
+
+    def test_rejects_bad_parameters(self):
+        url = reverse("patients_api")
+        self.assertEqual(self.client.get(url, {"sort": "address"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"cursor": "garbage"}).status_code, 400)
+        cursor = self.client.get(url, {"page_size": 2}).json()["next_cursor"]
+        self.assertEqual(self.client.get(url, {"cursor": cursor, "sort": "age"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"fields": "firstname,password"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"projection": "everything"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"projection": "summary", "fields": "age"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"shape": "csv"}).status_code, 400)
+
+    def test_projections_select_only_their_columns(self):
+        url = reverse("patients_api")
+        detail = self.client.get(url).json()["patients"][0]
+        self.assertEqual(list(detail), list(views.PATIENT_PROJECTIONS["detail"]))
+        self.assertTrue(detail["profile_image"].startswith("http://testserver/"))
+
+        summary = self.client.get(url, {"projection": "summary"}).json()["patients"][0]
+        self.assertEqual(list(summary), list(views.PATIENT_PROJECTIONS["summary"]))
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url, {"fields": "lastname,firstname", "sort": "-age", "page_size": 5}).json()
+        self.assertEqual(data["patients"][0], {"lastname": "Santos", "firstname": "Name11"})
+        page_query = queries.captured_queries[-1]["sql"]
+        self.assertIn('"age"', page_query)
+        self.assertNotIn('"address"', page_query)
+        following = self.client.get(url, {"fields": "lastname,firstname", "sort": "-age", "cursor": data["next_cursor"]})
+        self.assertEqual(following.json()["patients"][0]["firstname"], "Name06")
+
+    def test_table_shape_matches_objects(self):
+        url = reverse("patients_api")
+        objects = self.client.get(url, {"page_size": 5, "projection": "summary"}).json()
+        table = self.client.get(url, {"page_size": 5, "projection": "summary", "shape": "table"}).json()
+        self.assertEqual(table["columns"], list(views.PATIENT_PROJECTIONS["summary"]))
+        self.assertEqual([dict(zip(table["columns"], row)) for row in table["patients"]], objects["patients"])
+        self.assertEqual(table["next_cursor"], objects["next_cursor"])
+        self.assertLess(len(json.dumps(table)), len(json.dumps(self.client.get(url, {"page_size": 5}).json())) / 2)
+
+        image = self.client.get(url, {"fields": "profile_image", "shape": "table"}).json()["patients"][0][0]
+        self.assertEqual("http://testserver" + image, self.client.get(url).json()["patients"][0]["profile_image"])
+
+
+class SearchApiTests(LoggedInTestCase):
+    def setUp(self):
+        super().setUp()
+        self.maria = make_patient(firstname="Maria", lastname="Clara", contact_number="09998887777")
+        self.mario = make_patient(firstname="Mario", lastname="Bautista", address="Quezon City")
+        make_patient(firstname="Jose", lastname="Rizal")
+        Complaint.objects.create(patient=self.maria, chief_complaint="Cough and fever", final_diagnosis="Influenza")
+        Complaint.objects.create(patient=self.mario, chief_complaint="Headache")
+
+    def test_patient_search_ranks_exact_matches_first(self):
+        data = self.client.get(reverse("search_records"), {"q": "maria"}).json()
+        self.assertEqual([r["patient_id"] for r in data["results"]], [self.maria.patient_id])
+
+        data = self.client.get(reverse("search_records"), {"q": "mari"}).json()
+        self.assertEqual({r["firstname"] for r in data["results"]}, {"Maria", "Mario"})
+
+        data = self.client.get(reverse("search_records"), {"q": self.mario.patient_id}).json()
+        self.assertEqual(data["results"][0]["patient_id"], self.mario.patient_id)
+
+    def test_patient_search_matches_contact_and_address(self):
+        data = self.client.get(reverse("search_records"), {"q": "0999888"}).json()
+        self.assertEqual([r["firstname"] for r in data["results"]], ["Maria"])
+        data = self.client.get(reverse("search_records"), {"q": "quezon"}).json()
+        self.assertEqual([r["firstname"] for r in data["results"]], ["Mario"])
+
+    def test_complaint_search(self):
+        data = self.client.get(reverse("search_records"), {"q": "influenza", "type": "complaints"}).json()
+        self.assertEqual(len(data["results"]), 1)
+        self.assertEqual(data["results"][0]["patient_code"], self.maria.patient_id)
+
+    def test_search_paginates(self):
+        for i in range(5):
+            make_patient(firstname=f"Maricel{i}")
+        url = reverse("search_records")
+        first = self.client.get(url, {"q": "mari", "page_size": 4}).json()
+        second = self.client.get(url, {"q": "mari", "page_size": 4, "cursor": first["next_cursor"]}).json()
+        ids = [r["id"] for r in first["results"] + second["results"]]
+        self.assertEqual(len(ids), 7)
+        self.assertEqual(len(set(ids)), 7)
+        self.assertFalse(second["has_more"])
+
+    def test_requires_query(self):
+        self.assertEqual(self.client.get(reverse("search_records"), {"q": "a"}).status_code, 400)
+
+
+class PatientIdSequenceTests(TestCase):
+    def test_ids_are_sequential(self):
+        first = make_patient()
+        second = make_patient()
+        self.assertEqual(first.patient_id, "PT-20260001")
+        self.assertEqual(second.patient_id, "PT-20260002")
+        self.assertEqual(Patient.peek_next_patient_id(), "PT-20260003")
+
+    def test_reserves_contiguous_blocks(self):
+        make_patient()
+        block = Patient.allocate_patient_ids(3)
+        self.assertEqual(block, ["PT-20260002", "PT-20260003", "PT-20260004"])
+        self.assertEqual(make_patient().patient_id, "PT-20260005")
+
+    def test_seeds_from_existing_patients(self):
+        make_patient()
+        Patient.objects.create(
+            patient_id="PT-20269040", firstname="A", lastname="B", address="C",
+            birthdate=date(2000, 1, 1), age=26, gender="Male", contact_number="1",
+        )
+        IdSequence.objects.all().delete()
+        self.assertEqual(make_patient().patient_id, "PT-20269041")
+
+
+class PatientIdSequenceConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        # Checked here rather than at import: the test database settings
+        # only apply once the runner has set the database up.
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("needs a database shared across threads")
+
+    def test_concurrent_allocation_never_collides(self):
+        workers, per_worker = 8, 25
+
+        def register(n):
+            try:
+                ids = []
+                for i in range(per_worker):
+                    if i % 5 == 0:
+                        ids += Patient.allocate_patient_ids(3)
+                    else:
+                        ids.append(make_patient(firstname=f"W{n}-{i}").patient_id)
+                return ids
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(register, range(workers)))
+
+        allocated = [pid for ids in results for pid in ids]
+        self.assertEqual(len(allocated), len(set(allocated)))
+        self.assertEqual(Patient.objects.count(), workers * per_worker * 4 // 5)
+        numbers = sorted(int(pid[len(Patient.PATIENT_ID_PREFIX):]) for pid in allocated)
+        self.assertEqual(numbers, list(range(1, len(allocated) + 1)))
+
+
+class PatientChangeSequenceConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        if connection.vendor != "postgresql":
+            self.skipTest("the change sequence is PostgreSQL's; SQLite runs one writer at a time anyway")
+
+    def test_writers_do_not_queue_and_tokens_wait_for_them(self):
+        first, second = make_patient(firstname="Ana"), make_patient(firstname="Ben")
+        held, release = threading.Event(), threading.Event()
+
+        def in_thread(run):
+            def wrapper():
+                try:
+                    return run()
+                finally:
+                    connection.close()
+            return wrapper
+
+        def slow_update():
+            with transaction.atomic():
+                first.address = "Cebu"
+                first.save()
+                held.set()
+                release.wait(10)
+
+        def quick_update():
+            second.address = "Davao"
+            second.save()
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            slow = pool.submit(in_thread(slow_update))
+            self.assertTrue(held.wait(10))
+            # Used to wait on the counter row until the first write committed.
+            pool.submit(in_thread(quick_update)).result(timeout=5)
+
+            token = pool.submit(in_thread(current_token))
+            with self.assertRaises(FutureTimeout):
+                token.result(timeout=0.3)
+            release.set()
+            slow.result(timeout=10)
+            self.assertGreaterEqual(token.result(timeout=10), max(first.change_seq, second.change_seq))
+
+
+class ComplaintsApiTests(LoggedInTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patient = make_patient()
+        self.complaints = [
+            Complaint.objects.create(patient=self.patient, chief_complaint=f"Complaint {i}")
+            for i in range(30)
+        ]
+        for complaint in self.complaints[::3]:
+            PatientComplaintArchive.objects.create(
+                complaint=complaint, patient_id=self.patient.patient_id, firstname="Juan",
+                lastname="Dela Cruz", address="Manila", birthdate=date(1990, 1, 1), age=36,
+                gender="Male", contact_number="09171234567", chief_complaint=complaint.chief_complaint,
+            )
+
+    def test_constant_query_count(self):
+        url = reverse("get_complaints_json", args=[self.patient.patient_id])
+        # session + user + conditional-GET aggregate + patient + one annotated complaints page
+        with self.assertNumQueries(5):
+            data = self.client.get(url, {"page_size": 100}).json()
+        self.assertEqual(len(data["complaints"]), 30)
+        archived = {c["id"] for c in data["complaints"] if c["is_archived"]}
+        self.assertEqual(archived, {c.id for c in self.complaints[::3]})
+
+    def test_pages_by_date_created(self):
+        url = reverse("get_complaints_json", args=[self.patient.patient_id])
+        first = self.client.get(url, {"page_size": 20}).json()
+        second = self.client.get(url, {"page_size": 20, "cursor": first["next_cursor"]}).json()
+        ids = [c["id"] for c in first["complaints"] + second["complaints"]]
+        self.assertEqual(ids, [c.id for c in self.complaints])
+        self.assertFalse(second["has_more"])
+        self.assertEqual(first["patient"]["patient_id"], self.patient.patient_id)
+
+    def test_summary_table_without_archive_lookup(self):
+        url = reverse("get_complaints_json", args=[self.patient.patient_id])
+        data = self.client.get(url, {"page_size": 100, "projection": "summary", "shape": "table"}).json()
+        self.assertEqual(data["columns"], list(views.COMPLAINT_PROJECTIONS["summary"]))
+        archived = {row[0] for row in data["complaints"] if row[-1]}
+        self.assertEqual(archived, {c.id for c in self.complaints[::3]})
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url, {"fields": "id,chief_complaint", "order": "desc", "page_size": 2}).json()
+        self.assertEqual(data["complaints"][0], {"id": self.complaints[-1].id, "chief_complaint": "Complaint 29"})
+        self.assertNotIn("patientcomplaintarchive", queries.captured_queries[-1]["sql"].lower())
+        self.assertEqual(self.client.get(url, {"fields": "patient"}).status_code, 400)
+
+
+class ArchivedComplaintsApiTests(LoggedInTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patients = [make_patient(firstname=f"P{i}") for i in range(3)]
+        self.archives = []
+        for i in range(9):
+            patient = self.patients[i % 3]
+            complaint = Complaint.objects.create(patient=patient, chief_complaint=f"C{i}")
+            self.archives.append(PatientComplaintArchive.objects.create(
+                complaint=complaint, patient_id=patient.patient_id, firstname=patient.firstname,
+                lastname=patient.lastname, address=patient.address, birthdate=patient.birthdate,
+                age=patient.age, gender=patient.gender, contact_number=patient.contact_number,
+                chief_complaint=complaint.chief_complaint,
+            ))
+        PatientComplaintArchive.objects.filter(pk=self.archives[0].pk).update(
+            date_created=timezone.make_aware(datetime(2025, 12, 31, 23, 0))
+        )
+
+    def test_constant_query_count_and_complaint_ids(self):
+        with self.assertNumQueries(3):
+            data = self.client.get(reverse("get_archived_complaints")).json()
+        self.assertEqual(len(data["archives"]), 9)
+        self.assertEqual(data["archives"][-1]["complaint_id"], self.archives[0].complaint_id)
+
+    def test_keyset_pages_newest_first(self):
+        url = reverse("get_archived_complaints")
+        first = self.client.get(url, {"page_size": 5}).json()
+        second = self.client.get(url, {"page_size": 5, "cursor": first["next_cursor"]}).json()
+        ids = [a["id"] for a in first["archives"] + second["archives"]]
+        expected = list(PatientComplaintArchive.objects.order_by("-date_created", "-id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_filters(self):
+        url = reverse("get_archived_complaints")
+        data = self.client.get(url, {"patient_id": self.patients[1].patient_id}).json()
+        self.assertEqual(len(data["archives"]), 3)
+        data = self.client.get(url, {"date_to": "2025-12-31"}).json()
+        self.assertEqual([a["id"] for a in data["archives"]], [self.archives[0].id])
+        data = self.client.get(url, {"date_from": "2026-01-01"}).json()
+        self.assertEqual(len(data["archives"]), 8)
+        self.assertEqual(self.client.get(url, {"date_from": "yesterday"}).status_code, 400)
+
+    def test_ndjson_stream(self):
+        response = self.client.get(reverse("get_archived_complaints"), {"format": "ndjson"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 9)
+        self.assertEqual(json.loads(lines[-1])["id"], self.archives[0].id)
+
+
+@skipUnless(connection.vendor == "postgresql", "query plans are checked against PostgreSQL")
+class QueryPlanTests(LoggedInTestCase):
+    """EXPLAIN every read query the views issue and fail on sequential scans of PM_App tables."""
+
+    def setUp(self):
+        super().setUp()
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        settings_override = override_settings(PDF_CACHE_DIR=Path(cache_dir))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    @classmethod
+    def setUpTestData(cls):
+        patients = [
+            make_patient(firstname=f"First{i}", lastname=f"Last{i % 40}", gender=("Male", "Female")[i % 2], age=i % 90)
+            for i in range(300)
+        ]
+        for i, patient in enumerate(patients[:100]):
+            complaint = Complaint.objects.create(patient=patient, chief_complaint=f"Fever {i}", final_diagnosis="Viral")
+            if i % 2:
+                PatientComplaintArchive.objects.create(
+                    complaint=complaint, patient_id=patient.patient_id, firstname=patient.firstname,
+                    lastname=patient.lastname, address=patient.address, birthdate=patient.birthdate,
+                    age=patient.age, gender=patient.gender, contact_number=patient.contact_number,
+                    chief_complaint=complaint.chief_complaint,
+                )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        cls.patient = patients[1]
+        cls.complaint = cls.patient.complaints.get()
+        cls.archive = PatientComplaintArchive.objects.get(complaint=cls.complaint)
+
+    def read_requests(self):
+        patient_id = self.patient.patient_id
+        cursor = self.client.get(reverse("patients_api"), {"page_size": 5, "sort": "-age"}).json()["next_cursor"]
+        archive_cursor = self.client.get(reverse("get_archived_complaints"), {"page_size": 5}).json()["next_cursor"]
+        return [
+            (reverse("patients_api"), {"with_total": 1}),
+            (reverse("patients_api"), {"page_size": 5, "sort": "-age", "cursor": cursor}),
+            (reverse("patients_api"), {"sort": "lastname"}),
+            (reverse("patients_api"), {"sort": "firstname"}),
+            (reverse("patients_api"), {"sort": "birthdate"}),
+            (reverse("patients_api"), {"sort": "patient_id"}),
+            (reverse("patients_api"), {"gender": "female"}),
+            (reverse("patients_api"), {"age_min": 30, "age_max": 35, "sort": "age"}),
+            (reverse("patients_api"), {"name": "first12"}),
+            (reverse("patients_api"), {"patient_id": "PT-202600"}),
+            (reverse("search_records"), {"q": "last7"}),
+            (reverse("search_records"), {"q": "fever", "type": "complaints"}),
+            (f"/api/patients/{patient_id}/", {}),
+            (reverse("get_complaints_json", args=[patient_id]), {}),
+            (reverse("get_complaint_json", args=[self.complaint.id]), {}),
+            (reverse("get_archived_complaints"), {}),
+            (reverse("get_archived_complaints"), {"cursor": archive_cursor}),
+            (reverse("get_archived_complaints"), {"patient_id": patient_id}),
+            (reverse("get_archived_complaints"), {"date_from": "2026-01-01", "date_to": "2099-12-31"}),
+            (reverse("export_complaint_pdf", args=[self.complaint.id]), {}),
+            (reverse("export_archived_pdf", args=[self.archive.id]), {}),
+        ]
+
+    def test_no_sequential_scans(self):
+        for url, params in self.read_requests():
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200, url)
+
+            for query in ctx.captured_queries:
+                sql = query["sql"]
+                if '"PM_App_' not in sql or not sql.startswith("SELECT"):
+                    continue
+                with connection.cursor() as cursor:
+                    cursor.execute("SET enable_seqscan = off")
+                    cursor.execute("EXPLAIN " + sql)
+                    plan = "\n".join(row[0] for row in cursor.fetchall())
+                    cursor.execute("RESET enable_seqscan")
+                self.assertNotRegex(plan, r'Seq Scan on "PM_App_', f"{url} {params}\n{sql}\n{plan}")
+
+
+class PdfExportCacheTests(LoggedInTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        settings_override = override_settings(PDF_CACHE_DIR=Path(self.cache_dir))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.patient = make_patient()
+        self.complaint = Complaint.objects.create(patient=self.patient, chief_complaint="Cough")
+
+    def cached_files(self):
+        return sorted(p.name for p in Path(self.cache_dir).glob("*.pdf"))
+
+    def test_repeat_download_is_served_from_cache_and_revalidates(self):
+        url = reverse("export_complaint_pdf", args=[self.complaint.id])
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        body = b"".join(first.streaming_content)
+        self.assertTrue(body.startswith(b"%PDF"))
+        self.assertEqual(len(self.cached_files()), 1)
+
+        with patch("PM_App.export_views.render_complaint_pdf") as render:
+            second = self.client.get(url)
+            self.assertEqual(b"".join(second.streaming_content), body)
+            render.assert_not_called()
+
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code, 304)
+
+    def test_changed_record_invalidates(self):
+        url = reverse("export_complaint_pdf", args=[self.complaint.id])
+        etag = self.client.get(url)["ETag"]
+
+        self.complaint.final_diagnosis = "Bronchitis"
+        self.complaint.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(self.cached_files()), 2)
+
+    def test_evicts_least_recently_used(self):
+        url = reverse("export_complaint_pdf", args=[self.complaint.id])
+        self.client.get(url)
+        size = (Path(self.cache_dir) / self.cached_files()[0]).stat().st_size
+
+        others = [Complaint.objects.create(patient=self.patient, chief_complaint=f"Other {i}") for i in range(2)]
+        with override_settings(PDF_CACHE_MAX_BYTES=int(size * 2.5)):
+            self.client.get(reverse("export_complaint_pdf", args=[others[0].id]))
+            self.client.get(url)
+            self.client.get(reverse("export_complaint_pdf", args=[others[1].id]))
+
+        self.assertEqual(len(self.cached_files()), 2)
+        with patch("PM_App.export_views.render_complaint_pdf") as render:
+            self.client.get(url)
+            render.assert_not_called()
+
+
+class BatchPdfExportTests(LoggedInTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        settings_override = override_settings(PDF_CACHE_DIR=Path(self.cache_dir), PDF_EXPORT_WORKERS=2)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.patient = make_patient()
+        self.complaints = [
+            Complaint.objects.create(patient=self.patient, chief_complaint=f"Complaint {i}") for i in range(5)
+        ]
+        self.archive = PatientComplaintArchive.objects.create(
+            complaint=self.complaints[0], patient_id=self.patient.patient_id, firstname="Juan",
+            lastname="Dela Cruz", address="Manila", birthdate=date(1990, 1, 1), age=36,
+            gender="Male", contact_number="09171234567", chief_complaint="Complaint 0",
+        )
+
+    def test_patient_history_as_zip_uses_worker_pool(self):
+        response = self.client.get(reverse("export_batch_pdf"), {
+            "patient_id": self.patient.patient_id, "archive_ids": str(self.archive.id), "format": "zip",
+        })
+        self.assertEqual(response["Content-Type"], "application/zip")
+        with zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))) as archive:
+            names = archive.namelist()
+            self.assertTrue(all(archive.read(name).startswith(b"%PDF") for name in names))
+        pid = self.patient.patient_id
+        self.assertEqual(names, [f"{pid}/patient_complaint_{c.id}.pdf" for c in self.complaints]
+                         + [f"{pid}/patient_archive_{self.archive.id}.pdf"])
+
+        pool = export_views.pdf_worker_pool()
+        self.client.get(reverse("export_batch_pdf"), {"patient_id": pid, "format": "zip"})
+        self.assertIs(export_views.pdf_worker_pool(), pool)
+
+    def test_merged_pdf_has_a_section_per_record(self):
+        ids = ",".join(str(c.id) for c in self.complaints[:3])
+        response = self.client.post(reverse("export_batch_pdf"), {"complaint_ids": ids, "archive_ids": self.archive.id})
+        body = b"".join(response.streaming_content)
+        self.assertTrue(body.startswith(b"%PDF"))
+        self.assertEqual(body.count(b"/Type /Page\n") + body.count(b"/Type /Page "), 4)
+        self.assertIn(b"archived complaint", body)
+
+    def test_async_batch_runs_in_a_worker(self):
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir, ignore_errors=True)
+        ids = ",".join(str(c.id) for c in self.complaints[:2])
+        with override_settings(JOB_OUTPUT_DIR=Path(output_dir)):
+            response = self.client.post(reverse("export_batch_pdf"), {"complaint_ids": ids, "format": "zip", "async": "1"})
+            self.assertEqual(response.status_code, 202)
+            status_url = response.json()["status_url"]
+            self.assertEqual(self.client.get(status_url).json()["status"], "queued")
+
+            work(once=True)
+            state = self.client.get(status_url).json()
+            self.assertEqual((state["status"], state["done"], state["total"]), ("succeeded", 2, 2))
+            self.assertNotEqual(state["result"]["file"], f"job-{state['id']}.zip")
+            self.assertTrue((Path(output_dir) / state["result"]["file"]).exists())
+            progress_url = response.json()["progress_url"]
+            self.assertEqual(self.client.get(progress_url).json(), {"status": "succeeded", "done": 2, "total": 2})
+            self.client.force_login(CustomUser.objects.create_user(username="other", password="pass12345"))
+            self.assertEqual(self.client.get(progress_url).status_code, 404)
+            self.client.force_login(self.user)
+
+            download = self.client.get(state["download_url"])
+            with zipfile.ZipFile(io.BytesIO(b"".join(download.streaming_content))) as archive:
+                self.assertEqual(len(archive.namelist()), 2)
+
+    def test_rejects_empty_or_invalid_batches(self):
+        url = reverse("export_batch_pdf")
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {"complaint_ids": "1,x"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"date_from": "nope"}).status_code, 400)
+
+
+class PdfTableLayoutTests(SimpleTestCase):
+    def test_each_row_is_wrapped_a_fixed_number_of_times(self):
+        # Once to measure it and once when its chunk is drawn, however long
+        # the table: layout work grows linearly with the rows.
+        for rows in (10, 100, 1000):
+            data = [["Field", "Information"]] + [
+                [f"Row {i}", "Lorem ipsum dolor sit amet " * (1 + i % 4)] for i in range(rows)
+            ]
+            with patch.object(Paragraph, "wrap", autospec=True, side_effect=Paragraph.wrap) as wrap:
+                PatientFormPDFGenerator(io.BytesIO()).draw_info_table(data, wrap_col=1)
+            self.assertEqual(wrap.call_count, 2 * rows)
+
+
+class PrintImageCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.cache = PrintImageCache()
+
+    def make_image(self, name, size=(3000, 2000), color="red"):
+        path = os.path.join(self.dir, name)
+        Image.new("RGB", size, color).save(path, "JPEG")
+        return path
+
+    def test_downscales_to_print_size_and_reuses_decode(self):
+        path = self.make_image("photo.jpg")
+        with override_settings(PDF_IMAGE_DPI=72):
+            first = self.cache.get(path, 100, 100)
+            second = self.cache.get(path, 100, 100)
+        self.assertIs(first, second)
+        self.assertEqual(first.getSize(), (100, 67))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_modified_file_is_decoded_again(self):
+        path = self.make_image("photo.jpg")
+        first = self.cache.get(path, 100, 100)
+        Image.new("RGB", (50, 50), "blue").save(path, "JPEG")
+        os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns + 1_000_000))
+        self.assertIsNot(self.cache.get(path, 100, 100), first)
+
+    def test_missing_or_unreadable_files_return_none(self):
+        self.assertIsNone(self.cache.get(os.path.join(self.dir, "missing.png"), 10, 10))
+        broken = os.path.join(self.dir, "broken.jpg")
+        with open(broken, "wb") as f:
+            f.write(b"not an image")
+        self.assertIsNone(self.cache.get(broken, 10, 10))
+
+    def test_bounded_by_decoded_bytes(self):
+        paths = [self.make_image(f"p{i}.jpg", size=(200, 200)) for i in range(3)]
+        with override_settings(PDF_IMAGE_DPI=72, PDF_IMAGE_CACHE_MAX_BYTES=100 * 100 * 3 * 2):
+            for path in paths:
+                self.cache.get(path, 100, 100)
+            self.assertLessEqual(self.cache.size_bytes, 100 * 100 * 3 * 2)
+            self.cache.get(paths[2], 100, 100)
+            self.assertEqual(self.cache.hits, 1)
+            self.cache.get(paths[0], 100, 100)
+            self.assertEqual(self.cache.misses, 4)
+
+
+class ImageIngestionTests(LoggedInTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def photo_upload(self, size=(4000, 3000)):
+        exif = Image.Exif()
+        exif[0x010F] = "PhoneMaker"
+        exif[0x0112] = 6  # rotated 90 degrees
+        buffer = io.BytesIO()
+        Image.new("RGB", size, "green").save(buffer, "JPEG", exif=exif)
+        return SimpleUploadedFile("IMG_0001.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+    def add_patient(self, upload):
+        return self.client.post(
+            reverse("add_patient"),
+            {
+                "firstname": "Ana", "lastname": "Cruz", "address": "Cebu",
+                "birthdate": "1990-01-01", "age": 36, "gender": "Female",
+                "contact_number": "0917", "profile_image": upload,
+            },
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        )
+
+    def test_upload_is_downsized_stripped_and_thumbnailed(self):
+        self.add_patient(self.photo_upload())
+        name = Patient.objects.get().profile_image.name
+        self.assertTrue(name.startswith("patient_profiles/"))
+
+        with default_storage.open(name) as f, Image.open(f) as original:
+            self.assertEqual(original.format, "JPEG")
+            self.assertEqual(original.size, (1536, 2048))
+            self.assertEqual(len(original.getexif()), 0)
+
+        for rendition, size in RENDITION_SIZES.items():
+            with default_storage.open(rendition_name(name, rendition)) as f, Image.open(f) as image:
+                self.assertLessEqual(max(image.size), max(size))
+                self.assertEqual(len(image.getexif()), 0)
+
+    def test_same_picture_maps_to_same_names(self):
+        self.add_patient(self.photo_upload())
+        first = Patient.objects.get().profile_image.name
+        patient = Patient.objects.get()
+        self.client.post(reverse("update_patient"), {
+            "patient_id": patient.patient_id, "firstname": "Ana", "lastname": "Cruz",
+            "birthdate": "1990-01-01", "age": 36, "gender": "Female", "address": "Cebu",
+            "contact_number": "0917", "profile_image": self.photo_upload(),
+        })
+        patient.refresh_from_db()
+        self.assertEqual(patient.profile_image.name, first)
+
+    def test_apis_return_renditions(self):
+        self.add_patient(self.photo_upload())
+        patient = Patient.objects.get()
+
+        row = self.client.get(reverse("patients_api")).json()["patients"][0]
+        self.assertTrue(row["profile_image"].endswith(rendition_name(patient.profile_image.url, "thumb")))
+
+        detail = self.client.get(f"/api/patients/{patient.patient_id}/").json()["patient"]
+        self.assertEqual(detail["profile_image"], rendition_name(patient.profile_image.url, "medium"))
+        self.assertEqual(detail["profile_thumbnail"], rendition_name(patient.profile_image.url, "thumb"))
+
+    def test_legacy_uploads_are_served_as_stored(self):
+        patient = make_patient(profile_image="patient_profiles/old.png")
+        detail = self.client.get(f"/api/patients/{patient.patient_id}/").json()["patient"]
+        self.assertEqual(detail["profile_image"], "/media/patient_profiles/old.png")
+
+    def test_async_ingest_attaches_image_when_job_runs(self):
+        with override_settings(IMAGE_INGEST_ASYNC=True):
+            self.add_patient(self.photo_upload())
+        patient = Patient.objects.get()
+        self.assertFalse(patient.profile_image)
+
+        work(once=True)
+        patient.refresh_from_db()
+        self.assertTrue(patient.profile_image.name.endswith("-original.jpg"))
+        self.assertEqual(Job.objects.get().status, Job.SUCCEEDED)
+
+    def test_rejects_files_that_are_not_images(self):
+        upload = SimpleUploadedFile("notes.jpg", b"not an image", content_type="image/jpeg")
+        response = self.add_patient(upload)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Patient.objects.exists())
+
+
+FLAKY_CALLS = []
+
+
+def echo_job(job):
+    return {"echo": job.payload["value"]}
+
+
+def flaky_job(job):
+    FLAKY_CALLS.append(job.attempts)
+    if job.attempts < 2:
+        raise RuntimeError("temporary failure")
+    return {"attempts": job.attempts}
+
+
+def broken_job(job):
+    raise JobFailed("bad input")
+
+
+@override_settings(
+    JOB_RETRY_DELAY=0,
+    JOB_HANDLERS={
+        "test.echo": "PM_App.tests.echo_job",
+        "test.flaky": "PM_App.tests.flaky_job",
+        "test.broken": "PM_App.tests.broken_job",
+    },
+)
+class JobQueueTests(LoggedInTestCase):
+    def setUp(self):
+        super().setUp()
+        FLAKY_CALLS.clear()
+
+    def test_worker_runs_queued_jobs(self):
+        job = enqueue("test.echo", {"value": 7}, user=self.user)
+        self.assertEqual(work(once=True), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.attempts), (Job.SUCCEEDED, {"echo": 7}, 1))
+
+        state = self.client.get(reverse("job_status", args=[job.pk])).json()
+        self.assertEqual((state["status"], state["result"]), ("succeeded", {"echo": 7}))
+
+    def test_failures_are_retried_until_max_attempts(self):
+        retried = enqueue("test.flaky")
+        exhausted = enqueue("test.flaky", max_attempts=1)
+        with self.assertLogs("PM_App.jobs", "WARNING"):
+            work(once=True)
+
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual((retried.status, retried.attempts), (Job.SUCCEEDED, 2))
+        self.assertEqual(exhausted.status, Job.FAILED)
+        self.assertIn("temporary failure", exhausted.error)
+
+    def test_permanent_failures_are_not_retried(self):
+        job = enqueue("test.broken")
+        with self.assertLogs("PM_App.jobs", "WARNING"):
+            work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 1))
+
+    def test_a_job_is_claimed_once_and_abandoned_jobs_are_requeued(self):
+        job = enqueue("test.echo", {"value": 1})
+        self.assertEqual(claim("a").pk, job.pk)
+        self.assertIsNone(claim("b"))
+
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(claim("b").pk, job.pk)
+
+    def test_progress_keeps_a_long_job_claimed(self):
+        job = enqueue("test.echo", {"value": 1})
+        running = claim("a")
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        set_progress(running, 5, 10)
+        self.assertEqual(requeue_stale(), 0)
+        self.assertIsNone(claim("b"))
+
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(claim("b").pk, job.pk)
+        set_progress(running, 6)
+        job.refresh_from_db()
+        self.assertEqual((job.locked_by, job.done), ("b", 5))
+
+    def test_unknown_kinds_are_rejected(self):
+        with self.assertRaises(ValueError):
+            enqueue("test.missing")
+
+    def test_status_is_private_to_the_owner(self):
+        job = enqueue("test.echo", {"value": 1}, user=self.user)
+        other = CustomUser.objects.create_user(username="other", password="pass12345")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse("job_status", args=[job.pk])).status_code, 404)
+
+    def test_run_workers_once(self):
+        enqueue("test.echo", {"value": 1})
+        out = io.StringIO()
+        call_command("run_workers", once=True, stdout=out)
+        self.assertIn("Processed 1 job(s)", out.getvalue())
+
+
+class ImportPatientsTests(LoggedInTestCase):
+    HEADER = "firstname,lastname,address,birthdate,age,gender,contact_number,weight\n"
+
+    def csv_upload(self, rows, name="patients.csv"):
+        return SimpleUploadedFile(name, (self.HEADER + "".join(rows)).encode(), content_type="text/csv")
+
+    def valid_rows(self, count):
+        return [f"First{i},Last{i},Manila,1990-01-0{i % 9 + 1},{30 + i},Male,0917{i},60.5\n" for i in range(count)]
+
+    def test_imports_in_batches_and_reports_row_errors(self):
+        rows = self.valid_rows(5)
+        rows.insert(2, "Bad,Row,Manila,not-a-date,,Male,0917,\n")
+        rows.append("NoContact,Row,Manila,1990-01-01,30,Male,,\n")
+
+        with CaptureQueriesContext(connection) as queries:
+            report = self.client.post(
+                reverse("import_patients"), {"file": self.csv_upload(rows), "batch_size": 2}
+            ).json()
+
+        self.assertEqual((report["rows"], report["imported"], report["failed"]), (7, 5, 2))
+        self.assertEqual([error["line"] for error in report["errors"]], [4, 8])
+        self.assertIn("birthdate", report["errors"][0]["error"])
+        self.assertIn("rows_per_second", report)
+
+        inserts = [q for q in queries.captured_queries if q["sql"].startswith('INSERT INTO "PM_App_patient"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(
+            list(Patient.objects.order_by("id").values_list("patient_id", flat=True)),
+            [Patient.format_patient_id(n) for n in range(1, 6)],
+        )
+
+    def test_supplied_ids_are_kept_and_never_reissued(self):
+        make_patient(patient_id="LEGACY-1")
+        rows = [
+            '{"patient_id": "PT-20260900", "firstname": "A", "lastname": "B", "address": "X",'
+            ' "birthdate": "1980-05-05", "gender": "Female", "contact_number": "1"}\n',
+            '{"patient_id": "LEGACY-1", "firstname": "C", "lastname": "D", "address": "X",'
+            ' "birthdate": "1980-05-05", "gender": "Female", "contact_number": "1"}\n',
+            '[1, 2]\n',
+        ]
+        upload = SimpleUploadedFile("legacy.jsonl", "".join(rows).encode())
+        report = self.client.post(reverse("import_patients"), {"file": upload}).json()
+
+        self.assertEqual((report["imported"], report["failed"]), (1, 2))
+        self.assertIn("already exists", report["errors"][0]["error"])
+        self.assertEqual(Patient.objects.get(patient_id="PT-20260900").age, age_on(date(1980, 5, 5)))
+        self.assertEqual(make_patient().patient_id, "PT-20260901")
+
+    def test_a_rejected_batch_is_retried_row_by_row(self):
+        rows = [f"PT-2026090{i},First{i},Last{i},Manila,1990-01-01,Male,0917{i}\n" for i in range(4)]
+        upload = io.BytesIO(("patient_id,firstname,lastname,address,birthdate,gender,contact_number\n" + "".join(rows)).encode())
+        importer = PatientImporter(batch_size=4)
+        check_ids = importer.drop_duplicate_ids
+
+        def registered_meanwhile(batch):
+            # Another terminal takes one of the codes after the duplicate check.
+            kept = check_ids(batch)
+            make_patient(patient_id="PT-20260902", firstname="Walk-in")
+            return kept
+
+        with patch.object(importer, "drop_duplicate_ids", registered_meanwhile):
+            report = importer.run(read_rows(upload, "csv"))
+
+        self.assertEqual((report.imported, report.error_count), (3, 1))
+        self.assertEqual([error["line"] for error in report.errors], [4])
+        self.assertIn("Rejected by the database", report.errors[0]["error"])
+        self.assertEqual(Patient.objects.get(patient_id="PT-20260902").firstname, "Walk-in")
+        self.assertEqual(Patient.objects.filter(firstname__startswith="First").count(), 3)
+        self.assertNotIn("PT-20260902", importer.seen_ids)
+
+    def test_command_dry_run_and_import(self):
+        path = os.path.join(tempfile.mkdtemp(), "patients.csv")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path), ignore_errors=True)
+        with open(path, "w") as f:
+            f.write(self.HEADER + "".join(self.valid_rows(3)))
+
+        out = io.StringIO()
+        call_command("import_patients", path, "--dry-run", stdout=out)
+        self.assertIn("Validated 3 of 3 rows", out.getvalue())
+        self.assertFalse(Patient.objects.exists())
+
+        call_command("import_patients", path, "--batch-size", "2", stdout=out)
+        self.assertEqual(Patient.objects.count(), 3)
+
+    def test_async_import_runs_as_a_job(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media):
+            response = self.client.post(reverse("import_patients"), {"file": self.csv_upload(self.valid_rows(4)), "async": "1"})
+            self.assertEqual(response.status_code, 202)
+            work(once=True)
+            state = self.client.get(response.json()["status_url"]).json()
+
+        self.assertEqual((state["status"], state["result"]["imported"], state["done"]), ("succeeded", 4, 4))
+        self.assertEqual(Patient.objects.count(), 4)
+
+    @override_settings(JOB_RETRY_DELAY=0)
+    def test_a_retried_import_job_resumes_after_the_committed_batches(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        rows = self.valid_rows(5)
+        rows.insert(1, "Bad,Row,Manila,not-a-date,,Male,0917,\n")
+        published = []
+
+        def publish_once(*args, **kwargs):
+            published.append(kwargs)
+            if len(published) == 2:
+                raise RuntimeError("connection lost")
+
+        with override_settings(MEDIA_ROOT=media), patch("PM_App.importers.publish", publish_once):
+            response = self.client.post(
+                reverse("import_patients"), {"file": self.csv_upload(rows), "async": "1", "batch_size": 2}
+            )
+            with self.assertLogs("PM_App.jobs", "WARNING"):
+                work(once=True)
+            state = self.client.get(response.json()["status_url"]).json()
+
+        self.assertEqual((state["status"], state["attempts"]), ("succeeded", 2))
+        self.assertEqual((state["result"]["rows"], state["result"]["imported"], state["result"]["failed"]), (6, 5, 1))
+        self.assertEqual(
+            sorted(Patient.objects.values_list("firstname", flat=True)), [f"First{i}" for i in range(5)]
+        )
+
+    def test_rejects_missing_file_and_bad_options(self):
+        url = reverse("import_patients")
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.client.post(url, {"file": self.csv_upload([]), "format": "xml"}).status_code, 400)
+        self.assertEqual(self.client.post(url, {"file": self.csv_upload([]), "batch_size": "x"}).status_code, 400)
+
+
+class ExportRecordsTests(LoggedInTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patients = [make_patient(firstname=f"Name{i}", middlename=None if i else "M") for i in range(5)]
+        self.complaints = [Complaint.objects.create(patient=p, chief_complaint="Cough") for p in self.patients]
+
+    def download(self, dataset, **params):
+        response = self.client.get(reverse("export_records", args=[dataset]), params)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_formats_carry_the_same_rows(self):
+        response, body = self.download("patients", format="csv")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        csv_rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([row["firstname"] for row in csv_rows], [f"Name{i}" for i in range(5)])
+        self.assertEqual(csv_rows[1]["middlename"], "")
+
+        _, body = self.download("patients", format="ndjson")
+        json_rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(json_rows[0]["birthdate"], "1990-01-01")
+
+        _, body = self.download("patients", format="columnar")
+        self.assertEqual(list(read_columnar(body.splitlines())), json_rows)
+
+    def test_incremental_exports(self):
+        _, body = self.download("complaints", format="ndjson", since_id=self.complaints[2].id)
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row["id"] for row in rows], [c.id for c in self.complaints[3:]])
+        self.assertEqual(rows[0]["patient_code"], self.patients[3].patient_id)
+
+        Complaint.objects.filter(pk=self.complaints[0].pk).update(date_created=timezone.now() - timedelta(days=3))
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        _, body = self.download("complaints", format="ndjson", since=since)
+        self.assertEqual(len(body.splitlines()), 4)
+
+    def test_rejects_bad_parameters(self):
+        self.assertEqual(self.client.get(reverse("export_records", args=["users"])).status_code, 400)
+        url = reverse("export_records", args=["patients"])
+        self.assertEqual(self.client.get(url, {"format": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"since": "2024-01-01"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"since_id": "x"}).status_code, 400)
+
+    def test_command_streams_to_a_file(self):
+        path = os.path.join(tempfile.mkdtemp(), "complaints.csv")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path), ignore_errors=True)
+        err = io.StringIO()
+        call_command("export_records", "complaints", "--output", path, "--chunk-size", "2", stderr=err)
+        with open(path, newline="") as f:
+            self.assertEqual(len(list(csv.DictReader(f))), 5)
+        self.assertIn(f"last id {self.complaints[-1].id}", err.getvalue())
+
+
+class BulkArchiveTests(LoggedInTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patient = make_patient()
+        self.other = make_patient(firstname="Maria")
+        self.complaints = [
+            Complaint.objects.create(patient=self.patient, chief_complaint=f"Fever {i}", final_diagnosis="Dengue fever")
+            for i in range(5)
+        ] + [Complaint.objects.create(patient=self.other, chief_complaint="Cough", final_diagnosis="Asthma")]
+
+    def test_archives_matching_complaints_in_batches(self):
+        url = reverse("bulk_archive_complaints")
+        with CaptureQueriesContext(connection) as queries:
+            report = self.client.post(url, {"diagnosis": "dengue", "batch_size": 2}).json()
+        self.assertEqual((report["matched"], report["archived"], report["batches"]), (5, 5, 3))
+
+        inserts = [
+            q for q in queries.captured_queries
+            if q["sql"].startswith("INSERT") and 'INTO "PM_App_patientcomplaintarchive"' in q["sql"]
+        ]
+        self.assertEqual(len(inserts), 3)
+
+        archive = PatientComplaintArchive.objects.get(complaint=self.complaints[0])
+        self.assertEqual((archive.patient_id, archive.firstname, archive.chief_complaint),
+                         (self.patient.patient_id, "Juan", "Fever 0"))
+
+        again = self.client.post(url, {"diagnosis": "dengue"}).json()
+        self.assertEqual(again["archived"], 0)
+        self.assertEqual(PatientComplaintArchive.objects.count(), 5)
+
+    def test_already_archived_rows_are_reported_as_skipped(self):
+        bulk_archive(Complaint.objects.filter(pk=self.complaints[5].pk))
+        report = bulk_archive(Complaint.objects.all())
+        self.assertEqual((report["matched"], report["archived"], report["skipped"]), (6, 5, 1))
+        self.assertEqual(bulk_archive(Complaint.objects.all())["archived"], 0)
+        self.assertEqual(PatientComplaintArchive.objects.count(), 6)
+
+    def test_filters_by_patient_and_date(self):
+        Complaint.objects.filter(pk=self.complaints[0].pk).update(date_created=timezone.now() - timedelta(days=10))
+        report = self.client.post(reverse("bulk_archive_complaints"), {
+            "patient_id": self.patient.patient_id,
+            "date_to": (timezone.localdate() - timedelta(days=5)).isoformat(),
+        }).json()
+        self.assertEqual(report["archived"], 1)
+        self.assertTrue(PatientComplaintArchive.objects.filter(complaint=self.complaints[0]).exists())
+
+    def test_single_archive_is_idempotent(self):
+        url = reverse("archive_complaint", args=[self.complaints[5].id])
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(PatientComplaintArchive.objects.count(), 1)
+
+    def test_requires_a_filter_and_valid_dates(self):
+        url = reverse("bulk_archive_complaints")
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.client.post(url, {"date_from": "soon"}).status_code, 400)
+        self.assertEqual(self.client.post(url, {"all": "1", "dry_run": "1"}).json()["matched"], 6)
+        self.assertFalse(PatientComplaintArchive.objects.exists())
+
+    def test_command_and_async_job(self):
+        out = io.StringIO()
+        call_command("archive_complaints", "--diagnosis", "asthma", stdout=out)
+        self.assertIn("Archived 1 complaint(s)", out.getvalue())
+
+        response = self.client.post(reverse("bulk_archive_complaints"), {"all": "1", "async": "1"})
+        self.assertEqual(response.status_code, 202)
+        work(once=True)
+        state = self.client.get(response.json()["status_url"]).json()
+        self.assertEqual((state["status"], state["result"]["archived"]), ("succeeded", 5))
+
+
+class BulkArchiveConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        if connection.vendor != "postgresql":
+            self.skipTest("needs row locks; SQLite runs one writer at a time anyway")
+        patient = make_patient()
+        self.ids = [Complaint.objects.create(patient=patient, chief_complaint=f"Fever {i}").id for i in range(3)]
+
+    def test_concurrent_run_waits_and_counts_nothing_twice(self):
+        inside, release = threading.Event(), threading.Event()
+
+        def slow_copy(row):
+            # Hold the first run between reading what is archived and inserting.
+            if not inside.is_set():
+                inside.set()
+                release.wait(10)
+            return archive_copy(row)
+
+        def run():
+            try:
+                return bulk_archive(Complaint.objects.filter(id__in=self.ids))
+            finally:
+                connection.close()
+
+        with patch("PM_App.archiving.archive_copy", slow_copy), ThreadPoolExecutor(max_workers=2) as pool:
+            first = pool.submit(run)
+            self.assertTrue(inside.wait(10))
+            second = pool.submit(run)
+            with self.assertRaises(FutureTimeout):
+                second.result(timeout=0.3)
+            release.set()
+            reports = [first.result(timeout=10), second.result(timeout=10)]
+
+        self.assertEqual([(r["archived"], r["skipped"]) for r in reports], [(3, 0), (0, 3)])
+        self.assertEqual(PatientComplaintArchive.objects.count(), 3)
+
+
+class ResponseCacheTests(LoggedInTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patient = make_patient()
+        self.complaint = Complaint.objects.create(patient=self.patient, chief_complaint="Cough")
+
+    def test_repeat_reads_are_served_from_cache(self):
+        url = reverse("patients_api")
+        first = self.client.get(url, {"page_size": 5})
+        with self.assertNumQueries(3):  # session, user and the conditional-GET aggregate
+            second = self.client.get(url, {"page_size": 5})
+        self.assertEqual(first.content, second.content)
+        self.client.get(url, {"page_size": 6})
+
+        stats = cache_stats.snapshot()["endpoints"]["patient_list"]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+
+    def test_patient_writes_invalidate_listing_and_detail(self):
+        detail_url = f"/api/patients/{self.patient.patient_id}/"
+        self.client.get(reverse("patients_api"))
+        self.client.get(detail_url)
+
+        self.patient.firstname = "Pedro"
+        self.patient.save()
+        self.assertEqual(self.client.get(reverse("patients_api")).json()["patients"][0]["firstname"], "Pedro")
+        self.assertEqual(self.client.get(detail_url).json()["patient"]["firstname"], "Pedro")
+
+    def test_invalidation_is_scoped_to_the_patient(self):
+        other = make_patient(firstname="Maria")
+        other_url = reverse("get_complaints_json", args=[other.patient_id])
+        own_url = reverse("get_complaints_json", args=[self.patient.patient_id])
+        self.client.get(other_url)
+        self.client.get(own_url)
+
+        Complaint.objects.create(patient=self.patient, chief_complaint="Fever")
+        self.assertEqual(len(self.client.get(own_url).json()["complaints"]), 2)
+        self.client.get(other_url)
+
+        stats = cache_stats.snapshot()["endpoints"]["patient_complaints"]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 3))
+
+    def test_archiving_refreshes_archives_and_complaint_flags(self):
+        complaints_url = reverse("get_complaints_json", args=[self.patient.patient_id])
+        self.client.get(reverse("get_archived_complaints"))
+        self.client.get(complaints_url)
+
+        self.client.post(reverse("bulk_archive_complaints"), {"all": "1"})
+        self.assertEqual(len(self.client.get(reverse("get_archived_complaints")).json()["archives"]), 1)
+        self.assertTrue(self.client.get(complaints_url).json()["complaints"][0]["is_archived"])
+
+    def test_bulk_import_invalidates_listing(self):
+        self.client.get(reverse("patients_api"))
+        upload = SimpleUploadedFile(
+            "p.csv", b"firstname,lastname,address,birthdate,gender,contact_number\nAna,Cruz,Cebu,1990-01-01,Female,1\n"
+        )
+        self.client.post(reverse("import_patients"), {"file": upload})
+        self.assertEqual(len(self.client.get(reverse("patients_api")).json()["patients"]), 2)
+
+    def test_stats_endpoint_is_staff_only(self):
+        self.assertEqual(self.client.get(reverse("response_cache_stats")).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(reverse("patients_api"))
+        stats = self.client.get(reverse("response_cache_stats")).json()
+        self.assertEqual(stats["endpoints"]["patient_list"]["misses"], 1)
+
+
+@override_settings(PERFORMANCE_PROFILING=True)
+class ProfilingMiddlewareTests(LoggedInTestCase):
+    def setUp(self):
+        super().setUp()
+        profile_stats.reset()
+        make_patient()
+
+    def test_reports_queries_and_timings(self):
+        with CaptureQueriesContext(connection) as queries, self.assertLogs("PM_App.profiling", "INFO") as logs:
+            response = self.client.get(reverse("patients_api"))
+        timing = response["Server-Timing"]
+        self.assertIn(f'desc="{len(queries)} queries, 0 duplicate"', timing)
+        self.assertIn("serialize;dur=", timing)
+
+        report = json.loads(logs.records[0].getMessage())
+        self.assertEqual((report["url_name"], report["status"]), ("patients_api", 200))
+        self.assertEqual(report["queries"], len(queries))
+        self.assertEqual(report["response_bytes"], len(response.content))
+
+    def test_times_plain_json_responses(self):
+        record_serialization()
+        profile, token = start_profile()
+        try:
+            JsonResponse({"rows": list(range(1000))})
+        finally:
+            end_profile(token)
+        self.assertGreater(profile.serialize_seconds, 0)
+
+    def test_counts_duplicate_and_repeated_queries(self):
+        profile = RequestProfile()
+        for i in range(5):
+            profile.add_query("SELECT 1 WHERE id = %s", (i % 2,), 0.001)
+        self.assertEqual(profile.queries, 5)
+        self.assertEqual(profile.duplicates, 3)
+        self.assertEqual(profile.repeated_statements(), [{"sql": "SELECT 1 WHERE id = %s", "count": 5}])
+
+    def test_report_endpoint_is_staff_only(self):
+        self.assertEqual(self.client.get(reverse("profiling_report")).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        for _ in range(3):
+            self.client.get(reverse("patients_api"))
+
+        endpoints = self.client.get(reverse("profiling_report")).json()["endpoints"]
+        self.assertEqual(endpoints["patients_api"]["requests"], 3)
+        self.assertIn("p95", endpoints["patients_api"]["total_ms"])
+        self.client.post(reverse("profiling_report"))
+        self.assertNotIn("patients_api", self.client.get(reverse("profiling_report")).json()["endpoints"])
+
+
+class MetricsTests(LoggedInTestCase):
+    def test_requests_are_counted_per_url_name(self):
+        before = http_requests.value(view="patients_api", method="GET", status=200)
+        self.client.get(reverse("patients_api"))
+        self.assertEqual(http_requests.value(view="patients_api", method="GET", status=200), before + 1)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse("metrics"))
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        self.assertIn('pm_http_requests_total{view="patients_api",method="GET",status="200"}', body)
+        self.assertIn('pm_http_request_duration_seconds_bucket{view="patients_api",le="+Inf"}', body)
+        self.assertIn('pm_db_queries_per_request_count{view="patients_api"}', body)
+        self.assertIn('pm_response_cache_requests_total{endpoint="patient_list",result="miss"} 1', body)
+
+    def test_endpoint_needs_staff_or_token(self):
+        url = reverse("metrics")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        with override_settings(METRICS_TOKEN="s3cret"):
+            self.assertEqual(self.client_class().get(url, HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+            self.assertEqual(self.client_class().get(url, HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("pm_test_seconds", "Test.", ["kind"], buckets=(1, 5))
+        self.addCleanup(registry.remove, histogram)
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value, kind="a")
+        self.assertEqual(histogram.samples(), [
+            'pm_test_seconds_bucket{kind="a",le="1"} 2',
+            'pm_test_seconds_bucket{kind="a",le="5"} 3',
+            'pm_test_seconds_bucket{kind="a",le="+Inf"} 4',
+            'pm_test_seconds_sum{kind="a"} 14.5',
+            'pm_test_seconds_count{kind="a"} 4',
+        ])
+
+    def test_pdf_renders_logins_and_uploads_are_recorded(self):
+        complaint = Complaint.objects.create(patient=make_patient(), chief_complaint="Cough")
+        pages = pdf_pages.count()
+        render_record_pdf("complaint", Complaint.objects.select_related("patient").get(pk=complaint.pk))
+        self.assertEqual(pdf_pages.count(), pages + 1)
+
+        failures = login_attempts.value(outcome="failure")
+        self.client_class().post(reverse("login"), {"username": "staff", "password": "wrong"})
+        self.assertEqual(login_attempts.value(outcome="failure"), failures + 1)
+
+        uploads = upload_bytes.count(view="add_patient", field="profile_image")
+        upload = SimpleUploadedFile("notes.jpg", b"not an image", content_type="image/jpeg")
+        self.client.post(reverse("add_patient"), {"firstname": "Ana", "profile_image": upload})
+        self.assertEqual(upload_bytes.count(view="add_patient", field="profile_image"), uploads + 1)
+
+
+class SyntheticDataTests(TestCase):
+    def seed(self):
+        report = seed_synthetic(12, complaints_per_patient=2, archived_fraction=0.5, seed=7, batch_size=5)
+        return report, list(Patient.objects.order_by("id").values_list("firstname", "lastname", "birthdate"))
+
+    def test_same_seed_gives_same_records(self):
+        report, first = self.seed()
+        self.assertEqual((report["patients"], report["complaints"]), (12, 24))
+        self.assertEqual(PatientComplaintArchive.objects.count(), report["archived"])
+        self.assertTrue(0 < report["archived"] < 24)
+
+        Patient.objects.all().delete()
+        self.assertEqual(self.seed()[1], first)
+
+    def test_command_validates_arguments(self):
+        out = io.StringIO()
+        call_command("seed_synthetic", "--patients", "3", "--complaints-per-patient", "1", stdout=out)
+        self.assertIn("Added 3 patients, 3 complaints", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("seed_synthetic", "--patients", "3", "--archived-fraction", "2")
+
+
+class BenchmarkTests(TestCase):
+    def test_every_case_runs_and_succeeds(self):
+        result = run_scale(20, complaints_per_patient=1, archived_fraction=0.5, iterations=1)
+        self.assertEqual(result["patients"], 23)  # add_patient ran once to warm up, once timed, once traced
+        self.assertEqual(set(result["cases"]), set(CASES))
+        for name, case_result in result["cases"].items():
+            self.assertEqual(case_result["status"], [200], name)
+            self.assertGreater(case_result["peak_kib"], 0, name)
+
+    def test_compare_flags_regressions(self):
+        def baseline(median_ms, queries, peak_kib=100.0, status=(200,)):
+            case = {"median_ms": median_ms, "queries": queries, "peak_kib": peak_kib, "status": list(status)}
+            return {"scales": {"1k": {"cases": {"patient_list": case}}}}
+
+        self.assertEqual(compare(baseline(10.0, 4), baseline(9.0, 4)), [])
+        self.assertEqual(compare(baseline(4.0, 4), baseline(1.0, 4)), [])  # below the noise floor
+        self.assertEqual(len(compare(baseline(30.0, 5, 2000.0, (500,)), baseline(10.0, 4))), 4)
+
+
+class ConditionalGetTests(LoggedInTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patient = make_patient()
+        self.complaint = Complaint.objects.create(patient=self.patient, chief_complaint="Cough")
+
+    def test_unchanged_patient_list_is_a_304_after_one_query(self):
+        url = reverse("patients_api")
+        first = self.client.get(url, {"gender": "male"})
+        self.assertIn("Last-Modified", first)
+
+        with self.assertNumQueries(3):  # session, user, validator aggregate
+            second = self.client.get(url, {"gender": "male"}, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b"")
+
+        other_page = self.client.get(url, {"gender": "female"}, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(other_page.status_code, 200)
+
+    def test_writes_and_deletes_change_the_etag(self):
+        url = reverse("patients_api")
+        etag = self.client.get(url)["ETag"]
+
+        self.patient.address = "Cebu"
+        self.patient.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        extra = make_patient()
+        etag = self.client.get(url)["ETag"]
+        extra.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_complaints_track_complaint_patient_and_archive_changes(self):
+        url = reverse("get_complaints_json", args=[self.patient.patient_id])
+        first = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code, 304)
+
+        etag = first["ETag"]
+        for change in (
+            lambda: self.client.post(reverse("archive_complaint", args=[self.complaint.id])),
+            lambda: Complaint.objects.filter(pk=self.complaint.pk).update(updated_at=timezone.now() + timedelta(seconds=5)),
+            lambda: Patient.objects.filter(pk=self.patient.pk).update(updated_at=timezone.now() + timedelta(seconds=10)),
+        ):
+            change()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            etag = response["ETag"]
+
+    def test_unknown_patient_is_still_a_404(self):
+        url = reverse("get_complaints_json", args=["PT-missing"])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"x"').status_code, 404)
+
+
+class PatientChangesApiTests(LoggedInTestCase):
+    def sync(self, since=0, **params):
+        response = self.client.get(reverse("patient_changes"), {"since": since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_initial_sync_then_only_deltas(self):
+        first, second = make_patient(firstname="Ana"), make_patient(firstname="Ben")
+        data = self.sync()
+        self.assertEqual([row["patient_id"] for row in data["upserts"]], [first.patient_id, second.patient_id])
+        self.assertEqual(data["deleted"], [])
+        self.assertFalse(data["has_more"])
+        self.assertNotIn("id", data["upserts"][0])
+
+        self.assertEqual(self.sync(data["token"])["upserts"], [])
+
+        second.address = "Cebu"
+        second.save()
+        third = make_patient(firstname="Cy")
+        delta = self.sync(data["token"])
+        self.assertEqual([row["patient_id"] for row in delta["upserts"]], [second.patient_id, third.patient_id])
+        self.assertEqual(delta["upserts"][0]["address"], "Cebu")
+
+    def test_deletes_come_back_as_tombstones(self):
+        patient = make_patient()
+        token = self.sync()["token"]
+        response = self.client.post(reverse("delete_patient"), {"patient_id": patient.patient_id})
+        self.assertEqual(response.status_code, 200)
+
+        delta = self.sync(token)
+        self.assertEqual(delta["deleted"], [patient.patient_id])
+        self.assertEqual(delta["upserts"], [])
+        # A fresh client never hears about rows that were already gone.
+        self.assertEqual(self.sync()["deleted"], [])
+
+    def test_paging_through_changes_in_order(self):
+        patients = [make_patient(firstname=f"P{i}") for i in range(5)]
+        token = self.sync()["token"]
+        patients[0].delete()
+        patients[1].save()
+        patients[2].delete()
+
+        seen, deleted, has_more = [], [], True
+        while has_more:
+            data = self.sync(token, limit=1)
+            seen += [row["patient_id"] for row in data["upserts"]]
+            deleted += data["deleted"]
+            token, has_more = data["token"], data["has_more"]
+        self.assertEqual(deleted, [patients[0].patient_id, patients[2].patient_id])
+        self.assertEqual(seen, [patients[1].patient_id])
+
+    def test_partial_saves_and_imports_move_the_token(self):
+        patient = make_patient()
+        token = self.sync()["token"]
+        patient.weight = 61.5
+        patient.save(update_fields=["weight"])
+        upload = SimpleUploadedFile(
+            "patients.csv",
+            b"firstname,lastname,address,birthdate,gender,contact_number\nLia,Reyes,Davao,1985-02-03,Female,0917\n",
+        )
+        self.client.post(reverse("import_patients"), {"file": upload})
+
+        delta = self.sync(token)
+        self.assertEqual(len(delta["upserts"]), 2)
+        self.assertEqual(delta["upserts"][0]["weight"], 61.5)
+        self.assertEqual(delta["upserts"][1]["firstname"], "Lia")
+
+    def test_list_page_carries_a_token_to_patch_it_from(self):
+        first, second = make_patient(firstname="Ana"), make_patient(firstname="Ben")
+        page = self.client.get(reverse("patients_api"), {"page_size": 1, "with_token": 1}).json()
+        self.assertEqual([row["patient_id"] for row in page["patients"]], [first.patient_id])
+        self.assertNotIn("sync_token", self.client.get(reverse("patients_api")).json())
+
+        first.address = "Iloilo"
+        first.save()
+        delta = self.sync(page["sync_token"])
+        self.assertEqual([row["patient_id"] for row in delta["upserts"]], [first.patient_id])
+        self.assertEqual(set(delta["upserts"][0]), set(page["patients"][0]))
+
+    def test_bad_and_unknown_tokens(self):
+        make_patient()
+        self.assertEqual(self.client.get(reverse("patient_changes"), {"since": "abc"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("patient_changes"), {"since": "-1"}).status_code, 400)
+
+        data = self.sync(10 ** 12)
+        self.assertTrue(data["reset"])
+        self.assertEqual(data["token"], 0)
+
+
+def sse_events(text):
+    """(topic, payload) for each dispatched event in a Server-Sent Events body."""
+    events = []
+    for block in text.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+class LiveEventsTests(LoggedInTestCase):
+    def test_writes_publish_events_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            patient = make_patient()
+            self.assertFalse(ChangeEvent.objects.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            complaint = Complaint.objects.create(patient=patient, chief_complaint="Cough")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("archive_complaint", args=[complaint.id]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("delete_patient"), {"patient_id": patient.patient_id})
+
+        events = [(event.topic, event.payload["action"]) for event in ChangeEvent.objects.order_by("id")]
+        self.assertEqual(events[:3], [("patient", "created"), ("complaint", "created"), ("archive", "created")])
+        self.assertEqual(events[3:], [("patient", "deleted")])
+        deleted = ChangeEvent.objects.filter(topic="patient").last().payload
+        self.assertEqual(deleted["change_seq"], PatientTombstone.objects.get().change_seq)
+
+    def test_patient_delete_cascade_costs_the_same_for_any_number_of_complaints(self):
+        def delete_cost(complaints):
+            patient = make_patient()
+            Complaint.objects.bulk_create(Complaint(patient=patient, chief_complaint="Cough") for _ in range(complaints))
+            with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True) as callbacks:
+                patient.delete()
+            return len(queries), len(callbacks)
+
+        self.assertEqual(delete_cost(1), delete_cost(20))
+        with self.captureOnCommitCallbacks(execute=True):
+            Complaint.objects.create(patient=make_patient(), chief_complaint="Fever").delete()
+        self.assertEqual(ChangeEvent.objects.filter(topic="complaint", payload__action="deleted").count(), 1)
+
+    def test_reconnect_replays_missed_events(self):
+        first = record("patient", {"action": "created", "patient_id": "PT-1"})
+        second = record("complaint", {"action": "created", "patient_id": "PT-1", "complaint_id": 7})
+        response = self.client.get(reverse("live_events"), HTTP_LAST_EVENT_ID=str(first.id))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        body = response.content.decode()
+        self.assertIn("retry: ", body)
+        self.assertIn(f"id: {second.id}\n", body)
+        self.assertEqual(sse_events(body), [("complaint", second.payload)])
+
+        fresh = self.client.get(reverse("live_events")).content.decode()
+        self.assertIn(f"id: {second.id}\n\n", fresh)
+        self.assertEqual(sse_events(fresh), [])
+
+    def test_too_many_missed_events_is_a_reset(self):
+        ChangeEvent.objects.bulk_create(ChangeEvent(topic="patient", payload={}) for _ in range(1001))
+        body = self.client.get(reverse("live_events"), HTTP_LAST_EVENT_ID="0").content.decode()
+        self.assertEqual([topic for topic, _ in sse_events(body)], ["reset"])
+
+    @override_settings(LIVE_EVENTS_POLL_INTERVAL=0.05, LIVE_EVENTS_HEARTBEAT=0.1, LIVE_EVENTS_MAX_STREAM=1)
+    async def test_asgi_stream_pushes_new_events(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("live_events"))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+        self.assertIn(b"retry: ", await anext(chunks))
+
+        await sync_to_async(record)("patient", {"action": "updated", "patient_id": "PT-9"})
+        received = b""
+        while b"event:" not in received:
+            received = await asyncio.wait_for(anext(chunks), 2)
+        self.assertEqual(sse_events(received.decode()), [("patient", {"action": "updated", "patient_id": "PT-9"})])
+
+        # The stream ends after LIVE_EVENTS_MAX_STREAM, sending keepalives until then.
+        rest = [chunk async for chunk in chunks]
+        self.assertTrue(rest)
+        self.assertTrue(all(chunk == b": keepalive\n\n" for chunk in rest))
+        await asyncio.wait_for(broker.task, 2)
+        self.assertFalse(broker.subscribers)
+
+
+class AsyncReadViewsTests(LoggedInTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patients = [make_patient(firstname=f"P{i}", gender="Female" if i % 2 else "Male") for i in range(4)]
+        self.complaints = [
+            Complaint.objects.create(patient=self.patients[0], chief_complaint=f"C{i}", treatment="Rest")
+            for i in range(3)
+        ]
+        self.client.post(reverse("archive_complaint", args=[self.complaints[0].id]))
+
+    def async_request(self, path, params=None, headers=None):
+        request = AsyncRequestFactory().get(path, params, headers=headers)
+        request.user = self.user
+
+        async def auser():
+            return self.user
+        request.auser = auser
+        return request
+
+    def both(self, name, path, *args, headers=None, **params):
+        """Run the sync and async versions of a view on the same request, with a cold cache each time."""
+        response_cache().clear()
+        request = RequestFactory().get(path, params, headers=headers)
+        request.user = self.user
+        sync_response = getattr(views, name)(request, *args)
+
+        response_cache().clear()
+        async_response = async_to_sync(getattr(async_views, name))(self.async_request(path, params, headers), *args)
+        return sync_response, async_response
+
+    def assertSameResponse(self, name, path, *args, **params):
+        sync_response, async_response = self.both(name, path, *args, **params)
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response.content, sync_response.content)
+        return async_response
+
+    def test_async_views_answer_like_the_sync_ones(self):
+        patient_id = self.patients[0].patient_id
+        self.assertSameResponse("verify_patient_api", "/api/patients/", patient_id)
+        self.assertSameResponse("verify_patient_api", "/api/patients/", "PT-missing")
+        first = self.assertSameResponse("get_patients_json", "/patients/api/", page_size=2, with_total=1, sort="-age")
+        self.assertSameResponse(
+            "get_patients_json", "/patients/api/", page_size=2, cursor=json.loads(first.content)["next_cursor"], sort="-age",
+        )
+        self.assertSameResponse("get_patients_json", "/patients/api/", gender="female", page=2, page_size=1)
+        self.assertSameResponse("get_patients_json", "/patients/api/", cursor="bogus")
+        self.assertSameResponse("get_patients_json", "/patients/api/", projection="summary", shape="table", sort="age")
+        self.assertSameResponse("get_patients_json", "/patients/api/", fields="bogus")
+        self.assertSameResponse("get_complaints_json", "/complaints/", patient_id, fields="id,is_archived", shape="table")
+        self.assertSameResponse("get_complaints_json", "/complaints/", patient_id, order="desc", page_size=2)
+        self.assertSameResponse("get_complaint_json", "/complaint/", self.complaints[1].id)
+        self.assertSameResponse("get_archived_complaints", "/archived/", patient_id=patient_id)
+        self.assertSameResponse("get_archived_complaints", "/archived/", date_from="yesterday")
+
+    def test_missing_rows_are_404s(self):
+        with self.assertRaises(Http404):
+            self.both("get_complaints_json", "/complaints/", "PT-missing")
+        with self.assertRaises(Http404):
+            self.both("get_complaint_json", "/complaint/", 0)
+
+    def test_same_query_count_and_conditional_gets(self):
+        request = self.async_request("/patients/api/", {"with_total": 1})
+        with self.assertNumQueries(3):  # validators, page, total
+            response = async_to_sync(async_views.get_patients_json)(request)
+        self.assertEqual(response.status_code, 200)
+
+        _, not_modified = self.both(
+            "get_patients_json", "/patients/api/", headers={"If-None-Match": response["ETag"]}, with_total=1,
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_ndjson_archives_stream_asynchronously(self):
+        request = self.async_request("/archived/", {"format": "ndjson"})
+        response = async_to_sync(async_views.get_archived_complaints)(request)
+        self.assertTrue(response.is_async)
+
+        async def read():
+            return b"".join([chunk async for chunk in response.streaming_content])
+        lines = async_to_sync(read)().decode().splitlines()
+        self.assertEqual([json.loads(line)["complaint_id"] for line in lines], [self.complaints[0].id])
+
+
+class ReadLoadTestTests(LiveServerTestCase):
+    def setUp(self):
+        CustomUser.objects.create_user(username="terminal", password="pass12345")
+        self.patient = make_patient()
+        Complaint.objects.create(patient=self.patient, chief_complaint="Cough")
+
+    def test_percentiles(self):
+        values = sorted(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([], 0.99), 0.0)
+
+    def test_logged_in_clients_drive_the_read_endpoints(self):
+        async def scenario():
+            patient_ids, complaint_ids = await discover(self.live_server_url, "terminal", "pass12345", 10)
+            report = await run_load(
+                self.live_server_url, read_session(patient_ids, complaint_ids, bust_cache=True), 2, 0.5,
+                setup=lambda client: client.login("terminal", "pass12345"),
+            )
+            return patient_ids, report
+
+        patient_ids, report = async_to_sync(scenario)()
+        self.assertEqual(patient_ids, [self.patient.patient_id])
+        total = report.summary()
+        self.assertGreater(total["requests"], 0)
+        self.assertEqual(total["errors"], 0)
+
+    def test_bad_login_is_reported(self):
+        async def login():
+            client = HttpClient(self.live_server_url)
+            try:
+                await client.login("terminal", "wrong")
+            finally:
+                await client.close()
+
+        with self.assertRaisesMessage(HttpError, "Login as terminal failed"):
+            async_to_sync(login)()
+
+
+class TerminalLoadTestTests(LiveServerTestCase):
+    def setUp(self):
+        # The workflow prints complaint forms; keep the rendered PDFs out of media/.
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        settings_override = override_settings(PDF_CACHE_DIR=Path(self.cache_dir))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        CustomUser.objects.create_user(username="frontdesk", password="pass12345")
+
+    def test_terminals_register_patients_and_print_forms(self):
+        session = TerminalSession("frontdesk", "pass12345", visits_per_login=2, seed=1)
+        # SQLite turns concurrent writers away with "database is locked".
+        terminals = 2 if connection.vendor == "postgresql" else 1
+        report = async_to_sync(run_load)(self.live_server_url, session, terminals, 1.0)
+
+        total = report.summary()
+        self.assertEqual(total["errors"], 0, report.as_dict())
+        self.assertGreater(len(session.registered), 0)
+        self.assertEqual(
+            set(Patient.objects.values_list("patient_id", flat=True)), set(session.registered)
+        )
+        for step in ("login", "dashboard", "add_patient", "record_complaint", "get_complaints_json"):
+            self.assertGreater(report.summary(step)["requests"], 0, step)
+
+    def test_reused_patient_code_counts_as_collision(self):
+        session = TerminalSession("frontdesk", "pass12345")
+        report = LoadReport()
+        registration = {"success": True, "patient": {"patient_id": "PT-000001", "firstname": "Load1"}}
+        body = json.dumps(registration).encode()
+        self.assertEqual(session.check_registration(report, (200, {}, body), "Load1"), "PT-000001")
+        self.assertIsNone(session.check_registration(report, (200, {}, body), "Load2"))
+        self.assertEqual(dict(report.errors["add_patient"]), {"patient_id collision": 1})
+
+        self.assertEqual(server_exception(b"<title>IntegrityError\n at /patients/add/</title>"), "IntegrityError")
+        self.assertEqual(server_exception(b"<h1>Server Error (500)</h1>"), "")
@@ -2,8 +2,13 @@ from django.urls import path
 from django.conf import settings
 from django.conf.urls.static import static
 from . import views
+from . import async_views
 from . import export_views
 
+# Read-only JSON endpoints come in sync and async versions; ASGI deployments
+# (asgi.py) serve the async ones unless PM_READ_VIEWS says otherwise.
+reads = async_views if settings.ASYNC_READ_VIEWS else views
+
 urlpatterns = [
     path('', views.login_view, name='login'),
 
@@ -13,17 +18,23 @@ urlpatterns = [
     
     path('patients/add/', views.add_patient, name='add_patient'),
 
+    path('patients/import/', views.import_patients_upload, name='import_patients'),
+
     path('complaints/add/', views.record_complaint, name='record_complaint'),
 
     path('patients/', views.list_patients, name='list_patients'),
     
-    path('api/patients/<str:patient_id>/', views.verify_patient_api),
+    path('api/patients/<str:patient_id>/', reads.verify_patient_api),
     
-    path('patients/api/', views.get_patients_json, name='patients_api'),
+    path('patients/api/', reads.get_patients_json, name='patients_api'),
+
+    path('patients/changes/', views.patient_changes_json, name='patient_changes'),
+
+    path('patients/search/', views.search_records, name='search_records'),
 
     path("patients/delete/", views.delete_patient, name="delete_patient"),
 
-    path("patients/<str:patient_id>/complaints/", views.get_complaints_json, name="get_complaints_json"),
+    path("patients/<str:patient_id>/complaints/", reads.get_complaints_json, name="get_complaints_json"),
     
     path("patients/update/", views.update_patient, name="update_patient"),
 
@@ -31,19 +42,34 @@ urlpatterns = [
 
     path("complaints/update/", views.update_complaint, name="update_complaint"),
 
-    path("patients/<str:patient_id>/complaints/", views.get_complaints_json, name="get_complaints_json"),
+    path("patients/<str:patient_id>/complaints/", reads.get_complaints_json, name="get_complaints_json"),
 
-    path("complaints/<int:complaint_id>/json/", views.get_complaint_json, name="get_complaint_json"),
+    path("complaints/<int:complaint_id>/json/", reads.get_complaint_json, name="get_complaint_json"),
     
     
     path("complaints/<int:complaint_id>/archive/", views.archive_complaint, name="archive_complaint"),
 
+    path("complaints/archive/bulk/", views.bulk_archive_complaints, name="bulk_archive_complaints"),
+
     path("archived/<int:archive_id>/delete/", views.delete_archived_complaint, name="delete_archived_complaint"),
 
-    path("archived/", views.get_archived_complaints, name="get_archived_complaints"),
+    path("archived/", reads.get_archived_complaints, name="get_archived_complaints"),
 
     path("complaints/<int:complaint_id>/export/pdf/", export_views.export_complaint_pdf, name="export_complaint_pdf"),
     path("archived/<int:archive_id>/export/pdf/", export_views.export_archived_pdf, name="export_archived_pdf"),
+
+    path("exports/pdf/batch/", export_views.export_batch_pdf, name="export_batch_pdf"),
+    path("exports/pdf/batch/<int:job>/progress/", export_views.export_batch_progress, name="export_batch_progress"),
+    path("exports/<str:dataset>/", export_views.export_records, name="export_records"),
+
+    path("jobs/<int:job_id>/", views.job_status, name="job_status"),
+    path("jobs/<int:job_id>/download/", views.job_download, name="job_download"),
+
+    path("events/", views.live_events, name="live_events"),
+
+    path("cache/stats/", views.response_cache_stats, name="response_cache_stats"),
+    path("profiling/", views.profiling_report, name="profiling_report"),
+    path("metrics", views.metrics, name="metrics"),
     
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
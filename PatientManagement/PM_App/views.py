@@ -1,3 +1,8 @@
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+
 from django.shortcuts import render
 
 # Create your views here.
@@ -8,11 +13,30 @@ from django.contrib.auth.hashers import make_password, check_password
 
 from django.shortcuts import render, redirect, get_object_or_404
 
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Exists, Max, OuterRef, Q
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
 
 from django.views.decorators.http import require_POST
 
+from .archiving import ARCHIVE_BATCH_SIZE, ARCHIVE_FILTERS, ArchiveFilterError, archivable_complaints, bulk_archive
+from .conditional import conditional_json
+from .events import event_stream, replay
+from .image_pipeline import InvalidImage, ingest_image, queue_ingest, rendition_name, rendition_url
+from .importers import IMPORT_BATCH_SIZE, IMPORT_FORMATS, detect_format, import_patients
+from .jobs import enqueue, job_state, output_dir, stage_upload
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, exposition, record_uploads
 from .models import *
+from .pagination import PaginationError, keyset_page, parse_date_param, parse_page, parse_page_size, parse_sort
+from .profiling import stats as profile_stats
+from .projection import ProjectionError, parse_projection
+from .response_cache import cached_response, patient_namespace, stats as cache_stats
+from .search import match_patients, search_complaints, search_patients
+from .sync import MAX_SYNC_PAGE_SIZE, SYNC_PAGE_SIZE, SyncTokenError, current_token, parse_token, patient_changes
 
 def login_view(request):
     if request.method == 'POST':
@@ -52,10 +76,16 @@ def dashboard_view(request):
             user.set_password(password)
             credentials_changed = True
 
-        if profile_picture:
-            user.profile_picture = profile_picture
+        queue_picture = profile_picture and ingest_async()
+        if profile_picture and not queue_picture:
+            try:
+                user.profile_picture = ingest_image(profile_picture, "profile_pics")
+            except InvalidImage:
+                pass
 
         user.save()
+        if queue_picture:
+            queue_ingest(user, "profile_picture", profile_picture, "profile_pics", user=user)
 
         if credentials_changed:
             logout(request)
@@ -66,40 +96,56 @@ def dashboard_view(request):
     return render(request, 'dashboard.html', {'user': user})
 
 
+def ingest_async():
+    return getattr(settings, "IMAGE_INGEST_ASYNC", False)
+
+
 @login_required
+@cached_response("patient_detail", lambda request, patient_id: [patient_namespace(patient_id)])
 def verify_patient_api(request, patient_id):
     try:
         patient = Patient.objects.get(patient_id=patient_id)
-        return JsonResponse({
-            "success": True,
-            "patient": {
-                "patient_id": patient.patient_id,
-                "firstname": patient.firstname,
-                "middlename": patient.middlename or "",
-                "lastname": patient.lastname,
-                "address": patient.address,
-                "birthdate": patient.birthdate,
-                "age": patient.age,
-                "gender": patient.gender,
-                "contact_number": patient.contact_number,
-                "blood_pressure": patient.blood_pressure,
-                "weight": patient.weight,
-                "height": patient.height,
-                "profile_image": patient.profile_image.url if patient.profile_image else ""
-            }
-        })
     except Patient.DoesNotExist:
         return JsonResponse({"success": False}, status=404)
+    return JsonResponse({"success": True, "patient": patient_detail(patient)})
+
+
+def patient_detail(patient):
+    return {
+        "patient_id": patient.patient_id,
+        "firstname": patient.firstname,
+        "middlename": patient.middlename or "",
+        "lastname": patient.lastname,
+        "address": patient.address,
+        "birthdate": patient.birthdate,
+        "age": patient.age,
+        "gender": patient.gender,
+        "contact_number": patient.contact_number,
+        "blood_pressure": patient.blood_pressure,
+        "weight": patient.weight,
+        "height": patient.height,
+        "profile_image": rendition_url(patient.profile_image.name, "medium") or "",
+        "profile_thumbnail": rendition_url(patient.profile_image.name, "thumb") or "",
+    }
 
 @login_required
 def add_patient(request):
     if request.method == 'POST':
+        record_uploads(request, "add_patient")
         patient_id = request.POST.get('patient_id')
 
+        profile_image = request.FILES.get('profile_image')
+        queue_image = profile_image and ingest_async()
+        if profile_image and not queue_image:
+            try:
+                profile_image = ingest_image(profile_image, "patient_profiles")
+            except InvalidImage as e:
+                return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
         patient, created = Patient.objects.update_or_create(
             patient_id=patient_id,
             defaults={
-                'profile_image': request.FILES.get('profile_image'),
+                'profile_image': None if queue_image else profile_image,
                 'firstname': request.POST.get('firstname'),
                 'middlename': request.POST.get('middlename'),
                 'lastname': request.POST.get('lastname'),
@@ -113,6 +159,8 @@ def add_patient(request):
                 'height': request.POST.get('height'),
             }
         )
+        if queue_image:
+            queue_ingest(patient, "profile_image", profile_image, "patient_profiles", user=request.user)
 
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
             return JsonResponse({
@@ -130,18 +178,44 @@ def add_patient(request):
                     'blood_pressure': patient.blood_pressure,
                     'weight': patient.weight,
                     'height': patient.height,
-                    'profile_image': patient.profile_image.url if patient.profile_image else ''
+                    'profile_image': rendition_url(patient.profile_image.name, 'medium') or ''
                 }
             })
 
         return redirect('list_patients')
 
     else:
-        last_patient = Patient.objects.order_by('-id').first()
-        next_number = (last_patient.id + 1) if last_patient else 1
-        next_id = f"PT-2026{str(next_number).zfill(4)}"
+        next_id = Patient.peek_next_patient_id()
         return render(request, 'dashboard.html', {'next_id': next_id})
 
+MAX_IMPORT_BATCH_SIZE = 5000
+
+
+@login_required
+@require_POST
+def import_patients_upload(request):
+    upload = request.FILES.get("file")
+    if upload is None:
+        return JsonResponse({"error": "Upload a CSV or JSON-lines file as 'file'"}, status=400)
+    fmt = request.POST.get("format") or detect_format(upload.name)
+    if fmt not in IMPORT_FORMATS:
+        return JsonResponse({"error": f"format must be one of {', '.join(IMPORT_FORMATS)}"}, status=400)
+    try:
+        batch_size = parse_page_size(
+            request.POST.get("batch_size"), IMPORT_BATCH_SIZE, MAX_IMPORT_BATCH_SIZE, name="batch_size"
+        )
+    except PaginationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    dry_run = request.POST.get("dry_run") == "1"
+
+    if request.POST.get("async") == "1":
+        payload = {"upload": stage_upload(upload), "format": fmt, "batch_size": batch_size, "dry_run": dry_run}
+        job = enqueue("patients.import", payload, user=request.user)
+        return JsonResponse({"job": job.pk, "status_url": reverse("job_status", args=[job.pk])}, status=202)
+
+    report = import_patients(upload.file, fmt, batch_size=batch_size, dry_run=dry_run)
+    return JsonResponse(report.as_dict())
+
 @login_required
 def delete_patient(request):
     if request.method == "POST":
@@ -173,42 +247,222 @@ def record_complaint(request):
         })
     return JsonResponse({"error": "Invalid request"}, status=400)
 
-@login_required
-def get_complaints_json(request, patient_id):
-    patient = get_object_or_404(Patient, patient_id=patient_id)
-    complaints = patient.complaints.all().values(
-        "id", "chief_complaint", "lab_examination",
-        "test_result", "final_diagnosis", "treatment", "date_created"
-    )
-    return JsonResponse({"complaints": list(complaints)})
+PATIENT_LIST_FIELDS = (
+    "id", "patient_id", "firstname", "middlename", "lastname", "contact_number",
+    "birthdate", "age", "gender", "address", "blood_pressure", "weight", "height",
+    "profile_image",
+)
+
+PATIENT_PROJECTIONS = {
+    "summary": ("patient_id", "firstname", "middlename", "lastname", "age", "gender"),
+    "detail": PATIENT_LIST_FIELDS[1:],
+}
+
+PATIENT_SORT_FIELDS = {"id", "patient_id", "firstname", "lastname", "age", "birthdate"}
+
+
+def filter_patients(queryset, params):
+    query = (params.get("q") or "").strip()
+    if query:
+        queryset = match_patients(queryset, query)
+
+    name = (params.get("name") or "").strip()
+    for term in name.split():
+        queryset = queryset.filter(
+            Q(firstname__icontains=term) | Q(middlename__icontains=term) | Q(lastname__icontains=term)
+        )
+
+    patient_id = (params.get("patient_id") or "").strip()
+    if patient_id:
+        queryset = queryset.filter(patient_id__istartswith=patient_id)
+
+    gender = (params.get("gender") or "").strip()
+    if gender:
+        queryset = queryset.filter(gender__iexact=gender)
+
+    for param, lookup in (("age_min", "age__gte"), ("age_max", "age__lte")):
+        value = params.get(param)
+        if value not in (None, ""):
+            try:
+                queryset = queryset.filter(**{lookup: int(value)})
+            except ValueError:
+                raise PaginationError(f"{param} must be an integer")
+
+    return queryset
+
+
+def patient_image_url(request, name, absolute=True):
+    if not name:
+        return "/static/img/default.png"
+    url = rendition_url(name, "thumb")
+    return request.build_absolute_uri(url) if absolute else url
+
+
+def patient_list_version(request):
+    try:
+        patients = filter_patients(Patient.objects.all(), request.GET)
+    except PaginationError:
+        return None
+    return patient_list_validators(patients.aggregate(**PATIENT_LIST_AGGREGATES))
+
+
+PATIENT_LIST_AGGREGATES = {"last_modified": Max("updated_at"), "count": Count("id")}
+
+
+def patient_list_validators(state):
+    return (state["count"], state["last_modified"]), state["last_modified"]
+
 
 @login_required
+@conditional_json(patient_list_version)
+@cached_response("patient_list", lambda request: ["patients"])
 def get_patients_json(request):
-    patients = Patient.objects.all()
-    patient_list = []
-
-    for p in patients:
-        patient_list.append({
-            "patient_id": p.patient_id,
-            "firstname": p.firstname,
-            "middlename": p.middlename,
-            "lastname": p.lastname,
-            "contact_number": p.contact_number,
-            "birthdate": p.birthdate,
-            "age": p.age,
-            "gender": p.gender,
-            "address": p.address,
-            "blood_pressure": p.blood_pressure,
-            "weight": p.weight,
-            "height": p.height,
-            "profile_image": request.build_absolute_uri(p.profile_image.url) if p.profile_image else "/static/img/default.png"
-        })
+    # Read before the page, so changes after it are at worst applied twice.
+    token = current_token() if wants_sync_token(request) else None
+    try:
+        patients, page_args, projection = patient_page_args(request)
+        rows, next_cursor = keyset_page(**page_args)
+    except (PaginationError, ProjectionError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    total = patients.count() if wants_total(request) else None
+    return patient_list_response(request, rows, next_cursor, page_args["page_size"], total, projection, token)
+
+
+def patient_page_args(request):
+    """The filtered patients, the ``keyset_page`` arguments and the projection for one list request.
+
+    Only the projected columns are selected, plus the keyset keys.
+    """
+    page_size = parse_page_size(request.GET.get("page_size"))
+    page = parse_page(request.GET.get("page"))
+    sort, descending = parse_sort(request.GET.get("sort"), PATIENT_SORT_FIELDS, "id")
+    projection = parse_projection(request.GET, PATIENT_PROJECTIONS)
+    patients = filter_patients(Patient.objects.all(), request.GET)
+    keys = [sort, "id"] if sort != "id" else ["id"]
+    return patients, {
+        "queryset": patients.values(*projection.query_columns(*keys)),
+        "fields": keys,
+        "page_size": page_size,
+        "cursor": request.GET.get("cursor"),
+        "sort_name": request.GET.get("sort") or "id",
+        "descending": descending,
+        "page": page,
+    }, projection
+
+
+def wants_total(request):
+    return request.GET.get("with_total") in ("1", "true")
+
+
+def wants_sync_token(request):
+    return request.GET.get("with_token") in ("1", "true")
+
+
+def patient_list_response(request, rows, next_cursor, page_size, total, projection, token=None):
+    """The list page as JSON: one object per patient, or with ``shape=table`` column names once and rows as arrays.
+
+    Table rows carry site-relative image URLs rather than repeating the host in every row.
+    """
+    if "profile_image" in projection.columns:
+        for row in rows:
+            row["profile_image"] = patient_image_url(request, row["profile_image"], absolute=not projection.table)
+
+    data = {"columns": projection.columns} if projection.table else {}
+    data.update({
+        "patients": projection.render(rows),
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
+        "page_size": page_size,
+    })
+    if total is not None:
+        data["total"] = total
+    if token is not None:
+        # A /patients/changes/ token the page is current to, for clients
+        # that patch it with deltas.
+        data["sync_token"] = token
+    return JsonResponse(data)
+
+@login_required
+def patient_changes_json(request):
+    """Delta sync: patients inserted, updated and deleted since a change token.
+
+    Clients start with ``since=0`` (or none), apply each page and pass the
+    returned ``token`` back until ``has_more`` is false. A token the server
+    has never handed out (e.g. after a restore) gets ``reset`` so the client
+    throws its copy away and starts over.
+    """
+    try:
+        since = parse_token(request.GET.get("since"))
+        limit = parse_page_size(request.GET.get("limit"), SYNC_PAGE_SIZE, MAX_SYNC_PAGE_SIZE, name="limit")
+    except (SyncTokenError, PaginationError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    until = current_token()
+    if since > until:
+        return JsonResponse({"reset": True, "upserts": [], "deleted": [], "token": 0, "has_more": True})
+
+    upserts, deleted, token, has_more = patient_changes(since, PATIENT_LIST_FIELDS, limit, until)
+    for row in upserts:
+        del row["id"]
+        row["profile_image"] = patient_image_url(request, row["profile_image"])
+
+    return JsonResponse({
+        "reset": False,
+        "upserts": upserts,
+        "deleted": deleted,
+        "token": token,
+        "has_more": has_more,
+    })
+
+SEARCH_MIN_LENGTH = 2
 
-    return JsonResponse({"patients": patient_list})
+
+@login_required
+def search_records(request):
+    query = (request.GET.get("q") or "").strip()
+    kind = request.GET.get("type") or "patients"
+    if len(query) < SEARCH_MIN_LENGTH:
+        return JsonResponse({"error": f"q must be at least {SEARCH_MIN_LENGTH} characters"}, status=400)
+    if kind not in ("patients", "complaints"):
+        return JsonResponse({"error": "type must be 'patients' or 'complaints'"}, status=400)
+
+    if kind == "patients":
+        queryset = search_patients(query).values(
+            "id", "patient_id", "firstname", "middlename", "lastname",
+            "contact_number", "address", "age", "gender", "rank",
+        )
+    else:
+        queryset = search_complaints(query).values(
+            "id", "patient_code", "patient_firstname", "patient_lastname",
+            "chief_complaint", "final_diagnosis", "date_created", "rank",
+        )
+
+    try:
+        rows, next_cursor = keyset_page(
+            queryset,
+            ["rank", "id"],
+            parse_page_size(request.GET.get("page_size"), default=20, maximum=100),
+            cursor=request.GET.get("cursor"),
+            sort_name=f"search:{kind}",
+            descending=True,
+            page=parse_page(request.GET.get("page")),
+        )
+    except PaginationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({
+        "query": query,
+        "type": kind,
+        "results": rows,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
+    })
 
 @login_required
 @require_POST
 def update_patient(request):
+    record_uploads(request, "update_patient")
     patient_id = request.POST.get("patient_id")
     patient = get_object_or_404(Patient, patient_id=patient_id)
 
@@ -221,8 +475,13 @@ def update_patient(request):
     patient.gender = request.POST.get("gender")
     patient.address = request.POST.get("address")
 
-    if "profile_image" in request.FILES:
-        patient.profile_image = request.FILES["profile_image"]
+    if "profile_image" in request.FILES and ingest_async():
+        queue_ingest(patient, "profile_image", request.FILES["profile_image"], "patient_profiles", user=request.user)
+    elif "profile_image" in request.FILES:
+        try:
+            patient.profile_image = ingest_image(request.FILES["profile_image"], "patient_profiles")
+        except InvalidImage as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=400)
 
     patient.save()
 
@@ -276,105 +535,208 @@ def delete_complaint(request, complaint_id):
         return JsonResponse({"status": "success", "patient_id": patient_id})
     return JsonResponse({"error": "Invalid request"}, status=400)
 
+COMPLAINT_PAGE_SIZE = 50
+MAX_COMPLAINT_PAGE_SIZE = 200
+
+
+def complaints_version(request, patient_id):
+    return complaints_validators(Patient.objects.filter(patient_id=patient_id).aggregate(**COMPLAINTS_AGGREGATES))
+
+
+COMPLAINTS_AGGREGATES = {
+    "patient_updated": Max("updated_at"),
+    "complaints_updated": Max("complaints__updated_at"),
+    "complaint_count": Count("complaints"),
+    "archived_count": Count("complaints__archive"),
+}
+
+
+def complaints_validators(state):
+    if state["patient_updated"] is None:
+        return None
+    last_modified = max(filter(None, (state["patient_updated"], state["complaints_updated"])))
+    return tuple(state.values()), last_modified
+
+
 @login_required
+@conditional_json(complaints_version)
+@cached_response("patient_complaints", lambda request, patient_id: [patient_namespace(patient_id)])
 def get_complaints_json(request, patient_id):
-    patient = get_object_or_404(Patient, patient_id=patient_id)
-    complaints = patient.complaints.all()
-
-    complaints_data = []
-    for c in complaints:
-        complaints_data.append({
-            "id": c.id,
-            "chief_complaint": c.chief_complaint,
-            "lab_examination": c.lab_examination,
-            "test_result": c.test_result,
-            "final_diagnosis": c.final_diagnosis,
-            "treatment": c.treatment,
-            "date_created": c.date_created,
-            "is_archived": hasattr(c, "archive"),
-        })
+    patient = get_object_or_404(complaint_list_patient(), patient_id=patient_id)
+    try:
+        page_args, projection = complaint_page_args(request, patient.pop("id"))
+        complaints_data, next_cursor = keyset_page(**page_args)
+    except (PaginationError, ProjectionError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return complaint_list_response(patient, complaints_data, next_cursor, projection)
 
-    return JsonResponse({
-        "patient": {
-            "patient_id": patient.patient_id,
-            "firstname": patient.firstname,
-            "middlename": patient.middlename,
-            "lastname": patient.lastname,
-            "age": patient.age,
-            "gender": patient.gender,
-            "address": patient.address,
-        },
-        "complaints": complaints_data
+
+def complaint_list_patient():
+    return Patient.objects.values("id", "patient_id", "firstname", "middlename", "lastname", "age", "gender", "address")
+
+
+COMPLAINT_PROJECTIONS = {
+    "summary": ("id", "chief_complaint", "final_diagnosis", "date_created", "is_archived"),
+    "detail": (
+        "id", "chief_complaint", "lab_examination", "test_result",
+        "final_diagnosis", "treatment", "date_created", "is_archived",
+    ),
+}
+
+
+def complaint_page_args(request, patient_pk):
+    """The ``keyset_page`` arguments and the projection for one complaint list request."""
+    projection = parse_projection(request.GET, COMPLAINT_PROJECTIONS)
+    complaints = Complaint.objects.filter(patient_id=patient_pk)
+    if "is_archived" in projection.columns:
+        complaints = complaints.annotate(
+            is_archived=Exists(PatientComplaintArchive.objects.filter(complaint_id=OuterRef("pk")))
+        )
+    descending = request.GET.get("order") == "desc"
+    return {
+        "queryset": complaints.values(*projection.query_columns("date_created", "id")),
+        "fields": ["date_created", "id"],
+        "page_size": parse_page_size(request.GET.get("page_size"), COMPLAINT_PAGE_SIZE, MAX_COMPLAINT_PAGE_SIZE),
+        "cursor": request.GET.get("cursor"),
+        "sort_name": "-date_created" if descending else "date_created",
+        "descending": descending,
+    }, projection
+
+
+def complaint_list_response(patient, complaints_data, next_cursor, projection):
+    data = {"patient": patient}
+    if projection.table:
+        data["columns"] = projection.columns
+    data.update({
+        "complaints": projection.render(complaints_data),
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
     })
+    return JsonResponse(data)
 
 @login_required
 def get_complaint_json(request, complaint_id):
     complaint = get_object_or_404(Complaint, id=complaint_id)
-    return JsonResponse({
+    return JsonResponse(complaint_detail(complaint))
+
+
+def complaint_detail(complaint):
+    return {
         "id": complaint.id,
         "chief_complaint": complaint.chief_complaint,
         "lab_examination": complaint.lab_examination,
         "test_result": complaint.test_result,
         "final_diagnosis": complaint.final_diagnosis,
         "treatment": complaint.treatment,
-    })
+    }
 
 @login_required
 def archive_complaint(request, complaint_id):
     if request.method == "POST":
-        complaint = get_object_or_404(Complaint, id=complaint_id)
-        patient = complaint.patient
-
-        PatientComplaintArchive.objects.create(
-            complaint=complaint,
-            patient_id=patient.patient_id,
-            firstname=patient.firstname,
-            middlename=patient.middlename,
-            lastname=patient.lastname,
-            address=patient.address,
-            birthdate=patient.birthdate,
-            age=patient.age,
-            gender=patient.gender,
-            contact_number=patient.contact_number,
-            blood_pressure=patient.blood_pressure,
-            weight=patient.weight,
-            height=patient.height,
-            profile_image=patient.profile_image.url if patient.profile_image else None,
-            chief_complaint=complaint.chief_complaint,
-            lab_examination=complaint.lab_examination,
-            test_result=complaint.test_result,
-            final_diagnosis=complaint.final_diagnosis,
-            treatment=complaint.treatment,
-        )
-
+        get_object_or_404(Complaint.objects.only("id"), id=complaint_id)
+        # Archiving the same complaint twice is a no-op rather than an error.
+        bulk_archive(Complaint.objects.filter(id=complaint_id, archive__isnull=True))
         return JsonResponse({"status": "success"})
     return JsonResponse({"error": "Invalid request"}, status=400)
 
+
+MAX_ARCHIVE_BATCH_SIZE = 5000
+
+
 @login_required
+@require_POST
+def bulk_archive_complaints(request):
+    params = request.POST
+    try:
+        complaints = archivable_complaints(params)
+        batch_size = parse_page_size(
+            params.get("batch_size"), ARCHIVE_BATCH_SIZE, MAX_ARCHIVE_BATCH_SIZE, name="batch_size"
+        )
+    except (ArchiveFilterError, PaginationError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    dry_run = params.get("dry_run") == "1"
+
+    if params.get("async") == "1":
+        filters = {name: params[name] for name in (*ARCHIVE_FILTERS, "all") if params.get(name)}
+        job = enqueue(
+            "complaints.archive", {"filters": filters, "batch_size": batch_size, "dry_run": dry_run}, user=request.user
+        )
+        return JsonResponse({"job": job.pk, "status_url": reverse("job_status", args=[job.pk])}, status=202)
+
+    return JsonResponse(bulk_archive(complaints, batch_size=batch_size, dry_run=dry_run))
+
+ARCHIVE_LIST_FIELDS = (
+    "id", "complaint_id", "patient_id", "firstname", "lastname", "gender", "age", "address",
+    "chief_complaint", "lab_examination", "test_result", "final_diagnosis", "treatment",
+    "date_created", "profile_image",
+)
+
+ARCHIVE_PAGE_SIZE = 50
+ARCHIVE_STREAM_CHUNK_SIZE = 500
+
+
+def filter_archives(queryset, params):
+    date_from = parse_date_param(params, "date_from")
+    if date_from:
+        queryset = queryset.filter(date_created__gte=date_from)
+
+    date_to = parse_date_param(params, "date_to")
+    if date_to:
+        queryset = queryset.filter(date_created__lt=date_to + timedelta(days=1))
+
+    patient_id = (params.get("patient_id") or "").strip()
+    if patient_id:
+        queryset = queryset.filter(patient_id=patient_id)
+
+    return queryset
+
+
+def archive_row(row):
+    # Archives keep the original's URL; list it as the thumbnail where one exists.
+    row["profile_image"] = rendition_name(row["profile_image"], "thumb") or row["profile_image"] or None
+    return row
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+@login_required
+@cached_response("archives", lambda request: ["archives"], skip=lambda request: request.GET.get("format") == "ndjson")
 def get_archived_complaints(request):
-    archives = PatientComplaintArchive.objects.all().order_by("-date_created")
-
-    archives_data = []
-    for a in archives:
-        archives_data.append({
-            "id": a.id,
-            "complaint_id": a.complaint.id if a.complaint else None,
-            "patient_id": a.patient_id,
-            "firstname": a.firstname,
-            "lastname": a.lastname,
-            "gender": a.gender,
-            "age": a.age,
-            "address": a.address,
-            "chief_complaint": a.chief_complaint,
-            "lab_examination": a.lab_examination,
-            "test_result": a.test_result,
-            "final_diagnosis": a.final_diagnosis,
-            "treatment": a.treatment,
-            "date_created": a.date_created.isoformat(),
-            "profile_image": a.profile_image if a.profile_image else None,
-        })
+    try:
+        archives = filter_archives(PatientComplaintArchive.objects.all(), request.GET).values(*ARCHIVE_LIST_FIELDS)
+
+        if request.GET.get("format") == "ndjson":
+            rows = archives.order_by("-date_created", "-id").iterator(chunk_size=ARCHIVE_STREAM_CHUNK_SIZE)
+            return StreamingHttpResponse(
+                stream_ndjson(archive_row(row) for row in rows), content_type="application/x-ndjson"
+            )
+
+        archives_data, next_cursor = keyset_page(**archive_page_args(request, archives))
+    except PaginationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return archive_list_response(archives_data, next_cursor)
 
-    return JsonResponse({"archives": archives_data})
+
+def archive_page_args(request, archives):
+    return {
+        "queryset": archives,
+        "fields": ["date_created", "id"],
+        "page_size": parse_page_size(request.GET.get("page_size"), ARCHIVE_PAGE_SIZE),
+        "cursor": request.GET.get("cursor"),
+        "sort_name": "-date_created",
+        "descending": True,
+    }
+
+
+def archive_list_response(archives_data, next_cursor):
+    return JsonResponse({
+        "archives": [archive_row(row) for row in archives_data],
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
+    })
 
 @login_required
 @require_POST
@@ -384,4 +746,91 @@ def delete_archived_complaint(request, archive_id):
     return JsonResponse({
         "status": "success",
         "message": f"Archived complaint {archive_id} deleted successfully."
-    })
\ No newline at end of file
+    })
+
+def get_own_job(request, job_id):
+    job = get_object_or_404(Job, pk=job_id)
+    if job.created_by_id != request.user.pk and not request.user.is_staff:
+        raise Http404("Job not found")
+    return job
+
+
+@login_required
+def job_status(request, job_id):
+    job = get_own_job(request, job_id)
+    state = job_state(job)
+    if job.status == Job.SUCCEEDED and (job.result or {}).get("file"):
+        state["download_url"] = reverse("job_download", args=[job.pk])
+    return JsonResponse(state, encoder=DjangoJSONEncoder)
+
+
+@login_required
+def job_download(request, job_id):
+    job = get_own_job(request, job_id)
+    result = job.result or {}
+    if job.status != Job.SUCCEEDED or not result.get("file"):
+        raise Http404("Job has no output")
+    try:
+        output = open(output_dir() / result["file"], "rb")
+    except FileNotFoundError:
+        raise Http404("Job output has been removed")
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=result.get("filename") or result["file"],
+        content_type=result.get("content_type") or "application/octet-stream",
+    )
+
+
+@login_required
+def response_cache_stats(request):
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Staff only"}, status=403)
+    return JsonResponse(cache_stats.snapshot())
+
+
+def metrics(request):
+    """Prometheus metrics for this process.
+
+    Open to staff sessions, and to scrapers sending
+    ``Authorization: Bearer <METRICS_TOKEN>`` when that setting is set.
+    """
+    token = settings.METRICS_TOKEN
+    scraper = bool(token) and constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}")
+    if not (scraper or request.user.is_staff):
+        return HttpResponse("Forbidden", status=403, content_type="text/plain")
+    return HttpResponse(exposition(), content_type=METRICS_CONTENT_TYPE)
+
+
+@login_required
+def profiling_report(request):
+    """Per URL name request percentiles from ProfilingMiddleware; POST clears them."""
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Staff only"}, status=403)
+    if request.method == "POST":
+        profile_stats.reset()
+    return JsonResponse({"enabled": settings.PERFORMANCE_PROFILING, "endpoints": profile_stats.snapshot()})
+
+
+@login_required
+async def live_events(request):
+    """Server-Sent Events feed of patient, complaint and archive changes.
+
+    Under ASGI the stream stays open and events arrive as they commit;
+    under WSGI the response holds only what the client missed and the
+    browser's EventSource reconnects after the retry delay.
+    """
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    try:
+        last_event_id = max(0, int(last_event_id)) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(event_stream(last_event_id), content_type="text/event-stream")
+    else:
+        messages, _ = await sync_to_async(replay)(last_event_id)
+        response = HttpResponse("".join(messages), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'PatientManagement.settings')
+# Serve the async read endpoints (PM_App/async_views.py) under ASGI.
+os.environ.setdefault('PM_READ_VIEWS', 'async')
 
 application = get_asgi_application()
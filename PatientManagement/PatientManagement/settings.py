@@ -49,7 +49,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'PM_App.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'PM_App.profiling.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -152,6 +154,69 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'    # for collectstatic in production
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Rendered PDF exports, keyed on a hash of the record and evicted least-recently-used
+PDF_CACHE_DIR = MEDIA_ROOT / 'pdf_cache'
+PDF_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Worker processes for batch PDF exports (None = one per CPU)
+PDF_EXPORT_WORKERS = None
+
+# PDF images: logo path, print resolution and the decoded-image cache budget
+HOSPITAL_LOGO_PATH = BASE_DIR / 'PM_App' / 'Logo.png'
+PDF_IMAGE_DPI = 150
+PDF_IMAGE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Background jobs (python manage.py run_workers): worker processes, how often
+# idle workers poll, when a silent job counts as abandoned, base retry delay.
+# Job output stays outside MEDIA_ROOT: it is only served through job_download.
+JOB_WORKERS = 2
+JOB_POLL_INTERVAL = 1.0
+JOB_LOCK_TIMEOUT = 15 * 60
+JOB_RETRY_DELAY = 30
+JOB_OUTPUT_DIR = BASE_DIR / 'job_output'
+
+# Re-encode uploaded photos in a background job instead of during the request
+IMAGE_INGEST_ASYNC = False
+
+# Cache for JSON API responses. Local memory is per process: with several web
+# processes point RESPONSE_CACHE_ALIAS at a shared backend (Redis, Memcached,
+# database) so invalidations reach every process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Serve the read-only JSON endpoints from PM_App/async_views.py. asgi.py
+# defaults PM_READ_VIEWS to "async"; everything else defaults to "sync".
+ASYNC_READ_VIEWS = os.environ.get('PM_READ_VIEWS', 'sync') == 'async'
+
+# Live change events (/events/, Server-Sent Events). Streams stay open only
+# under an ASGI server (e.g. uvicorn PatientManagement.asgi:application); under
+# WSGI each request returns what is pending and the browser reconnects. Each
+# server process polls for events written by other processes this often.
+LIVE_EVENTS_POLL_INTERVAL = 1.0
+LIVE_EVENTS_HEARTBEAT = 15
+LIVE_EVENTS_MAX_STREAM = 10 * 60
+LIVE_EVENTS_RETENTION = 60 * 60
+
+# Per-request query count, SQL time, duplicate queries, JSON encoding time and
+# response size, sent as Server-Timing headers and logged as JSON on the
+# PM_App.profiling logger. Percentiles for the last PROFILING_SAMPLES requests
+# per URL name are at /profiling/ (staff only). Costs a little per query, so
+# it is off unless PM_PROFILING=1.
+PERFORMANCE_PROFILING = os.environ.get('PM_PROFILING') == '1'
+PROFILING_SAMPLES = 1000
+
+# Prometheus metrics at /metrics: request latency and status per URL name,
+# queries per request, PDF render time and pages, upload sizes, logins and
+# registrations. Each server process serves its own counters. Scrapers send
+# "Authorization: Bearer <METRICS_TOKEN>"; staff can open it in a browser.
+METRICS_ENABLED = True
+METRICS_TOKEN = os.environ.get('PM_METRICS_TOKEN', '')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 